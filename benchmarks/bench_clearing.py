@@ -0,0 +1,329 @@
+# benchmarks/bench_clearing.py
+"""出清机制和评分函数的规模阶梯基准：耗时、吞吐量、峰值内存和分配块数
+
+运行：python -m benchmarks.bench_clearing [--sizes 10,1000,100000,1000000] [--cases 名称片段] [--output results.json] [--compare baseline.json]
+
+- 每个已登记的出清机制按报价数出清测一次，支持按容量出清的再测一次（名称后缀 [quantity]）；
+  另外测 services/market_clear 中的随机模拟、what-if、增量报价簿和 services/evaluation/score_calculator 的评分函数
+- 出清函数的输入是 {student_id: bid} 字典（与路由一致），计时包含构建报价簿
+- 预热一次后耗时取 repeat 次中最快的一次；单次很快的函数循环多次取平均
+- 峰值内存和分配块数在单独的一次调用中用 tracemalloc 统计（tracemalloc 本身会让调用变慢，不计入耗时）：
+  peak_bytes 为调用期间新分配内存的峰值，retained_blocks 为调用返回时仍存活的新分配块数（结果和缓存）
+- 超过某个函数规模上限（如按学生逐个评分是 O(n²)）的组合记为 skipped
+- --compare 与之前保存的结果比较，耗时或峰值内存超过阈值时标记为回归，存在回归时退出码为 1
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import PERIODS, make_bids, make_scenario  # noqa: E402
+from schemas.evaluation import EvaluationCriteria, StudentScore  # noqa: E402
+from services.evaluation import score_calculator  # noqa: E402
+from services.market_clear.order_book import OrderBook  # noqa: E402
+from services.market_clear.registry import list_mechanisms  # noqa: E402
+
+SIZES = (10, 1000, 100000, 1000000)
+
+# 单次调用短于该时间时循环多次取平均
+MIN_TIMING_SECONDS = 0.05
+
+# 比较时忽略绝对差小于该值的耗时变化（微秒级的函数计时噪声很大）
+TIME_NOISE_FLOOR = 0.0005
+
+# 各函数的规模上限：超过时跳过（原因写入结果）
+SIZE_LIMITS = {
+    "dc_opf_lmp": (100000, "LP solve grows superlinearly"),
+    "dc_opf_lmp[quantity]": (100000, "LP solve grows superlinearly"),
+    "multi_period_uniform": (100000, f"{PERIODS} x bids matrices"),
+    "multi_period_uniform[quantity]": (100000, f"{PERIODS} x bids matrices"),
+    "risk_simulation": (100000, "trials x bids matrices"),
+    "score.calculate_student_score": (1000, "copies the full result per student"),
+}
+
+
+class Data:
+    """一个规模下共享的合成数据，按需生成"""
+
+    def __init__(self, size):
+        self.size = size
+        self._bids = None
+        self._period_bids = None
+
+    @property
+    def bids(self):
+        if self._bids is None:
+            self._bids = make_bids(self.size)
+        return self._bids
+
+    @property
+    def period_bids(self):
+        if self._period_bids is None:
+            self._period_bids = make_bids(self.size, periods=PERIODS)
+        return self._period_bids
+
+    def scenario(self, mode="count"):
+        return make_scenario(self.size, mode)
+
+
+def mechanism_cases():
+    """每个已登记机制一个（或两个）基准：名称 -> 生成被测调用的函数"""
+    cases = {}
+    for mechanism in list_mechanisms():
+        modes = ("count", "quantity") if mechanism.quantity_aware else ("count",)
+        for mode in modes:
+            name = mechanism.name if mode == "count" else f"{mechanism.name}[quantity]"
+
+            def factory(data, mechanism=mechanism, mode=mode):
+                bids = data.period_bids if mechanism.name == "multi_period_uniform" else data.bids
+                scenario = data.scenario(mode)
+                return lambda: mechanism.clear(scenario, bids, mode)
+
+            cases[name] = factory
+    return cases
+
+
+def market_cases():
+    def two_stage_stochastic(data):
+        from services.market_clear.two_stage_market import clear_market_two_stage
+        scenario = dict(data.scenario(), demand_RT_distribution={"type": "normal", "mean": data.size / 3, "std": data.size / 30 + 1})
+        return lambda: clear_market_two_stage(scenario, data.bids)
+
+    def risk_simulation(data):
+        from services.market_clear.risk_simulation import simulate_availability
+        scenario = data.scenario()
+        return lambda: simulate_availability(scenario, data.bids, trials=1000)
+
+    def what_if(data):
+        from services.market_clear.registry import get_mechanism
+        from services.market_clear.what_if import MAX_ALTERNATIVES, evaluate_alternatives
+        mechanism = get_mechanism("uniform_price")
+        scenario = data.scenario()
+        alternatives = [{"offer": float(offer), "cost": 20.0} for offer in np.linspace(5, 100, MAX_ALTERNATIVES)]
+        return lambda: evaluate_alternatives(scenario, mechanism, data.bids, "student_0", alternatives, "count")
+
+    def order_book_build(data):
+        return lambda: OrderBook(data.scenario()["scenario_id"], data.bids, 0).marginal(data.scenario()["demand"])
+
+    def order_book_update(data):
+        book = OrderBook(data.scenario()["scenario_id"], data.bids, 0)
+        demand = data.scenario("quantity")["demand"]
+        bid = dict(data.bids["student_0"])
+
+        def update():
+            # 同一条报价在两个价格之间来回替换，每次调用后报价簿恢复原样
+            for offer in (1.0, bid["offer"]):
+                book.apply("student_0", dict(bid, offer=offer))
+                book.marginal(demand, "quantity")
+        return update
+
+    return {
+        "two_stage[stochastic]": two_stage_stochastic,
+        "risk_simulation": risk_simulation,
+        "what_if": what_if,
+        "order_book.build": order_book_build,
+        "order_book.update": order_book_update,
+    }
+
+
+def score_cases():
+    def shared_result(data):
+        from services.market_clear.uniform_price import clear_market_uniform
+        # 评分时会读取 submitted_at；出清结果本身没有这个字段，这里附加一个固定时间
+        result = clear_market_uniform(data.scenario(), data.bids)
+        return result.model_copy(update={"submitted_at": datetime.datetime(2024, 1, 1)})
+
+    def student_score(data):
+        result = shared_result(data)
+        criteria = EvaluationCriteria(scenario_id=result.scenario_id, mechanism_type="uniform_price")
+        return lambda: [
+            score_calculator.calculate_student_score(student_id, result.scenario_id, "uniform_price", bid, result, criteria)
+            for student_id, bid in data.bids.items()
+        ]
+
+    def price_and_profit_scores(data):
+        result = shared_result(data)
+        pairs = [(bid["offer"], result.profits[student_id]) for student_id, bid in data.bids.items()]
+        price = result.clearing_price
+        return lambda: [
+            score_calculator.calculate_price_score(offer, price) + score_calculator.calculate_profit_score(profit)
+            for offer, profit in pairs
+        ]
+
+    def scores(data):
+        rng = np.random.default_rng(0)
+        totals = np.round(rng.uniform(0, 100, data.size), 1).tolist()
+        return [
+            StudentScore.model_construct(
+                student_id=f"student_{i}", scenario_id="bench", mechanism_type="uniform_price",
+                submitted_bid={}, actual_result={}, price_score=total / 2, profit_score=total / 2,
+                total_score=total, rank=0, submitted_at=None
+            )
+            for i, total in enumerate(totals)
+        ]
+
+    def over_scores(function):
+        def factory(data):
+            prepared = scores(data)
+            return lambda: function(prepared)
+        return factory
+
+    return {
+        "score.calculate_student_score": student_score,
+        "score.price_and_profit_scores": price_and_profit_scores,
+        "score.calculate_class_rankings": over_scores(score_calculator.calculate_class_rankings),
+        "score.generate_score_distribution": over_scores(score_calculator.generate_score_distribution),
+        "score.calculate_class_average": over_scores(score_calculator.calculate_class_average),
+    }
+
+
+def all_cases():
+    return {**mechanism_cases(), **market_cases(), **score_cases()}
+
+
+def time_call(func, repeat):
+    """repeat 次中最快的单次耗时（秒）；单次很快时每次循环多次取平均
+
+    第一次调用只用于预热和确定循环次数（新规模下第一次调用要向系统申请内存，明显偏慢），不计入结果。
+    与 timeit 一样计时期间关闭循环垃圾回收：合成数据有上百万个字典，一次全量回收就会让单次耗时翻几倍。
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        first = time.perf_counter() - start
+        loops = 1 if first >= MIN_TIMING_SECONDS else min(1000, math.ceil(MIN_TIMING_SECONDS / max(first, 1e-7)))
+        best = math.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            best = min(best, (time.perf_counter() - start) / loops)
+    finally:
+        gc.enable()
+    return best
+
+
+def trace_call(func):
+    """一次调用的 (峰值内存字节数, 返回时仍存活的新分配块数)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, blocks
+
+
+def run(sizes, selected, repeat, memory=True):
+    cases = all_cases()
+    names = [name for name in cases if not selected or any(part in name for part in selected)]
+    results = []
+    for size in sizes:
+        data = Data(size)
+        for name in names:
+            record = {"case": name, "bids": size}
+            limit = SIZE_LIMITS.get(name)
+            if limit and size > limit[0]:
+                record["skipped"] = limit[1]
+                results.append(record)
+                continue
+            try:
+                func = cases[name](data)
+                seconds = time_call(func, repeat if size < 100000 else 1)
+                record.update(seconds=seconds, throughput=size / seconds if seconds else None)
+                if memory:
+                    record["peak_bytes"], record["retained_blocks"] = trace_call(func)
+            except Exception as e:  # 单个函数失败不影响其他基准，错误写入结果
+                record["error"] = f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+            results.append(record)
+            print(format_record(record), flush=True)
+    return results
+
+
+def format_record(record):
+    head = f"{record['case']:<36}{record['bids']:>9}"
+    if "skipped" in record:
+        return f"{head}  skipped ({record['skipped']})"
+    if "error" in record:
+        return f"{head}  error: {record['error']}"
+    line = f"{head}{record['seconds'] * 1000:>12.3f} ms{record['throughput']:>14.0f} bids/s"
+    if "peak_bytes" in record:
+        line += f"{record['peak_bytes'] / 2 ** 20:>10.2f} MiB{record['retained_blocks']:>10} blocks"
+    return line
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """与基准结果比较，返回回归列表 [(case, bids, 指标, 基准值, 当前值)]"""
+    previous = {(r["case"], r["bids"]): r for r in baseline["results"]}
+    regressions = []
+    for record in results:
+        before = previous.get((record["case"], record["bids"]))
+        if before is None or "seconds" not in record or "seconds" not in before:
+            continue
+        if (record["seconds"] > before["seconds"] * (1 + time_threshold)
+                and record["seconds"] - before["seconds"] > TIME_NOISE_FLOOR):
+            regressions.append((record["case"], record["bids"], "seconds", before["seconds"], record["seconds"]))
+        if ("peak_bytes" in record and "peak_bytes" in before
+                and record["peak_bytes"] > before["peak_bytes"] * (1 + memory_threshold)):
+            regressions.append((record["case"], record["bids"], "peak_bytes", before["peak_bytes"], record["peak_bytes"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="报价数阶梯，逗号分隔")
+    parser.add_argument("--cases", default="", help="只运行名称包含这些片段的基准，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次；十万条以上只运行一次）")
+    parser.add_argument("--no-memory", action="store_true", help="不统计内存（省去 tracemalloc 的额外一次调用）")
+    parser.add_argument("--output", help="结果 JSON 保存路径")
+    parser.add_argument("--compare", help="作为基准的结果 JSON，标记回归")
+    parser.add_argument("--time-threshold", type=float, default=0.2, help="耗时增加超过该比例视为回归")
+    parser.add_argument("--memory-threshold", type=float, default=0.2, help="峰值内存增加超过该比例视为回归")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    selected = [part for part in args.cases.split(",") if part]
+    results = run(sizes, selected, max(1, args.repeat), memory=not args.no_memory)
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+        for case, bids, metric, before, after in regressions:
+            print(f"REGRESSION {case} @ {bids} bids: {metric} {before:.6g} -> {after:.6g} ({after / before:.2f}x)")
+        print(f"{len(regressions)} regressions against {args.compare}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
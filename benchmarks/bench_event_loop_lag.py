@@ -0,0 +1,115 @@
+# benchmarks/bench_event_loop_lag.py
+"""测量写入大 JSON 文件时事件循环的最大延迟
+
+对比两种方式：
+- inline：在协程里直接调用阻塞的 save_json（改造前异步路由的做法）
+- pool：通过 mock_data.async_storage 的存储线程池执行
+
+运行：python -m benchmarks.bench_event_loop_lag [--records N] [--threshold-ms MS]
+线程池方式的最大延迟超过阈值时以非零状态退出；tests/test_event_loop_lag.py 以较小的规模运行同一检查。
+
+注意：json.load 解析时全程持有 GIL，读取极大的文件仍会让事件循环停顿，线程池只能消除磁盘 I/O 和
+序列化的阻塞（带缩进时为纯 Python 编码，会定期释放 GIL；save_json 分块拼接、编码，见 serialize_chunks）。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_data.file_storage import save_json, clear_json_cache  # noqa: E402
+from mock_data.async_storage import run_in_storage_pool, shutdown_executor  # noqa: E402
+
+
+def make_large_result(records):
+    """构造一个与评估结果结构相近的大对象"""
+    return {
+        "scenario_id": "bench_scenario",
+        "mechanism_type": "uniform_price",
+        "student_scores": [
+            {
+                "student_id": f"student_{i}",
+                "scenario_id": "bench_scenario",
+                "mechanism_type": "uniform_price",
+                "price_score": i % 100 * 1.0,
+                "profit_score": (i * 7) % 100 * 1.0,
+                "total_score": (i * 3) % 100 * 1.0,
+                "rank": i + 1,
+                "feedback": "报价接近出清价格，利润表现良好" * 2
+            }
+            for i in range(records)
+        ]
+    }
+
+
+def write_result(path, data):
+    save_json(path, data)
+    # 不让基准测试的大对象留在 load_json 缓存里
+    clear_json_cache()
+
+
+async def _monitor(stop, interval):
+    """每隔 interval 秒醒来一次，记录实际醒来时间与预期的最大偏差"""
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, loop.time() - expected)
+    return max_lag
+
+
+async def measure(mode, path, data, interval):
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor(stop, interval))
+    await asyncio.sleep(interval * 2)
+
+    start = time.perf_counter()
+    if mode == "inline":
+        write_result(path, data)
+    else:
+        await run_in_storage_pool(write_result, path, data)
+    elapsed = time.perf_counter() - start
+
+    await asyncio.sleep(interval * 2)
+    stop.set()
+    max_lag = await monitor
+    return elapsed, max_lag
+
+
+def measure_lag(records, interval, modes=("inline", "pool")):
+    """写入 records 条记录的评估结果，返回 {方式: (写入耗时, 最大事件循环延迟)}，单位秒"""
+    data = make_large_result(records)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "evaluation.json")
+        for mode in modes:
+            results[mode] = asyncio.run(measure(mode, path, data, interval))
+    shutdown_executor()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000, help="评估结果中的学生记录数")
+    parser.add_argument("--threshold-ms", type=float, default=50.0, help="线程池方式允许的最大事件循环延迟")
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="延迟探测间隔")
+    args = parser.parse_args()
+
+    results = measure_lag(args.records, args.interval_ms / 1000)
+    for mode, (elapsed, max_lag) in results.items():
+        print(f"{mode:>6}: write {elapsed * 1000:8.1f} ms, max event loop lag {max_lag * 1000:8.1f} ms")
+
+    if results["pool"][1] * 1000 > args.threshold_ms:
+        print(f"FAIL: pool lag exceeds {args.threshold_ms} ms")
+        return 1
+    print(f"OK: pool lag below {args.threshold_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# benchmarks/bench_serialization.py
+"""比较各快照格式保存/读取报价分片的耗时和文件大小
+
+运行：python -m benchmarks.bench_serialization [--bids N] [--repeat R]
+未安装 orjson / msgpack 时对应格式会退回到标准库紧凑 JSON，结果中会注明。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_data import file_storage  # noqa: E402
+from mock_data.file_storage import save_json, load_json, clear_json_cache  # noqa: E402
+
+FORMATS = ("json", "orjson", "msgpack")
+
+
+def make_bid_shard(count):
+    """构造一个有 count 条报价的场景分片 {student_id: bid}"""
+    return {
+        f"student_{i:05d}": {
+            "scenario_id": "bench_scenario",
+            "price": round(20 + (i * 37 % 1000) / 10, 2),
+            "quantity": 1 + i * 13 % 50,
+            "bid_type": "supply",
+            "participant_id": f"student_{i:05d}",
+            "participant_name": f"学生{i}",
+            "created_at": "2025-06-23T19:18:38.068283",
+            "status": "pending",
+            "zone": f"Z{i % 4}",
+            "cost": round(15 + (i * 17 % 800) / 10, 2),
+            "availability": 0.9 + (i % 10) / 100
+        }
+        for i in range(count)
+    }
+
+
+def effective_format(fmt):
+    if fmt == "orjson" and file_storage.orjson is None:
+        return "json-compact (orjson missing)"
+    if fmt == "msgpack" and file_storage.msgpack is None:
+        return "orjson (msgpack missing)" if file_storage.orjson is not None else "json-compact (msgpack missing)"
+    return fmt
+
+
+def bench_format(fmt, path, data, repeat):
+    file_storage.STORAGE_FORMAT = fmt
+    save_times, load_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        save_json(path, data)
+        save_times.append(time.perf_counter() - start)
+
+        # 清空缓存，测量真实的解析耗时
+        clear_json_cache()
+        start = time.perf_counter()
+        loaded = load_json(path)
+        load_times.append(time.perf_counter() - start)
+        assert loaded == data, f"{fmt} round trip mismatch"
+    return min(save_times), min(load_times), os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bids", type=int, default=10000, help="每个场景的报价数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    data = make_bid_shard(args.bids)
+    original_format = file_storage.STORAGE_FORMAT
+    print(f"{args.bids} bids, best of {args.repeat}")
+    print(f"{'format':<32}{'save ms':>10}{'load ms':>10}{'size KB':>10}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in FORMATS:
+                path = os.path.join(tmp, f"{fmt}.json")
+                save_s, load_s, size = bench_format(fmt, path, data, args.repeat)
+                print(f"{effective_format(fmt):<32}{save_s * 1000:>10.2f}{load_s * 1000:>10.2f}{size / 1024:>10.1f}")
+    finally:
+        file_storage.STORAGE_FORMAT = original_format
+        clear_json_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_topk.py
+"""比较部分选择（argpartition + 稳定的并列处理）与全排序选出前 k 条报价的耗时，找出交叉点
+
+运行：python -m benchmarks.bench_topk [--bids N] [--repeat R]
+输出每个 k/n 比例下两种方法的耗时；部分选择更快的最大比例可用于设置 MARKET_TOPK_MAX_FRACTION。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.market_clear import bid_book  # noqa: E402
+from services.market_clear.bid_book import BidBook  # noqa: E402
+
+FRACTIONS = (0.001, 0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+
+
+def make_book(count, seed=0):
+    rng = np.random.default_rng(seed)
+    # 报价保留两位小数，制造大量并列，检验并列处理的开销
+    offers = np.round(rng.uniform(10, 100, count), 2).tolist()
+    book = BidBook({f"student_{i}": {"offer": offer, "cost": 0.0} for i, offer in enumerate(offers)})
+    book.offer  # 预先转换数值列，只比较选择本身
+    return book
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bids", type=int, default=1000000, help="报价数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    book = make_book(args.bids)
+    original_fraction = bid_book.TOPK_MAX_FRACTION
+    bid_book.TOPK_MAX_FRACTION = 1.0
+    print(f"{args.bids} bids, best of {args.repeat}")
+    print(f"{'k/n':>8}{'k':>10}{'sort ms':>10}{'select ms':>11}{'speedup':>9}")
+    crossover = None
+    try:
+        for fraction in FRACTIONS:
+            k = max(1, int(args.bids * fraction))
+
+            def full_sort():
+                np.argsort(book.offer, kind="stable")[:k]
+
+            def partial_select():
+                # 每次清空缓存，测量一次完整的选择
+                book._top.clear()
+                book.smallest("offer", k)
+
+            sort_s = best_time(full_sort, args.repeat)
+            select_s = best_time(partial_select, args.repeat)
+            if select_s < sort_s:
+                crossover = fraction
+            print(f"{fraction:>8}{k:>10}{sort_s * 1000:>10.2f}{select_s * 1000:>11.2f}{sort_s / select_s:>8.1f}x")
+    finally:
+        bid_book.TOPK_MAX_FRACTION = original_fraction
+
+    print(f"partial selection faster up to k/n = {crossover} (current MARKET_TOPK_MAX_FRACTION = {original_fraction})")
+
+
+if __name__ == "__main__":
+    main()
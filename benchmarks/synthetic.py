@@ -0,0 +1,79 @@
+# benchmarks/synthetic.py
+"""基准测试用的合成报价和场景
+
+同一 (count, seed) 生成的数据完全相同，不同机器、不同版本之间的基准结果可以直接比较。
+"""
+
+import numpy as np
+
+# 合成报价所在的分区和母线
+ZONES = ("North", "South", "East", "West")
+BUSES = ("B1", "B2", "B3")
+
+# 多时段场景的时段数
+PERIODS = 24
+
+
+def make_bids(count, seed=0, periods=0):
+    """生成 count 条报价 {student_id: bid}，包含各机制用到的全部字段
+
+    报价保留两位小数（与课堂报价相似，有大量并列）；periods > 0 时附带逐时段报价 offers。
+    """
+    rng = np.random.default_rng(seed)
+    cost = np.round(rng.uniform(5, 60, count), 2)
+    offer = np.round(cost * rng.uniform(1.0, 1.6, count), 2)
+    columns = {
+        "offer": offer,
+        "cost": cost,
+        "fixed_cost": np.round(rng.uniform(0, 5, count), 2),
+        "quantity": rng.integers(1, 51, count).astype(float),
+        "probability": np.round(rng.uniform(0.7, 1.0, count), 3),
+        "risk_cost": np.round(rng.uniform(0, 10, count), 2),
+        "offer_DA": offer,
+        "offer_RT": np.round(offer * rng.uniform(0.9, 1.3, count), 2),
+    }
+    names = list(columns)
+    rows = zip(*(columns[name].tolist() for name in names))
+    zones = rng.integers(0, len(ZONES), count).tolist()
+    buses = rng.integers(0, len(BUSES), count).tolist()
+    bids = {}
+    for i, values in enumerate(rows):
+        bid = dict(zip(names, values))
+        bid["zone"] = ZONES[zones[i]]
+        bid["bus"] = BUSES[buses[i]]
+        bids[f"student_{i}"] = bid
+
+    if periods:
+        # 日内报价曲线：基础报价乘以随时段变化的系数
+        shape = 1 + 0.3 * np.sin(np.linspace(0, 2 * np.pi, periods, endpoint=False))
+        series = np.round(offer[:, None] * shape[None, :], 2).tolist()
+        for bid, offers in zip(bids.values(), series):
+            bid["offers"] = offers
+    return bids
+
+
+def make_scenario(count, mode="count"):
+    """适用于所有已登记机制的场景：需求约为报价数（或总容量）的三分之一"""
+    demand = max(1, count // 3) if mode == "count" else max(1.0, count * 25.5 / 3)
+    zone_cap = max(1, count // 8) if mode == "count" else None
+    return {
+        "scenario_id": f"bench_{count}",
+        "demand": demand,
+        "clearing_mode": mode,
+        "demand_DA": demand,
+        "demand_RT": max(1, int(demand * 1.1)) if mode == "count" else demand,
+        "zone_limits": {zone: zone_cap for zone in ZONES},
+        "unzoned_bids": "uncapped",
+        "must_run": [f"student_{i}" for i in range(0, count, max(1, count // 10))],
+        "demand_profile": [max(1, int(demand * factor)) for factor in np.linspace(0.6, 1.0, PERIODS)],
+        "network": {
+            "buses": list(BUSES),
+            "slack": "B1",
+            "lines": [
+                {"id": "L12", "from": "B1", "to": "B2", "reactance": 0.1, "limit": demand * 0.15},
+                {"id": "L23", "from": "B2", "to": "B3", "reactance": 0.1},
+                {"id": "L13", "from": "B1", "to": "B3", "reactance": 0.2},
+            ],
+            "loads": {"B1": demand * 0.2, "B2": demand * 0.5, "B3": demand * 0.3},
+        },
+    }
@@ -1,6 +1,9 @@
+import sys
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import auth, users, admin, simulation, evaluation, classes, scenarios, bids
+from mock_data.async_storage import shutdown_executor
 
 app = FastAPI(title="电力市场仿真平台")
 
@@ -24,6 +27,17 @@ app.include_router(scenarios.router)
 app.include_router(bids.router)
 
 
+@app.on_event("shutdown")
+def close_storage_pool():
+    # 关闭异步路由使用的存储线程池，以及风险模拟和代理拍卖模拟的进程池
+    shutdown_executor()
+    # 模拟模块按需加载：没有用过的模块不为关闭进程池而导入 numpy
+    for name in ("services.market_clear.risk_simulation", "services.simulation.agent_auction"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.shutdown_pool()
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
@@ -0,0 +1,85 @@
+# mock_data/async_storage.py
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_data import file_storage
+from mock_data import visibility_index
+
+# 执行阻塞存储调用的线程数；线程池有上限，慢请求只会排队而不会无限开线程
+STORAGE_IO_THREADS = int(os.environ.get("STORAGE_IO_THREADS", 4))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取存储线程池（首次调用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=STORAGE_IO_THREADS, thread_name_prefix="storage-io")
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    """关闭存储线程池，下次调用时重新创建"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_in_storage_pool(func, *args, **kwargs):
+    """在存储线程池中执行阻塞函数，不占用事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _async(func):
+    """把同步存储函数包装为同名的协程函数"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_storage_pool(func, *args, **kwargs)
+    return wrapper
+
+
+# ---------- 场景管理 ----------
+
+get_scenario = _async(file_storage.get_scenario)
+save_scenario = _async(file_storage.save_scenario)
+delete_scenario = _async(file_storage.delete_scenario)
+list_scenarios = _async(file_storage.list_scenarios)
+
+# ---------- 报价管理 ----------
+
+get_bids = _async(file_storage.get_bids)
+save_bid = _async(file_storage.save_bid)
+delete_bid = _async(file_storage.delete_bid)
+get_participant_bids = _async(file_storage.get_participant_bids)
+bids_version = _async(file_storage.bids_version)
+
+# ---------- 评估标准与评估结果 ----------
+
+get_evaluation_criteria = _async(file_storage.get_evaluation_criteria)
+save_evaluation_criteria = _async(file_storage.save_evaluation_criteria)
+get_evaluation_result = _async(file_storage.get_evaluation_result)
+save_evaluation_result = _async(file_storage.save_evaluation_result)
+
+# ---------- 班级与实验任务 ----------
+
+get_class_info = _async(file_storage.get_class_info)
+save_class_info = _async(file_storage.save_class_info)
+delete_class_info = _async(file_storage.delete_class_info)
+list_classes = _async(file_storage.list_classes)
+save_experiment_assignment = _async(file_storage.save_experiment_assignment)
+get_experiment_assignments = _async(file_storage.get_experiment_assignments)
+get_scenario_assignments = _async(file_storage.get_scenario_assignments)
+
+# ---------- 可见性索引 ----------
+
+get_visibility_index = _async(visibility_index.get_visibility_index)
@@ -0,0 +1,249 @@
+# mock_data/bid_journal.py
+
+import json
+import logging
+import os
+import threading
+
+from mock_data.file_storage import (
+    JsonStorageBackend, load_json, save_json, file_lock, safe_filename, key_from_filename, bump_version,
+    read_version
+)
+
+# 日志超过该大小（字节）后由后台线程合并进快照
+JOURNAL_COMPACT_BYTES = int(os.environ.get("BID_JOURNAL_COMPACT_BYTES", 1024 * 1024))
+# 合并失败的场景在该时间（秒）后重试
+JOURNAL_COMPACT_RETRY_SECONDS = float(os.environ.get("BID_JOURNAL_COMPACT_RETRY_SECONDS", 5))
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStorageBackend(JsonStorageBackend):
+    """报价以 NDJSON 追加写入每个场景的日志文件，内存中维护报价簿，后台线程定期合并为快照
+
+    快照就是 JSON 后端的报价分片 bids/<场景>.json，日志为同目录下的 <场景>.ndjson；
+    场景、评估和班级数据仍沿用 JSON 文件存储。
+    """
+
+    name = "journal"
+
+    def __init__(self, bids_dir=None, evaluations_dir=None, participants_dir=None, compact_bytes=None, **dirs):
+        self.compact_bytes = compact_bytes or JOURNAL_COMPACT_BYTES
+        self._lock = threading.RLock()
+        self._books = {}    # scenario_id -> {student_id: bid}
+        self._offsets = {}  # scenario_id -> (journal inode, 已回放到的字节偏移)
+        self._replayed = False
+        self._pending = set()
+        self._wakeup = threading.Event()
+
+        # 父类初始化时可能需要重建参与者索引，会通过 _iter_all_bids 触发回放
+        super().__init__(bids_dir, evaluations_dir, participants_dir, **dirs)
+        if not self._replayed:
+            self.replay_all()
+
+        self._compactor = threading.Thread(target=self._compact_loop, name="bid-journal-compactor", daemon=True)
+        self._compactor.start()
+
+    # ---------- 文件路径 ----------
+
+    def _journal_path(self, scenario_id):
+        return os.path.join(self.bids_dir, safe_filename(scenario_id) + ".ndjson")
+
+    def _snapshot_path(self, scenario_id):
+        return self.bid_shard_path(scenario_id)
+
+    # ---------- 回放 ----------
+
+    def replay_all(self):
+        """启动时按 快照 + 日志 重建所有场景的内存报价簿"""
+        with self._lock:
+            self._replayed = True
+            self._books.clear()
+            self._offsets.clear()
+            for filename in os.listdir(self.bids_dir):
+                for suffix in (".json", ".ndjson"):
+                    if filename.endswith(suffix):
+                        scenario_id = key_from_filename(filename, suffix)
+                        if scenario_id not in self._books:
+                            self._reload(scenario_id)
+
+    def _reload(self, scenario_id):
+        # 持有日志锁，避免在读取快照和日志之间被其他进程合并
+        with file_lock(self._journal_path(scenario_id)):
+            # load_json 返回的是缓存对象，复制后再作为可变的内存报价簿
+            self._books[scenario_id] = dict(load_json(self._snapshot_path(scenario_id), strict=True, cached=False))
+            self._offsets[scenario_id] = (None, 0)
+            self._catch_up(scenario_id)
+
+    def _catch_up(self, scenario_id):
+        """读取日志中尚未回放的新记录（可能由其他 worker 进程写入）"""
+        path = self._journal_path(scenario_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._offsets[scenario_id] = (None, 0)
+            return
+
+        inode, offset = self._offsets.get(scenario_id, (None, 0))
+        if inode is not None and (inode != stat.st_ino or stat.st_size < offset):
+            # 日志已被合并（替换或截断），从快照重新加载
+            self._reload(scenario_id)
+            return
+        if stat.st_size == offset:
+            self._offsets[scenario_id] = (stat.st_ino, offset)
+            return
+
+        book = self._books.setdefault(scenario_id, {})
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        end = _apply_records(book, chunk)
+        self._offsets[scenario_id] = (stat.st_ino, offset + end)
+
+    def _iter_all_bids(self):
+        with self._lock:
+            if not self._replayed:
+                self.replay_all()
+            scenario_ids = list(self._books)
+        for scenario_id in scenario_ids:
+            yield scenario_id, self.get_bids(scenario_id)
+
+    # ---------- 报价管理 ----------
+
+    def get_bids(self, scenario_id):
+        with self._lock:
+            if scenario_id not in self._books:
+                self._reload(scenario_id)
+            else:
+                self._catch_up(scenario_id)
+            return {student_id: dict(bid) for student_id, bid in self._books[scenario_id].items()}
+
+    def _lookup_bids(self, scenario_id, student_ids):
+        with self._lock:
+            if scenario_id not in self._books:
+                self._reload(scenario_id)
+            else:
+                self._catch_up(scenario_id)
+            book = self._books[scenario_id]
+            return {student_id: dict(book[student_id]) for student_id in student_ids if student_id in book}
+
+    def _write_lock(self, scenario_id):
+        # 同一场景的 追加日志 + 更新参与者索引 按顺序执行。不能直接用日志锁：读取时先持有 self._lock 再取日志锁，
+        # 这里在 self._lock 之外先取锁会形成环；这把锁只在此处使用，总是最先获取
+        return file_lock(self._journal_path(scenario_id) + ".writer")
+
+    def save_bid(self, scenario_id, student_id, bid_data):
+        with self._write_lock(scenario_id):
+            self._index_add(scenario_id, student_id, bid_data)
+            old_bid, version = self._append(scenario_id, student_id, bid_data)
+            self._index_remove(scenario_id, student_id, old_bid, bid_data)
+        return version
+
+    def delete_bid(self, scenario_id, student_id):
+        # 追加一条 bid 为 null 的撤回记录，回放和合并时删除该报价
+        with self._write_lock(scenario_id):
+            old_bid, version = self._append(scenario_id, student_id, None)
+            if old_bid is None:
+                return None
+            self._index_remove(scenario_id, student_id, old_bid, None)
+        return version
+
+    def _append(self, scenario_id, student_id, bid_data):
+        """追加一条日志记录，返回 (原报价, 新版本号)；撤回不存在的报价时不写日志"""
+        record = json.dumps(
+            {"scenario_id": scenario_id, "student_id": student_id, "bid": bid_data},
+            ensure_ascii=False
+        ) + "\n"
+        path = self._journal_path(scenario_id)
+        with self._lock, file_lock(path):
+            if scenario_id not in self._books:
+                self._reload(scenario_id)
+            else:
+                self._catch_up(scenario_id)
+            old_bid = self._books[scenario_id].get(student_id)
+            if bid_data is None and old_bid is None:
+                return None, None
+            # O_APPEND 单次写入一条记录；合并时持有同一把锁，不会写进已被合并的旧日志
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record.encode("utf-8"))
+            finally:
+                os.close(fd)
+            self._catch_up(scenario_id)
+            version = bump_version(self.bids_version_path(scenario_id))
+            if os.path.getsize(path) >= self.compact_bytes:
+                self._pending.add(scenario_id)
+                self._wakeup.set()
+        return old_bid, version
+
+    def bids_version(self, scenario_id):
+        # 报价写入日志而不是分片，合并只改变存储形式，不改变报价簿，因此只看计数器
+        return read_version(self.bids_version_path(scenario_id))
+
+    # ---------- 后台合并 ----------
+
+    def _compact_loop(self):
+        retry = False
+        while True:
+            # 上一轮有合并失败时不等新的写入，超时后重试
+            self._wakeup.wait(JOURNAL_COMPACT_RETRY_SECONDS if retry else None)
+            with self._lock:
+                pending = list(self._pending)
+                self._pending.clear()
+                self._wakeup.clear()
+            failed = []
+            for scenario_id in pending:
+                try:
+                    self.compact(scenario_id)
+                except Exception:
+                    # 合并失败不影响日志中的数据，记录后放回待合并集合，避免后台线程退出
+                    logger.exception("Failed to compact bid journal for scenario %s", scenario_id)
+                    failed.append(scenario_id)
+            with self._lock:
+                self._pending.update(failed)
+            retry = bool(failed)
+
+    def compact(self, scenario_id):
+        """把日志合并进快照，然后换用空日志
+
+        只持有该场景的日志锁（期间各进程无法向该日志追加），从磁盘上的快照和日志重建报价簿并写入快照；
+        self._lock 只在最后交换内存中的回放偏移时短暂持有，写快照和 fsync 期间其他场景的读写不受影响。
+        """
+        journal_path = self._journal_path(scenario_id)
+        with file_lock(journal_path):
+            try:
+                old_inode = os.stat(journal_path).st_ino
+            except FileNotFoundError:
+                return
+            book = dict(load_json(self._snapshot_path(scenario_id), strict=True, cached=False))
+            with open(journal_path, "rb") as f:
+                end = _apply_records(book, f.read())
+            save_json(self._snapshot_path(scenario_id), book)
+            # 用新文件替换日志（而不是截断），其他进程通过 inode 变化发现合并并重新加载快照
+            open(journal_path + ".tmp", "wb").close()
+            os.replace(journal_path + ".tmp", journal_path)
+            new_inode = os.stat(journal_path).st_ino
+
+        with self._lock:
+            # 内存报价簿恰好回放到旧日志末尾时与新快照一致，直接从新日志开头继续回放；
+            # 否则保留原偏移，下次读取时发现 inode 变化，从快照重新加载
+            if self._offsets.get(scenario_id) == (old_inode, end):
+                self._offsets[scenario_id] = (new_inode, 0)
+
+
+def _apply_records(book, chunk):
+    """把日志内容中的记录应用到报价簿，返回已应用的字节数（只应用完整的行，写到一半的记录留到下次）"""
+    end = chunk.rfind(b"\n") + 1
+    for line in chunk[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record["bid"] is None:
+            # 撤回记录
+            book.pop(record["student_id"], None)
+        else:
+            book[record["student_id"]] = record["bid"]
+    return end
@@ -1,82 +1,928 @@
 # mock_data/file_storage.py
 
+import copy
 import json
+import math
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只能保证单进程内互斥
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 未安装 msgpack 时无法写入/读取二进制快照
+    msgpack = None
 
 BASE_PATH = os.path.dirname(__file__)
 SCENARIO_FILE = os.path.join(BASE_PATH, "scenarios.json")
 BIDS_FILE = os.path.join(BASE_PATH, "bids.json")
 EVALUATION_CRITERIA_FILE = os.path.join(BASE_PATH, "evaluation_criteria.json")
+# 报价和评估结果按场景分片存放：bids/<场景>.json、evaluations/<场景>/<机制>.json
+BIDS_DIR = os.path.join(BASE_PATH, "bids")
+EVALUATIONS_DIR = os.path.join(BASE_PATH, "evaluations")
+# 参与者 -> 报价 的二级索引：participants/<参与者>.json = {scenario_id: {bid_id: bid}}
+PARTICIPANTS_DIR = os.path.join(BASE_PATH, "participants")
+# 班级按班级ID存放 classes/<班级>.json；实验任务按班级分片 assignments/<班级>.json，
+# 并维护 场景 -> 任务 索引 assignments_by_scenario/<场景>.json = {assignment_id: class_id}
+CLASSES_DIR = os.path.join(BASE_PATH, "classes")
+ASSIGNMENTS_DIR = os.path.join(BASE_PATH, "assignments")
+ASSIGNMENTS_BY_SCENARIO_DIR = os.path.join(BASE_PATH, "assignments_by_scenario")
+# 旧版本的单文件存储，首次启动时自动迁移
+CLASSES_FILE = os.path.join(BASE_PATH, "classes.json")
+ASSIGNMENTS_FILE = os.path.join(BASE_PATH, "assignments.json")
 
+# 存储后端：json（开发默认）、sqlite（WAL 模式，适合课堂并发提交）或 journal（报价追加日志）
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
 
-def load_json(path):
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
+# 快照写入格式：json（标准库，带缩进便于手工查看）、orjson（紧凑 JSON）或 msgpack（二进制）。
+# 读取时按文件头自动识别，不同格式的文件可以混用；文件名仍以 .json 结尾
+STORAGE_FORMAT = os.environ.get("STORAGE_FORMAT", "json")
+
+# 标准库 JSON 分块写入时每块的字符数，见 serialize_chunks
+SERIALIZE_CHUNK_CHARS = 1 << 20
+
+# 二进制快照文件头：魔数 + 格式版本（1 字节）+ 编码（1 字节）；JSON 文件没有文件头
+SNAPSHOT_MAGIC = b"ESIM"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_CODEC_MSGPACK = b"M"
+
+# load_json 解析结果缓存的最大文件数
+JSON_CACHE_SIZE = int(os.environ.get("JSON_CACHE_SIZE", 64))
+
+_json_cache = OrderedDict()  # path -> ((mtime_ns, size, inode), data)
+_json_cache_lock = threading.Lock()
+_json_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def serialize(data, fmt=None):
+    """按存储格式序列化为 bytes；所需的库未安装时退回到标准库紧凑 JSON"""
+    fmt = fmt or STORAGE_FORMAT
+    if fmt == "json":
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    if fmt == "msgpack" and msgpack is not None:
+        header = SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + SNAPSHOT_CODEC_MSGPACK
+        return header + msgpack.packb(data, use_bin_type=True)
+    if fmt in ("orjson", "msgpack"):
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    raise ValueError(f"Unknown storage format: {fmt}")
+
+
+def serialize_chunks(data, fmt=None):
+    """按存储格式分块序列化，逐块产生 bytes，内容与 serialize 相同
+
+    带缩进的标准库 JSON 由纯 Python 编码器逐段生成，每累积约 SERIALIZE_CHUNK_CHARS 个字符拼接、编码一次：
+    一次性 join / encode 几十 MB 的字符串会持有 GIL 数百毫秒，在存储线程池中写大文件时也会卡住事件循环。
+    其他格式由 C 扩展一次序列化。
+    """
+    fmt = fmt or STORAGE_FORMAT
+    if fmt != "json":
+        yield serialize(data, fmt)
+        return
+    buffer, size = [], 0
+    for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(data):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= SERIALIZE_CHUNK_CHARS:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def deserialize(raw):
+    """解析 serialize 写出的内容；带文件头的是二进制快照，否则按 JSON 解析
+
+    内容损坏时抛出 ValueError；读取二进制快照但未安装 msgpack 时抛出 RuntimeError。
+    """
+    if raw.startswith(SNAPSHOT_MAGIC):
+        header_size = len(SNAPSHOT_MAGIC) + 2
+        version = raw[len(SNAPSHOT_MAGIC)]
+        codec = raw[len(SNAPSHOT_MAGIC) + 1:header_size]
+        if version > SNAPSHOT_VERSION or codec != SNAPSHOT_CODEC_MSGPACK:
+            raise ValueError(f"Unsupported snapshot version {version} / codec {codec!r}")
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read binary snapshots")
+        return msgpack.unpackb(raw[header_size:], raw=False, strict_map_key=False)
+    if orjson is not None:
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # 标准库写出的 NaN / Infinity 不是合法 JSON，orjson 拒绝解析，交给标准库
+            pass
+    return json.loads(raw.decode("utf-8"))
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _cache_put(path, signature, data):
+    with _json_cache_lock:
+        _json_cache[path] = (signature, data)
+        _json_cache.move_to_end(path)
+        while len(_json_cache) > JSON_CACHE_SIZE:
+            _json_cache.popitem(last=False)
+            _json_cache_stats["evictions"] += 1
+
+
+def load_json(path, strict=False, cached=True):
+    """读取快照文件（JSON 或带文件头的二进制格式），文件未变化（mtime_ns、大小、inode 均相同）时直接返回缓存的解析结果
+
+    返回的对象与缓存共享，调用方不得修改；需要修改时请先复制。
+    内容损坏时返回 {}；strict=True 时抛出 ValueError，读-改-写必须使用，否则会用空数据覆盖原文件。
+    cached=False 时总是从磁盘读取（结果仍写入缓存）：持有 file_lock 读-改-写时必须使用，
+    其他进程在同一个时间戳精度内写入大小相同、复用了 inode 的文件时，签名无法区分新旧内容。
+    """
+    try:
+        signature = _file_signature(path)
+    except FileNotFoundError:
+        return {}
+
+    with _json_cache_lock:
+        entry = _json_cache.get(path) if cached else None
+        if entry is not None and entry[0] == signature:
+            _json_cache.move_to_end(path)
+            _json_cache_stats["hits"] += 1
+            return entry[1]
+        _json_cache_stats["misses"] += 1
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        data = deserialize(raw)
+    except ValueError:
+        if strict:
+            raise
+        return {}
+    _cache_put(path, signature, data)
+    return data
+
+
+def _read_umask():
+    # os.umask 只能设置后再恢复，在导入时读取一次，避免运行中与其他线程创建文件相互干扰
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _read_umask()
+
+
+def _target_mode(path):
+    """临时文件替换目标后应有的权限：沿用被替换文件的权限，新文件按 umask 取默认权限（mkstemp 默认 0600）"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(path, raw):
+    """原子写入 bytes（或逐块产生 bytes 的可迭代对象）：先写同目录下的临时文件并 fsync，再 os.replace 覆盖目标文件
+
+    读取方（不加锁）只会看到完整的旧文件或完整的新文件。
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = (raw,)
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in raw:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """按 STORAGE_FORMAT 序列化后原子写入"""
+    atomic_write(path, serialize_chunks(data))
+    # 写入后直接更新缓存，下一次读取无需重新解析
+    _cache_put(path, _file_signature(path), data)
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+_lock_depth = {}  # path -> 当前持锁线程的重入层数（只在持有线程锁时读写）
+
+
+def _thread_lock(path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.RLock())
+
+
+@contextmanager
+def file_lock(path):
+    """对 path 加排他锁（可重入）：进程内用线程锁，进程间用 fcntl 对 path + ".lock" 加建议锁"""
+    with _thread_lock(path):
+        depth = _lock_depth.get(path, 0)
+        _lock_depth[path] = depth + 1
+        try:
+            if fcntl is None or depth > 0:
+                yield
+            else:
+                with open(path + ".lock", "a") as lock_file:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            _lock_depth[path] = depth
+
+
+def update_json(path, update):
+    """在排他锁内读-改-写 JSON 文件
+
+    update(data) 就地修改 data（顶层已复制，不影响缓存），其返回值作为本函数的返回值。
+    """
+    with file_lock(path):
+        data = dict(load_json(path, strict=True, cached=False))
+        result = update(data)
+        save_json(path, data)
+        return result
+
+
+def file_version(path):
+    """文件的版本标识 (mtime_ns, size, inode)；save_json 每次写入都会生成新的 inode"""
+    try:
+        return _file_signature(path)
+    except FileNotFoundError:
+        return None
+
+
+def json_cache_stats():
+    """load_json 缓存的命中统计"""
+    with _json_cache_lock:
+        stats = dict(_json_cache_stats)
+        stats["size"] = len(_json_cache)
+        stats["max_size"] = JSON_CACHE_SIZE
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_json_cache():
+    with _json_cache_lock:
+        _json_cache.clear()
+        for key in _json_cache_stats:
+            _json_cache_stats[key] = 0
+
+
+def copy_records(mapping):
+    """复制 {id: 记录} 的两层结构，调用方可以修改返回的记录而不影响缓存"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in mapping.items()}
+
+
+def safe_filename(key):
+    """把场景ID等外部输入转换为安全的文件名（不允许路径分隔符和 . / ..）"""
+    return quote(str(key), safe="-_").replace(".", "%2E")
+
+
+def key_from_filename(filename, suffix):
+    """safe_filename 的逆操作"""
+    return unquote(filename[:-len(suffix)])
+
+
+def iter_json_shards(directory):
+    """遍历分片目录，产出 (key, 分片内容)"""
+    if not os.path.isdir(directory):
+        return
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            yield key_from_filename(filename, ".json"), load_json(os.path.join(directory, filename))
+
+
+def iter_bid_shards(bids_dir=None):
+    """遍历报价分片目录，产出 (scenario_id, {student_id: bid})"""
+    return iter_json_shards(bids_dir or BIDS_DIR)
+
+
+def read_version(path):
+    """读取版本计数文件（不经过 load_json 缓存，保证多进程下读到最新值）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_version(path):
+    """在锁内递增版本计数文件，返回新版本号
+
+    计数文件始终是纯文本，不受 STORAGE_FORMAT 影响。
+    """
+    with file_lock(path):
+        version = read_version(path) + 1
+        atomic_write(path, str(version).encode("utf-8"))
+        return version
+
+
+def migrate_bids_file(bids_dir=None):
+    """把旧的单一 bids.json 拆分为按场景的分片，完成后重命名为 bids.json.migrated
+
+    分片已存在时以分片中的报价为准。
+    """
+    bids_dir = bids_dir or BIDS_DIR
+    if not os.path.exists(BIDS_FILE):
+        return 0
+    with file_lock(BIDS_FILE):
+        # 多个 worker 同时启动时只有一个执行迁移
+        if not os.path.exists(BIDS_FILE):
+            return 0
+        os.makedirs(bids_dir, exist_ok=True)
+        legacy = load_json(BIDS_FILE, strict=True, cached=False)
+        for scenario_id, scenario_bids in legacy.items():
+            def update(shard, legacy_bids=scenario_bids):
+                for student_id, bid in legacy_bids.items():
+                    shard.setdefault(student_id, bid)
+
+            update_json(os.path.join(bids_dir, safe_filename(scenario_id) + ".json"), update)
+        os.replace(BIDS_FILE, BIDS_FILE + ".migrated")
+        return len(legacy)
+
+
+def json_compatible(data):
+    """评估结果中可能含有 datetime 等对象，统一转换为可写入 JSON 的形式"""
+    if orjson is not None:
+        # 让 datetime 也走 default=str，结果与标准库一致
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.loads(orjson.dumps(data, default=str, option=option))
+    return json.loads(json.dumps(data, ensure_ascii=False, default=str))
+
+
+# ---------- 存储后端 ----------
+
+class StorageBackend:
+    """存储后端接口，所有后端实现相同的场景/报价/评估标准/评估结果操作"""
+
+    name = ""
+
+    def get_scenario(self, scenario_id):
+        raise NotImplementedError
+
+    def save_scenario(self, scenario_id, scenario_data):
+        raise NotImplementedError
+
+    def delete_scenario(self, scenario_id):
+        raise NotImplementedError
+
+    def list_scenarios(self):
+        raise NotImplementedError
+
+    def scenarios_version(self):
+        """场景数据的版本标识，任何场景写入/删除后都会变化（用于派生索引失效）"""
+        raise NotImplementedError
+
+    def get_bids(self, scenario_id):
+        raise NotImplementedError
+
+    def save_bid(self, scenario_id, student_id, bid_data):
+        """写入或替换报价，返回写入后的报价版本号"""
+        raise NotImplementedError
+
+    def delete_bid(self, scenario_id, student_id):
+        """撤回报价，返回撤回后的报价版本号；报价不存在时返回 None"""
+        raise NotImplementedError
+
+    def bids_version(self, scenario_id):
+        """场景报价簿的版本号（整数计数器）：该场景的报价或场景本身写入后都会递增，用于出清结果缓存和增量报价簿"""
+        raise NotImplementedError
+
+    def get_evaluation_criteria(self, scenario_id):
+        raise NotImplementedError
+
+    def save_evaluation_criteria(self, scenario_id, criteria_data):
+        raise NotImplementedError
+
+    def list_evaluation_criteria(self):
+        raise NotImplementedError
+
+    def get_evaluation_result(self, scenario_id, mechanism_type):
+        raise NotImplementedError
+
+    def save_evaluation_result(self, scenario_id, mechanism_type, result):
+        raise NotImplementedError
+
+    def get_participant_bids(self, participant_id):
+        """返回 {scenario_id: {bid_id: bid}}，只包含该参与者（bid["participant_id"]）的报价"""
+        raise NotImplementedError
+
+    def rebuild_participant_index(self):
+        raise NotImplementedError
+
+    def get_class(self, class_id):
+        raise NotImplementedError
+
+    def save_class(self, class_info):
+        raise NotImplementedError
+
+    def delete_class(self, class_id):
+        raise NotImplementedError
+
+    def list_classes(self):
+        raise NotImplementedError
+
+    def classes_version(self):
+        """班级数据的版本标识，任何班级写入/删除后都会变化"""
+        raise NotImplementedError
+
+    def save_assignment(self, assignment):
+        raise NotImplementedError
+
+    def get_class_assignments(self, class_id):
+        raise NotImplementedError
+
+    def get_scenario_assignments(self, scenario_id):
+        raise NotImplementedError
+
+
+class JsonStorageBackend(StorageBackend):
+    """JSON 文件存储，仅用于开发
+
+    报价和评估结果按场景分片，写入一条报价只重写该场景的文件；
+    旧的单一 bids.json 在首次创建后端时自动拆分。
+    """
+
+    name = "json"
+
+    def __init__(self, bids_dir=None, evaluations_dir=None, participants_dir=None,
+                 classes_dir=None, assignments_dir=None, assignments_by_scenario_dir=None):
+        self.bids_dir = bids_dir or BIDS_DIR
+        self.evaluations_dir = evaluations_dir or EVALUATIONS_DIR
+        self.participants_dir = participants_dir or PARTICIPANTS_DIR
+        self.classes_dir = classes_dir or CLASSES_DIR
+        self.assignments_dir = assignments_dir or ASSIGNMENTS_DIR
+        self.assignments_by_scenario_dir = assignments_by_scenario_dir or ASSIGNMENTS_BY_SCENARIO_DIR
+        for directory in (self.bids_dir, self.classes_dir, self.assignments_dir, self.assignments_by_scenario_dir):
+            os.makedirs(directory, exist_ok=True)
+        migrate_bids_file(self.bids_dir)
+        self._migrate_class_files()
+        if not os.path.isdir(self.participants_dir):
+            self.rebuild_participant_index()
+
+    def bid_shard_path(self, scenario_id):
+        return os.path.join(self.bids_dir, safe_filename(scenario_id) + ".json")
+
+    def bids_version_path(self, scenario_id):
+        return os.path.join(self.bids_dir, safe_filename(scenario_id) + ".version")
+
+    def participant_index_path(self, participant_id):
+        return os.path.join(self.participants_dir, safe_filename(participant_id) + ".json")
+
+    def class_path(self, class_id):
+        return os.path.join(self.classes_dir, safe_filename(class_id) + ".json")
+
+    def assignment_shard_path(self, class_id):
+        return os.path.join(self.assignments_dir, safe_filename(class_id) + ".json")
+
+    def scenario_assignment_index_path(self, scenario_id):
+        return os.path.join(self.assignments_by_scenario_dir, safe_filename(scenario_id) + ".json")
+
+    def evaluation_result_path(self, scenario_id, mechanism_type):
+        return os.path.join(
+            self.evaluations_dir, safe_filename(scenario_id), safe_filename(mechanism_type) + ".json"
+        )
+
+    def get_scenario(self, scenario_id):
+        all_data = load_json(SCENARIO_FILE)
+        return copy.deepcopy(all_data.get(scenario_id))
+
+    def save_scenario(self, scenario_id, scenario_data):
+        scenario_data = copy.deepcopy(scenario_data)
+
+        def update(all_data):
+            all_data[scenario_id] = scenario_data
+
+        update_json(SCENARIO_FILE, update)
+        bump_version(SCENARIO_FILE + ".version")
+        bump_version(self.bids_version_path(scenario_id))
+
+    def delete_scenario(self, scenario_id):
+        def update(all_data):
+            return all_data.pop(scenario_id, None) is not None
+
+        if scenario_id not in load_json(SCENARIO_FILE):
+            return False
+        deleted = update_json(SCENARIO_FILE, update)
+        bump_version(SCENARIO_FILE + ".version")
+        bump_version(self.bids_version_path(scenario_id))
+        return deleted
+
+    def list_scenarios(self):
+        return copy_records(load_json(SCENARIO_FILE))
+
+    def scenarios_version(self):
+        # 计数器覆盖通过本模块的写入，文件签名覆盖手工编辑 scenarios.json
+        return read_version(SCENARIO_FILE + ".version"), file_version(SCENARIO_FILE)
+
+    def get_bids(self, scenario_id):
+        return copy_records(load_json(self.bid_shard_path(scenario_id)))
+
+    def save_bid(self, scenario_id, student_id, bid_data):
+        bid_data = copy.deepcopy(bid_data)
+
+        def update(scenario_bids):
+            old_bid = scenario_bids.get(student_id)
+            # 写分片之前加入新参与者的索引
+            self._index_add(scenario_id, student_id, bid_data)
+            scenario_bids[student_id] = bid_data
+            return old_bid
+
+        path = self.bid_shard_path(scenario_id)
+        # 先写报价再递增版本号：读取方先读版本号再读报价，最多把新报价的结果记在旧版本下，不会反过来。
+        # 参与者索引也在分片锁内更新，同一场景的写入按同一顺序作用于报价和索引
+        with file_lock(path):
+            old_bid = update_json(path, update)
+            version = bump_version(self.bids_version_path(scenario_id))
+            self._index_remove(scenario_id, student_id, old_bid, bid_data)
+        return version
+
+    def delete_bid(self, scenario_id, student_id):
+        path = self.bid_shard_path(scenario_id)
+        with file_lock(path):
+            if student_id not in load_json(path, cached=False):
+                return None
+            old_bid = update_json(path, lambda scenario_bids: scenario_bids.pop(student_id))
+            version = bump_version(self.bids_version_path(scenario_id))
+            self._index_remove(scenario_id, student_id, old_bid, None)
+        return version
+
+    def bids_version(self, scenario_id):
+        # 只统计通过本模块的写入；手工修改分片文件后需要清空出清结果缓存
+        return read_version(self.bids_version_path(scenario_id))
+
+    # ---------- 参与者索引 ----------
+
+    # 调用方持有该场景报价的写锁，并且先 _index_add、再写报价、最后 _index_remove：
+    # 中途崩溃时索引只会多出条目（或条目中的报价不是最新的），get_participant_bids 按报价本身过滤和更新
+
+    def _index_add(self, scenario_id, student_id, new_bid):
+        """写入报价之前把它加入新参与者的索引"""
+        new_participant = new_bid.get("participant_id")
+        if not new_participant:
+            return
+        new_bid = copy.deepcopy(new_bid)
+
+        def add(index):
+            scenario_bids = dict(index.get(scenario_id, {}))
+            scenario_bids[student_id] = new_bid
+            index[scenario_id] = scenario_bids
+
+        update_json(self.participant_index_path(new_participant), add)
+
+    def _index_remove(self, scenario_id, student_id, old_bid, new_bid):
+        """写入报价之后，参与者变化或报价撤回（new_bid 为 None）时从旧参与者的索引中移除"""
+        old_participant = (old_bid or {}).get("participant_id")
+        if not old_participant or old_participant == (new_bid or {}).get("participant_id"):
+            return
+
+        def remove(index):
+            scenario_bids = dict(index.get(scenario_id, {}))
+            scenario_bids.pop(student_id, None)
+            if scenario_bids:
+                index[scenario_id] = scenario_bids
+            else:
+                index.pop(scenario_id, None)
+
+        update_json(self.participant_index_path(old_participant), remove)
+
+    def _lookup_bids(self, scenario_id, student_ids):
+        """场景中给定报价ID的当前报价（副本），不存在的忽略"""
+        scenario_bids = load_json(self.bid_shard_path(scenario_id))
+        return {student_id: dict(scenario_bids[student_id]) for student_id in student_ids if student_id in scenario_bids}
+
+    def _iter_all_bids(self):
+        return iter_bid_shards(self.bids_dir)
+
+    def get_participant_bids(self, participant_id):
+        # 索引只用来确定要查看哪些场景和报价，内容以报价本身为准，过滤掉已不属于该参与者的条目
+        index = load_json(self.participant_index_path(participant_id))
+        result = {}
+        for scenario_id, bids in index.items():
+            current = {
+                student_id: bid
+                for student_id, bid in self._lookup_bids(scenario_id, bids).items()
+                if bid.get("participant_id") == participant_id
+            }
+            if current:
+                result[scenario_id] = current
+        return result
+
+    def rebuild_participant_index(self):
+        """扫描全部报价，从头重建参与者索引"""
+        index = {}
+        for scenario_id, scenario_bids in self._iter_all_bids():
+            for student_id, bid in scenario_bids.items():
+                participant_id = bid.get("participant_id")
+                if participant_id:
+                    index.setdefault(participant_id, {}).setdefault(scenario_id, {})[student_id] = bid
+
+        with file_lock(self.participants_dir):
+            os.makedirs(self.participants_dir, exist_ok=True)
+            for participant_id, participant_bids in index.items():
+                path = self.participant_index_path(participant_id)
+                with file_lock(path):
+                    save_json(path, participant_bids)
+            # 删除已经没有报价的参与者索引
+            current = {safe_filename(participant_id) + ".json" for participant_id in index}
+            for filename in os.listdir(self.participants_dir):
+                if filename.endswith(".json") and filename not in current:
+                    os.remove(os.path.join(self.participants_dir, filename))
+        return len(index)
+
+    # ---------- 班级与实验任务 ----------
+
+    def _migrate_class_files(self):
+        """把旧的 classes.json / assignments.json 拆分到按主键的分片，完成后重命名为 *.migrated"""
+        for legacy_path, save in ((CLASSES_FILE, self.save_class), (ASSIGNMENTS_FILE, self.save_assignment)):
+            if not os.path.exists(legacy_path):
+                continue
+            with file_lock(legacy_path):
+                if not os.path.exists(legacy_path):
+                    continue
+                for record in load_json(legacy_path, strict=True, cached=False).values():
+                    save(record)
+                os.replace(legacy_path, legacy_path + ".migrated")
+
+    def get_class(self, class_id):
+        class_info = load_json(self.class_path(class_id))
+        return copy.deepcopy(class_info) if class_info else None
+
+    def save_class(self, class_info):
+        class_info = json_compatible(class_info)
+        path = self.class_path(class_info["class_id"])
+        with file_lock(path):
+            save_json(path, class_info)
+        bump_version(os.path.join(self.classes_dir, ".version"))
+
+    def delete_class(self, class_id):
+        path = self.class_path(class_id)
+        with file_lock(path):
+            if not os.path.exists(path):
+                return False
+            os.remove(path)
+        bump_version(os.path.join(self.classes_dir, ".version"))
+        return True
+
+    def list_classes(self):
+        return {
+            class_info["class_id"]: copy.deepcopy(class_info)
+            for _, class_info in iter_json_shards(self.classes_dir)
+            if class_info
+        }
+
+    def classes_version(self):
+        return read_version(os.path.join(self.classes_dir, ".version"))
+
+    def save_assignment(self, assignment):
+        assignment = json_compatible(assignment)
+        assignment_id = assignment["assignment_id"]
+        class_id = assignment["class_id"]
+
+        def add_to_class(assignments):
+            assignments[assignment_id] = assignment
+
+        def add_to_scenario(index):
+            index[assignment_id] = class_id
+
+        update_json(self.assignment_shard_path(class_id), add_to_class)
+        update_json(self.scenario_assignment_index_path(assignment["scenario_id"]), add_to_scenario)
+
+    def get_class_assignments(self, class_id):
+        return list(copy_records(load_json(self.assignment_shard_path(class_id))).values())
+
+    def get_scenario_assignments(self, scenario_id):
+        index = load_json(self.scenario_assignment_index_path(scenario_id))
+        assignments = []
+        for class_id in dict.fromkeys(index.values()):
+            class_assignments = load_json(self.assignment_shard_path(class_id))
+            for assignment_id, assignment in class_assignments.items():
+                if assignment_id in index:
+                    assignments.append(dict(assignment))
+        return assignments
+
+    # ---------- 评估标准与评估结果 ----------
+
+    def get_evaluation_criteria(self, scenario_id):
+        all_data = load_json(EVALUATION_CRITERIA_FILE)
+        return copy.deepcopy(all_data.get(scenario_id))
+
+    def save_evaluation_criteria(self, scenario_id, criteria_data):
+        criteria_data = copy.deepcopy(criteria_data)
+
+        def update(all_data):
+            all_data[scenario_id] = criteria_data
+
+        update_json(EVALUATION_CRITERIA_FILE, update)
+
+    def list_evaluation_criteria(self):
+        return copy_records(load_json(EVALUATION_CRITERIA_FILE))
+
+    def get_evaluation_result(self, scenario_id, mechanism_type):
+        path = self.evaluation_result_path(scenario_id, mechanism_type)
+        if not os.path.exists(path):
+            # 兼容旧版本写在 mock_data 根目录下的评估结果文件
+            path = os.path.join(BASE_PATH, f"evaluation_{scenario_id}_{mechanism_type}.json")
+            if not os.path.exists(path):
+                return None
+        return copy.deepcopy(load_json(path))
+
+    def save_evaluation_result(self, scenario_id, mechanism_type, result):
+        path = self.evaluation_result_path(scenario_id, mechanism_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with file_lock(path):
+            save_json(path, json_compatible(result))
+
+
+def create_storage(name):
+    """按名称创建存储后端"""
+    if name == "json":
+        return JsonStorageBackend()
+    if name == "sqlite":
+        from mock_data.sqlite_storage import SqliteStorageBackend
+        return SqliteStorageBackend()
+    if name == "journal":
+        from mock_data.bid_journal import JournalStorageBackend
+        return JournalStorageBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+_storage = None
+
+
+def get_storage():
+    """获取当前进程使用的存储后端（首次调用时按 STORAGE_BACKEND 创建）"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(STORAGE_BACKEND)
+    return _storage
+
+
+def set_storage(backend):
+    """替换当前进程使用的存储后端"""
+    global _storage
+    _storage = backend
 
 
 # ---------- 场景管理 ----------
 
 def get_scenario(scenario_id):
-    all_data = load_json(SCENARIO_FILE)
-    return all_data.get(scenario_id)
+    return get_storage().get_scenario(scenario_id)
 
 
 def save_scenario(scenario_id, scenario_data):
-    all_data = load_json(SCENARIO_FILE)
-    all_data[scenario_id] = scenario_data
-    save_json(SCENARIO_FILE, all_data)
+    get_storage().save_scenario(scenario_id, scenario_data)
 
 
 def delete_scenario(scenario_id):
-    all_data = load_json(SCENARIO_FILE)
-    if scenario_id in all_data:
-        del all_data[scenario_id]
-        save_json(SCENARIO_FILE, all_data)
-        return True
-    return False
+    return get_storage().delete_scenario(scenario_id)
 
 
 def list_scenarios():
-    return load_json(SCENARIO_FILE)
+    return get_storage().list_scenarios()
+
+
+def scenarios_version():
+    return get_storage().scenarios_version()
 
 
 # ---------- 报价管理 ----------
 
 def get_bids(scenario_id):
-    all_data = load_json(BIDS_FILE)
-    return all_data.get(scenario_id, {})
+    return get_storage().get_bids(scenario_id)
+
+
+# 报价写入/撤回后的回调 listener(scenario_id, student_id, bid_data, version)；撤回时 bid_data 为 None
+_bid_listeners = []
+
+
+def add_bid_listener(listener):
+    """登记报价变化回调（增量报价簿等派生数据用它保持同步）"""
+    if listener not in _bid_listeners:
+        _bid_listeners.append(listener)
+
+
+def _notify_bid_listeners(scenario_id, student_id, bid_data, version):
+    for listener in _bid_listeners:
+        listener(scenario_id, student_id, bid_data, version)
+
+
+def is_finite_bid(bid_data):
+    """报价中的数值（含逐时段列表）都是有限数；NaN / Infinity 写入后无法作为合法 JSON 读取，也会破坏出清"""
+    for value in bid_data.values():
+        values = value if isinstance(value, list) else [value]
+        if any(isinstance(item, float) and not math.isfinite(item) for item in values):
+            return False
+    return True
 
 
 def save_bid(scenario_id, student_id, bid_data):
-    all_data = load_json(BIDS_FILE)
-    if scenario_id not in all_data:
-        all_data[scenario_id] = {}
-    all_data[scenario_id][student_id] = bid_data
-    save_json(BIDS_FILE, all_data)
+    """保存报价；含 NaN / Infinity 时抛出 ValueError"""
+    if not is_finite_bid(bid_data):
+        raise ValueError("Bid values must be finite numbers")
+    version = get_storage().save_bid(scenario_id, student_id, bid_data)
+    _notify_bid_listeners(scenario_id, student_id, bid_data, version)
+    return version
+
+
+def delete_bid(scenario_id, student_id):
+    """撤回报价；报价不存在时返回 None"""
+    version = get_storage().delete_bid(scenario_id, student_id)
+    if version is not None:
+        _notify_bid_listeners(scenario_id, student_id, None, version)
+    return version
+
+
+def bids_version(scenario_id):
+    return get_storage().bids_version(scenario_id)
 
 
 # ---------- 评估标准管理 ----------
 
 def get_evaluation_criteria(scenario_id):
-    all_data = load_json(EVALUATION_CRITERIA_FILE)
-    return all_data.get(scenario_id)
+    return get_storage().get_evaluation_criteria(scenario_id)
 
 
 def save_evaluation_criteria(scenario_id, criteria_data):
-    all_data = load_json(EVALUATION_CRITERIA_FILE)
-    all_data[scenario_id] = criteria_data
-    save_json(EVALUATION_CRITERIA_FILE, all_data)
+    get_storage().save_evaluation_criteria(scenario_id, criteria_data)
 
 
 def list_evaluation_criteria():
-    return load_json(EVALUATION_CRITERIA_FILE)
+    return get_storage().list_evaluation_criteria()
+
+
+# ---------- 评估结果管理 ----------
+
+def get_evaluation_result(scenario_id, mechanism_type):
+    return get_storage().get_evaluation_result(scenario_id, mechanism_type)
+
+
+def save_evaluation_result(scenario_id, mechanism_type, result):
+    get_storage().save_evaluation_result(scenario_id, mechanism_type, result)
+
+
+# ---------- 参与者索引 ----------
+
+def get_participant_bids(participant_id):
+    return get_storage().get_participant_bids(participant_id)
+
+
+def rebuild_participant_index():
+    return get_storage().rebuild_participant_index()
+
+
+# ---------- 班级管理 ----------
+
+def get_class_info(class_id):
+    return get_storage().get_class(class_id)
+
+
+def save_class_info(class_info):
+    get_storage().save_class(class_info)
+
+
+def delete_class_info(class_id):
+    return get_storage().delete_class(class_id)
+
+
+def list_classes():
+    return get_storage().list_classes()
+
+
+def classes_version():
+    return get_storage().classes_version()
+
+
+# ---------- 实验任务管理 ----------
+
+def save_experiment_assignment(assignment):
+    get_storage().save_assignment(assignment)
+
+
+def get_experiment_assignments(class_id):
+    return get_storage().get_class_assignments(class_id)
+
+
+def get_scenario_assignments(scenario_id):
+    return get_storage().get_scenario_assignments(scenario_id)
@@ -0,0 +1,430 @@
+# mock_data/sqlite_storage.py
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from urllib.parse import unquote
+
+from mock_data.file_storage import (
+    BASE_PATH, SCENARIO_FILE, BIDS_FILE, EVALUATION_CRITERIA_FILE, EVALUATIONS_DIR,
+    CLASSES_FILE, CLASSES_DIR, ASSIGNMENTS_FILE, ASSIGNMENTS_DIR,
+    StorageBackend, load_json, iter_bid_shards, iter_json_shards, key_from_filename, json_compatible
+)
+
+SQLITE_FILE = os.environ.get("STORAGE_SQLITE_PATH", os.path.join(BASE_PATH, "storage.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bids (
+    scenario_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    participant_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scenario_id, student_id)
+);
+CREATE TABLE IF NOT EXISTS evaluation_criteria (
+    scenario_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evaluation_results (
+    scenario_id TEXT NOT NULL,
+    mechanism_type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scenario_id, mechanism_type)
+);
+CREATE TABLE IF NOT EXISTS classes (
+    class_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    assignment_id TEXT PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    scenario_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assignments_by_class ON assignments (class_id);
+CREATE INDEX IF NOT EXISTS assignments_by_scenario ON assignments (scenario_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+class SqliteStorageBackend(StorageBackend):
+    """SQLite（WAL 模式）存储，按行 upsert，每个 worker 进程复用一个连接"""
+
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_FILE
+        self._conn = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(SCHEMA)
+        _upgrade_schema(conn)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if row is None:
+            migrate_from_json(conn)
+        return conn
+
+    def connection(self):
+        # uvicorn 多 worker 时每个进程各自建立连接，fork 后不复用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._connect()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _query_one(self, sql, params):
+        with self._lock:
+            row = self.connection().execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _query_map(self, sql, params=()):
+        with self._lock:
+            rows = self.connection().execute(sql, params).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def _execute(self, sql, params):
+        with self._lock:
+            return self.connection().execute(sql, params)
+
+    def _transaction(self, statements, version_key=None):
+        """在一个事务内执行多条语句，并可同时递增 meta 中的版本号（version_key 可以是多个）"""
+        return self._versioned_transaction(statements, version_key)[0]
+
+    def _versioned_transaction(self, statements, version_key=None):
+        """同 _transaction，返回 (影响行数, 第一个版本键递增后的值)；没有写入时版本号为 None"""
+        with self._lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rowcount = 0
+                version = None
+                for sql, params in statements:
+                    rowcount += conn.execute(sql, params).rowcount
+                if version_key is not None and rowcount:
+                    keys = (version_key,) if isinstance(version_key, str) else version_key
+                    for key in keys:
+                        _bump_version(conn, key)
+                    # 在同一事务内读取，不会混入其他进程之后的写入
+                    version = int(conn.execute("SELECT value FROM meta WHERE key = ?", (keys[0],)).fetchone()[0])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return rowcount, version
+
+    def _version(self, key):
+        with self._lock:
+            row = self.connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    # ---------- 场景管理 ----------
+
+    def get_scenario(self, scenario_id):
+        return self._query_one("SELECT data FROM scenarios WHERE scenario_id = ?", (scenario_id,))
+
+    def save_scenario(self, scenario_id, scenario_data):
+        self._transaction([(
+            "INSERT INTO scenarios (scenario_id, data) VALUES (?, ?) "
+            "ON CONFLICT(scenario_id) DO UPDATE SET data = excluded.data",
+            (scenario_id, _dumps(scenario_data))
+        )], version_key=("scenarios_version", _bids_version_key(scenario_id)))
+
+    def delete_scenario(self, scenario_id):
+        rowcount = self._transaction(
+            [("DELETE FROM scenarios WHERE scenario_id = ?", (scenario_id,))],
+            version_key=("scenarios_version", _bids_version_key(scenario_id))
+        )
+        return rowcount > 0
+
+    def list_scenarios(self):
+        return self._query_map("SELECT scenario_id, data FROM scenarios ORDER BY rowid")
+
+    def scenarios_version(self):
+        return self._version("scenarios_version")
+
+    # ---------- 报价管理 ----------
+
+    def get_bids(self, scenario_id):
+        # upsert 保留原 rowid，因此顺序与 JSON 字典的首次插入顺序一致
+        return self._query_map(
+            "SELECT student_id, data FROM bids WHERE scenario_id = ? ORDER BY rowid", (scenario_id,)
+        )
+
+    def save_bid(self, scenario_id, student_id, bid_data):
+        # 报价和版本号在同一个事务中写入
+        return self._versioned_transaction([(
+            "INSERT INTO bids (scenario_id, student_id, participant_id, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(scenario_id, student_id) DO UPDATE SET "
+            "participant_id = excluded.participant_id, data = excluded.data",
+            (scenario_id, student_id, bid_data.get("participant_id"), _dumps(bid_data))
+        )], version_key=_bids_version_key(scenario_id))[1]
+
+    def delete_bid(self, scenario_id, student_id):
+        return self._versioned_transaction(
+            [("DELETE FROM bids WHERE scenario_id = ? AND student_id = ?", (scenario_id, student_id))],
+            version_key=_bids_version_key(scenario_id)
+        )[1]
+
+    def bids_version(self, scenario_id):
+        return self._version(_bids_version_key(scenario_id))
+
+    # ---------- 参与者索引 ----------
+
+    def get_participant_bids(self, participant_id):
+        with self._lock:
+            rows = self.connection().execute(
+                "SELECT scenario_id, student_id, data FROM bids WHERE participant_id = ? ORDER BY rowid",
+                (participant_id,)
+            ).fetchall()
+        result = {}
+        for scenario_id, student_id, data in rows:
+            result.setdefault(scenario_id, {})[student_id] = json.loads(data)
+        return result
+
+    def rebuild_participant_index(self):
+        with self._lock:
+            conn = self.connection()
+            _backfill_participants(conn)
+            return conn.execute("SELECT COUNT(DISTINCT participant_id) FROM bids").fetchone()[0]
+
+    # ---------- 评估标准管理 ----------
+
+    def get_evaluation_criteria(self, scenario_id):
+        return self._query_one("SELECT data FROM evaluation_criteria WHERE scenario_id = ?", (scenario_id,))
+
+    def save_evaluation_criteria(self, scenario_id, criteria_data):
+        self._execute(
+            "INSERT INTO evaluation_criteria (scenario_id, data) VALUES (?, ?) "
+            "ON CONFLICT(scenario_id) DO UPDATE SET data = excluded.data",
+            (scenario_id, _dumps(criteria_data))
+        )
+
+    def list_evaluation_criteria(self):
+        return self._query_map("SELECT scenario_id, data FROM evaluation_criteria ORDER BY rowid")
+
+    # ---------- 班级与实验任务 ----------
+
+    def get_class(self, class_id):
+        return self._query_one("SELECT data FROM classes WHERE class_id = ?", (class_id,))
+
+    def save_class(self, class_info):
+        class_info = json_compatible(class_info)
+        self._transaction([(
+            "INSERT INTO classes (class_id, data) VALUES (?, ?) "
+            "ON CONFLICT(class_id) DO UPDATE SET data = excluded.data",
+            (class_info["class_id"], _dumps(class_info))
+        )], version_key="classes_version")
+
+    def delete_class(self, class_id):
+        rowcount = self._transaction(
+            [("DELETE FROM classes WHERE class_id = ?", (class_id,))],
+            version_key="classes_version"
+        )
+        return rowcount > 0
+
+    def list_classes(self):
+        return self._query_map("SELECT class_id, data FROM classes ORDER BY rowid")
+
+    def classes_version(self):
+        return self._version("classes_version")
+
+    def save_assignment(self, assignment):
+        assignment = json_compatible(assignment)
+        self._execute(
+            "INSERT INTO assignments (assignment_id, class_id, scenario_id, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(assignment_id) DO UPDATE SET "
+            "class_id = excluded.class_id, scenario_id = excluded.scenario_id, data = excluded.data",
+            (assignment["assignment_id"], assignment["class_id"], assignment["scenario_id"], _dumps(assignment))
+        )
+
+    def get_class_assignments(self, class_id):
+        return list(self._query_map(
+            "SELECT assignment_id, data FROM assignments WHERE class_id = ? ORDER BY rowid", (class_id,)
+        ).values())
+
+    def get_scenario_assignments(self, scenario_id):
+        return list(self._query_map(
+            "SELECT assignment_id, data FROM assignments WHERE scenario_id = ? ORDER BY rowid", (scenario_id,)
+        ).values())
+
+    # ---------- 评估结果管理 ----------
+
+    def get_evaluation_result(self, scenario_id, mechanism_type):
+        return self._query_one(
+            "SELECT data FROM evaluation_results WHERE scenario_id = ? AND mechanism_type = ?",
+            (scenario_id, mechanism_type)
+        )
+
+    def save_evaluation_result(self, scenario_id, mechanism_type, result):
+        self._execute(
+            "INSERT INTO evaluation_results (scenario_id, mechanism_type, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(scenario_id, mechanism_type) DO UPDATE SET data = excluded.data",
+            (scenario_id, mechanism_type, _dumps(json_compatible(result)))
+        )
+
+
+def _bids_version_key(scenario_id):
+    return "bids_version:" + scenario_id
+
+
+def _bump_version(conn, key):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (key,)
+    )
+
+
+def _backfill_participants(conn):
+    rows = conn.execute("SELECT rowid, data FROM bids").fetchall()
+    conn.executemany(
+        "UPDATE bids SET participant_id = ? WHERE rowid = ?",
+        [(json.loads(data).get("participant_id"), rowid) for rowid, data in rows]
+    )
+
+
+def _upgrade_schema(conn):
+    """为旧版本数据库补充参与者列和索引"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(bids)")]
+    if "participant_id" not in columns:
+        conn.execute("ALTER TABLE bids ADD COLUMN participant_id TEXT")
+        _backfill_participants(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS bids_by_participant ON bids (participant_id)")
+
+
+def _load_all_bids():
+    """旧的 bids.json 与按场景分片的报价合并（分片优先）"""
+    all_bids = {scenario_id: dict(bids) for scenario_id, bids in load_json(BIDS_FILE).items()}
+    for scenario_id, bids in iter_bid_shards():
+        all_bids.setdefault(scenario_id, {}).update(bids)
+    return all_bids
+
+
+def _load_keyed_records(legacy_path, directory, key):
+    """旧的单文件记录与分片目录中的记录合并（分片优先）"""
+    records = dict(load_json(legacy_path))
+    for _, shard in iter_json_shards(directory):
+        if key in shard:
+            # 班级分片本身就是一条记录
+            records[shard[key]] = shard
+        else:
+            # 实验任务分片是 {assignment_id: assignment}
+            records.update(shard)
+    return records
+
+
+def _load_all_evaluation_results():
+    results = []
+    if not os.path.isdir(EVALUATIONS_DIR):
+        return results
+    for dirname in sorted(os.listdir(EVALUATIONS_DIR)):
+        scenario_dir = os.path.join(EVALUATIONS_DIR, dirname)
+        if not os.path.isdir(scenario_dir):
+            continue
+        for filename in sorted(os.listdir(scenario_dir)):
+            if filename.endswith(".json"):
+                results.append((
+                    unquote(dirname),
+                    key_from_filename(filename, ".json"),
+                    load_json(os.path.join(scenario_dir, filename))
+                ))
+    return results
+
+
+def migrate_from_json(conn):
+    """将现有 JSON 文件导入 SQLite（已存在的行以 JSON 文件为准覆盖）"""
+    scenarios = load_json(SCENARIO_FILE)
+    bids = _load_all_bids()
+    criteria = load_json(EVALUATION_CRITERIA_FILE)
+    evaluation_results = _load_all_evaluation_results()
+    classes = _load_keyed_records(CLASSES_FILE, CLASSES_DIR, "class_id")
+    assignments = _load_keyed_records(ASSIGNMENTS_FILE, ASSIGNMENTS_DIR, "assignment_id")
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT INTO scenarios (scenario_id, data) VALUES (?, ?) "
+            "ON CONFLICT(scenario_id) DO UPDATE SET data = excluded.data",
+            [(scenario_id, _dumps(data)) for scenario_id, data in scenarios.items()]
+        )
+        conn.executemany(
+            "INSERT INTO bids (scenario_id, student_id, participant_id, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(scenario_id, student_id) DO UPDATE SET "
+            "participant_id = excluded.participant_id, data = excluded.data",
+            [
+                (scenario_id, student_id, bid.get("participant_id"), _dumps(bid))
+                for scenario_id, scenario_bids in bids.items()
+                for student_id, bid in scenario_bids.items()
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO evaluation_criteria (scenario_id, data) VALUES (?, ?) "
+            "ON CONFLICT(scenario_id) DO UPDATE SET data = excluded.data",
+            [(scenario_id, _dumps(data)) for scenario_id, data in criteria.items()]
+        )
+        conn.executemany(
+            "INSERT INTO evaluation_results (scenario_id, mechanism_type, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(scenario_id, mechanism_type) DO UPDATE SET data = excluded.data",
+            [(scenario_id, mechanism_type, _dumps(data)) for scenario_id, mechanism_type, data in evaluation_results]
+        )
+        conn.executemany(
+            "INSERT INTO classes (class_id, data) VALUES (?, ?) "
+            "ON CONFLICT(class_id) DO UPDATE SET data = excluded.data",
+            [(class_id, _dumps(data)) for class_id, data in classes.items()]
+        )
+        conn.executemany(
+            "INSERT INTO assignments (assignment_id, class_id, scenario_id, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(assignment_id) DO UPDATE SET "
+            "class_id = excluded.class_id, scenario_id = excluded.scenario_id, data = excluded.data",
+            [
+                (assignment_id, data["class_id"], data["scenario_id"], _dumps(data))
+                for assignment_id, data in assignments.items()
+            ]
+        )
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('json_migrated', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return {
+        "scenarios": len(scenarios),
+        "bids": sum(len(scenario_bids) for scenario_bids in bids.values()),
+        "evaluation_criteria": len(criteria),
+        "evaluation_results": len(evaluation_results),
+        "classes": len(classes),
+        "assignments": len(assignments)
+    }
+
+
+if __name__ == "__main__":
+    # 手动迁移：python -m mock_data.sqlite_storage migrate [db_path]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python -m mock_data.sqlite_storage migrate [db_path]")
+        sys.exit(1)
+    backend = SqliteStorageBackend(sys.argv[2] if len(sys.argv) > 2 else None)
+    counts = migrate_from_json(backend.connection())
+    print(f"Migrated {counts['scenarios']} scenarios, {counts['bids']} bids, "
+          f"{counts['evaluation_criteria']} evaluation criteria, {counts['evaluation_results']} evaluation results, "
+          f"{counts['classes']} classes, {counts['assignments']} assignments into {backend.path}")
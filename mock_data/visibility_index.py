@@ -0,0 +1,86 @@
+# mock_data/visibility_index.py
+
+import copy
+import threading
+from collections import defaultdict
+
+from mock_data.file_storage import list_scenarios, scenarios_version, list_classes, classes_version
+
+
+class VisibilityIndex:
+    """用户可见场景的预计算索引
+
+    - open_scenarios：开放给所有用户的场景
+    - participant_scenarios：用户 -> 在 participants 名单中的场景
+    - user_classes：用户 -> 所在班级
+    - class_scenarios：班级 -> 关联的场景
+    """
+
+    def __init__(self, scenarios, classes):
+        self.scenarios = scenarios
+        self.order = {scenario_id: i for i, scenario_id in enumerate(scenarios)}
+        self.open_scenarios = set()
+        self.participant_scenarios = defaultdict(set)
+        self.user_classes = defaultdict(set)
+        self.class_scenarios = defaultdict(set)
+
+        for scenario_id, scenario in scenarios.items():
+            if scenario.get("is_open", False):
+                self.open_scenarios.add(scenario_id)
+            for user_id in scenario.get("participants", []):
+                self.participant_scenarios[user_id].add(scenario_id)
+            class_id = scenario.get("class_id")
+            if class_id:
+                self.class_scenarios[class_id].add(scenario_id)
+
+        for class_id, class_info in classes.items():
+            for user_id in class_info.get("students", []):
+                self.user_classes[user_id].add(class_id)
+
+    def visible_scenario_ids(self, user_id):
+        visible = set(self.open_scenarios)
+        visible |= self.participant_scenarios.get(user_id, set())
+        for class_id in self.user_classes.get(user_id, ()):
+            visible |= self.class_scenarios.get(class_id, set())
+        return sorted(visible, key=self.order.__getitem__)
+
+    def can_participate(self, user_id, scenario_id):
+        if scenario_id in self.open_scenarios:
+            return True
+        if scenario_id in self.participant_scenarios.get(user_id, ()):
+            return True
+        return any(
+            scenario_id in self.class_scenarios.get(class_id, ())
+            for class_id in self.user_classes.get(user_id, ())
+        )
+
+    def visible_scenarios(self, user_id):
+        """按场景列表原有顺序返回用户可见的场景（副本）"""
+        return [copy.deepcopy(self.scenarios[scenario_id]) for scenario_id in self.visible_scenario_ids(user_id)]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def _current_version():
+    return scenarios_version(), classes_version()
+
+
+def get_visibility_index():
+    """返回最新的可见性索引；场景或班级数据变化（版本号改变）后自动重建"""
+    global _index, _index_version
+    version = _current_version()
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = VisibilityIndex(list_scenarios(), list_classes())
+            _index_version = version
+        return _index
+
+
+def invalidate_visibility_index():
+    global _index, _index_version
+    with _index_lock:
+        _index = None
+        _index_version = None
@@ -2,7 +2,8 @@
 
 from fastapi import APIRouter, HTTPException
 from schemas.simulation import ScenarioCreateRequest
-from mock_data.file_storage import get_scenario, save_scenario
+from mock_data.file_storage import get_scenario, save_scenario, json_cache_stats, rebuild_participant_index
+from services.market_clear.result_cache import result_cache_stats, clear_result_cache
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -13,3 +14,28 @@ def create_scenario(req: ScenarioCreateRequest):
         raise HTTPException(status_code=400, detail="Scenario already exists")
     save_scenario(req.scenario_id, req.dict())
     return {"message": "Scenario created"}
+
+
+@router.get("/storage/cache-stats")
+def get_storage_cache_stats():
+    """load_json 解析缓存的命中/未命中统计"""
+    return json_cache_stats()
+
+
+@router.post("/storage/rebuild-participant-index")
+def rebuild_participant_bid_index():
+    """从全部报价重建 参与者 -> 报价 索引"""
+    return {"participants": rebuild_participant_index()}
+
+
+@router.get("/result-cache/stats")
+def get_result_cache_stats():
+    """出清结果缓存的命中/未命中统计"""
+    return result_cache_stats()
+
+
+@router.post("/result-cache/clear")
+def clear_clearing_result_cache():
+    """清空出清结果缓存（手工修改场景文件后使用）"""
+    clear_result_cache()
+    return {"message": "Result cache cleared"}
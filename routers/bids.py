@@ -3,7 +3,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.security import OAuth2PasswordBearer
 from security import decode_access_token
-from mock_data.file_storage import get_bids, save_bid
+from mock_data.file_storage import get_bids, save_bid, delete_bid, get_scenario, get_participant_bids
 from mock_data.mock_users import mock_users
 from typing import List, Dict, Any
 import json
@@ -35,11 +35,28 @@ def submit_bid(bid_data: Dict[str, Any], token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=400, detail="Scenario ID is required")
     
     # Save bid
-    save_bid(scenario_id, user_id, bid_data)
+    try:
+        save_bid(scenario_id, user_id, bid_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"message": "Bid submitted successfully", "bid": bid_data}
 
 
+@router.delete("/{scenario_id}")
+def withdraw_bid(scenario_id: str, token: str = Depends(oauth2_scheme)):
+    """Withdraw the current user's bid for a scenario"""
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user_id = payload.get("sub")
+    if delete_bid(scenario_id, user_id) is None:
+        raise HTTPException(status_code=404, detail="Bid not found")
+
+    return {"message": "Bid withdrawn successfully"}
+
+
 @router.get("/my-bids")
 def get_my_bids(scenario_id: str = Query(None), token: str = Depends(oauth2_scheme)):
     """Get current user's bids"""
@@ -49,27 +66,27 @@ def get_my_bids(scenario_id: str = Query(None), token: str = Depends(oauth2_sche
     
     user_id = payload.get("sub")
     
+    # 通过参与者索引只读取当前用户自己的报价
+    participant_bids = get_participant_bids(user_id)
+    
     if scenario_id:
         # Get bids for specific scenario
-        all_bids = get_bids(scenario_id)
         my_bids = []
-        for bid_id, bid in all_bids.items():
-            if bid.get("participant_id") == user_id:
-                bid["id"] = bid_id
-                my_bids.append(bid)
+        for bid_id, bid in participant_bids.get(scenario_id, {}).items():
+            bid["id"] = bid_id
+            my_bids.append(bid)
     else:
         # Get all user's bids across all scenarios
-        from mock_data.file_storage import list_scenarios
-        scenarios = list_scenarios()
         my_bids = []
         
-        for scenario_id, scenario in scenarios.items():
-            scenario_bids = get_bids(scenario_id)
+        for scenario_id, scenario_bids in participant_bids.items():
+            scenario = get_scenario(scenario_id)
+            if not scenario:
+                continue
             for bid_id, bid in scenario_bids.items():
-                if bid.get("participant_id") == user_id:
-                    bid["id"] = bid_id
-                    bid["scenario_name"] = scenario.get("name", scenario_id)
-                    my_bids.append(bid)
+                bid["id"] = bid_id
+                bid["scenario_name"] = scenario.get("name", scenario_id)
+                my_bids.append(bid)
     
     return my_bids
 
@@ -6,6 +6,11 @@ from schemas.classes import (
     ClassInfo, ClassMember, ExperimentAssignment, StudentProgress
 )
 from mock_data.mock_users import mock_users
+from mock_data.async_storage import (
+    get_class_info, save_class_info, delete_class_info, list_classes,
+    save_experiment_assignment, get_experiment_assignments,
+    get_scenario, get_bids, get_visibility_index
+)
 from security import decode_access_token
 from typing import List, Dict
 import json
@@ -42,7 +47,7 @@ async def create_class(
     }
     
     # Save class information
-    save_class_info(class_info)
+    await save_class_info(class_info)
     
     return {
         "message": "Class created successfully",
@@ -61,7 +66,7 @@ async def get_my_classes(token: str = Depends(oauth2_scheme)):
     user_id = payload.get("sub")
     user_role = payload.get("role")
     
-    all_classes = load_all_classes()
+    all_classes = await list_classes()
     my_classes = []
     
     if user_role == "teacher":
@@ -73,9 +78,10 @@ async def get_my_classes(token: str = Depends(oauth2_scheme)):
                 class_info["student_count"] = len(class_info.get("students", []))
                 my_classes.append(class_info)
     else:
-        # Student: get classes they belong to
+        # Student: get classes they belong to (membership comes from the visibility index)
+        my_class_ids = (await get_visibility_index()).user_classes.get(user_id, ())
         for class_id, class_info in all_classes.items():
-            if user_id in class_info.get("students", []):
+            if class_id in my_class_ids:
                 class_info["id"] = class_id
                 class_info["name"] = class_info["class_name"]  # Add name field for frontend
                 class_info["student_count"] = len(class_info.get("students", []))
@@ -96,7 +102,7 @@ async def add_student_to_class(
         raise HTTPException(status_code=403, detail="Only teachers can add students")
     
     # Get class information
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info:
         raise HTTPException(status_code=404, detail="Class not found")
     
@@ -120,7 +126,7 @@ async def add_student_to_class(
         class_info["students"].append(student_username)
         
         # Save updates
-        save_class_info(class_info)
+        await save_class_info(class_info)
         
         return {
             "message": "Student added successfully",
@@ -145,7 +151,7 @@ async def remove_student_from_class(
         raise HTTPException(status_code=403, detail="Only teachers can remove students")
     
     # Get class information
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info:
         raise HTTPException(status_code=404, detail="Class not found")
     
@@ -158,7 +164,7 @@ async def remove_student_from_class(
         class_info["students"].remove(student_id)
         
         # Save updates
-        save_class_info(class_info)
+        await save_class_info(class_info)
         
         return {
             "message": "Student removed successfully",
@@ -197,7 +203,7 @@ async def get_student_classes(
     if not payload or payload.get("role") != "teacher":
         raise HTTPException(status_code=403, detail="Only teachers can view student classes")
     
-    all_classes = load_all_classes()
+    all_classes = await list_classes()
     student_classes = []
     
     for class_info in all_classes.values():
@@ -226,13 +232,12 @@ async def assign_experiment(
         raise HTTPException(status_code=403, detail="Only teachers can assign experiments")
     
     # Check class permissions
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info or class_info["teacher_id"] != payload.get("sub"):
         raise HTTPException(status_code=403, detail="You are not the teacher of this class")
     
     # Check if scenario exists
-    from mock_data.file_storage import get_scenario
-    scenario = get_scenario(scenario_id)
+    scenario = await get_scenario(scenario_id)
     if not scenario:
         raise HTTPException(status_code=404, detail="Scenario not found")
     
@@ -253,7 +258,7 @@ async def assign_experiment(
     )
     
     # Save assignment
-    save_experiment_assignment(assignment.dict())
+    await save_experiment_assignment(assignment.dict())
     
     return {
         "message": "Experiment assigned successfully",
@@ -274,12 +279,12 @@ async def get_class_progress(
         raise HTTPException(status_code=403, detail="Only teachers can view class progress")
     
     # Check class permissions
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info or class_info["teacher_id"] != payload.get("sub"):
         raise HTTPException(status_code=403, detail="You are not the teacher of this class")
     
     # Get experiment assignments
-    assignments = get_experiment_assignments(class_id)
+    assignments = await get_experiment_assignments(class_id)
     if assignment_id:
         assignments = [a for a in assignments if a["assignment_id"] == assignment_id]
     
@@ -290,8 +295,7 @@ async def get_class_progress(
         students = class_info["students"]
         
         # Get bid data
-        from mock_data.file_storage import get_bids
-        bid_data = get_bids(scenario_id)
+        bid_data = await get_bids(scenario_id)
         
         # Calculate progress for each student
         for student_id in students:
@@ -327,13 +331,15 @@ async def get_my_assignments(token: str = Depends(oauth2_scheme)):
     student_id = payload.get("sub")
     
     # Get classes the student belongs to
-    all_classes = load_all_classes()
-    my_classes = [cls for cls in all_classes if student_id in cls["students"]]
+    my_class_ids = (await get_visibility_index()).user_classes.get(student_id, ())
+    my_classes = [await get_class_info(class_id) for class_id in sorted(my_class_ids)]
     
     # Get all experiment assignments
     all_assignments = []
     for class_info in my_classes:
-        assignments = get_experiment_assignments(class_info["class_id"])
+        if not class_info:
+            continue
+        assignments = await get_experiment_assignments(class_info["class_id"])
         for assignment in assignments:
             assignment["class_name"] = class_info["class_name"]
             all_assignments.append(assignment)
@@ -351,7 +357,7 @@ async def get_class_details(
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info:
         raise HTTPException(status_code=404, detail="Class not found")
     
@@ -396,7 +402,7 @@ async def delete_class(
     if not payload or payload.get("role") != "teacher":
         raise HTTPException(status_code=403, detail="Only teachers can delete classes")
     
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info:
         raise HTTPException(status_code=404, detail="Class not found")
     
@@ -404,15 +410,8 @@ async def delete_class(
     if class_info["teacher_id"] != payload.get("sub"):
         raise HTTPException(status_code=403, detail="You are not the teacher of this class")
     
-    # Delete class from the JSON file
-    all_classes = load_all_classes()
-    if class_id in all_classes:
-        del all_classes[class_id]
-        
-        # Save updated classes back to file
-        filename = "mock_data/classes.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(all_classes, f, ensure_ascii=False, indent=2, default=str)
+    # Delete class from storage
+    await delete_class_info(class_id)
     
     return {"message": "Class deleted successfully"}
 
@@ -428,7 +427,7 @@ async def update_class(
     if not payload or payload.get("role") != "teacher":
         raise HTTPException(status_code=403, detail="Only teachers can update classes")
     
-    class_info = get_class_info(class_id)
+    class_info = await get_class_info(class_id)
     if not class_info:
         raise HTTPException(status_code=404, detail="Class not found")
     
@@ -445,7 +444,7 @@ async def update_class(
     })
     
     # Save updates
-    save_class_info(class_info)
+    await save_class_info(class_info)
     
     return {
         "message": "Class updated successfully",
@@ -454,58 +453,6 @@ async def update_class(
 
 
 # Helper functions
-def save_class_info(class_info: Dict):
-    """Save class information"""
-    filename = "mock_data/classes.json"
-    all_classes = load_all_classes()
-    all_classes[class_info["class_id"]] = class_info
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(all_classes, f, ensure_ascii=False, indent=2, default=str)
-
-
-def load_all_classes() -> Dict:
-    """Load all class information"""
-    filename = "mock_data/classes.json"
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-def get_class_info(class_id: str) -> Dict:
-    """Get class information"""
-    all_classes = load_all_classes()
-    return all_classes.get(class_id)
-
-
-def save_experiment_assignment(assignment: Dict):
-    """Save experiment assignment"""
-    filename = "mock_data/assignments.json"
-    all_assignments = load_all_assignments()
-    all_assignments[assignment["assignment_id"]] = assignment
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(all_assignments, f, ensure_ascii=False, indent=2, default=str)
-
-
-def load_all_assignments() -> Dict:
-    """Load all experiment assignments"""
-    filename = "mock_data/assignments.json"
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-def get_experiment_assignments(class_id: str) -> List[Dict]:
-    """Get experiment assignments for a class"""
-    all_assignments = load_all_assignments()
-    return [a for a in all_assignments.values() if a["class_id"] == class_id]
-
-
 def calculate_submission_rate(progress_data: List[Dict]) -> float:
     """Calculate submission rate"""
     if not progress_data:
@@ -2,6 +2,7 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
 from schemas.evaluation import (
     EvaluationCriteria, StudentScore, ClassEvaluation, 
     ExperimentReport
@@ -10,7 +11,11 @@ from services.evaluation.score_calculator import (
     calculate_student_score, calculate_class_rankings,
     generate_score_distribution, calculate_class_average
 )
-from mock_data.file_storage import get_scenario, get_bids, save_evaluation_criteria, get_evaluation_criteria
+from mock_data.async_storage import (
+    get_scenario, get_bids, save_evaluation_criteria,
+    get_evaluation_criteria as load_evaluation_criteria,
+    save_evaluation_result, get_evaluation_result
+)
 from mock_data.mock_users import mock_users
 from security import decode_access_token
 from typing import List, Dict
@@ -31,14 +36,14 @@ async def set_evaluation_criteria(
     if not payload or payload.get("role") != "teacher":
         raise HTTPException(status_code=403, detail="只有教师可以设置评估标准")
     
-    save_evaluation_criteria(criteria.scenario_id, criteria.dict())
+    await save_evaluation_criteria(criteria.scenario_id, criteria.dict())
     return {"message": "评估标准设置成功"}
 
 
 @router.get("/criteria/{scenario_id}")
 async def get_evaluation_criteria(scenario_id: str):
     """获取评估标准"""
-    criteria = get_evaluation_criteria(scenario_id)
+    criteria = await load_evaluation_criteria(scenario_id)
     if not criteria:
         raise HTTPException(status_code=404, detail="未找到评估标准")
     return criteria
@@ -56,17 +61,17 @@ async def calculate_class_scores(
         raise HTTPException(status_code=403, detail="只有教师可以计算成绩")
     
     # 获取场景信息
-    scenario = get_scenario(scenario_id)
+    scenario = await get_scenario(scenario_id)
     if not scenario:
         raise HTTPException(status_code=404, detail="场景不存在")
     
     # 获取所有竞价
-    bid_data = get_bids(scenario_id)
+    bid_data = await get_bids(scenario_id)
     if not bid_data:
         raise HTTPException(status_code=404, detail="未找到竞价数据")
     
     # 获取评估标准
-    criteria_data = get_evaluation_criteria(scenario_id)
+    criteria_data = await load_evaluation_criteria(scenario_id)
     if not criteria_data:
         # 使用默认评估标准
         criteria = EvaluationCriteria(
@@ -79,7 +84,8 @@ async def calculate_class_scores(
     # 计算市场出清结果
     from routers.simulation import get_result
     try:
-        result = get_result(scenario_id, mechanism_type)
+        # 出清是 CPU 密集计算，放在 AnyIO 的默认线程池，不占用存储线程池（其他异步路由的存储 I/O 仍可执行）
+        result = await run_in_threadpool(get_result, scenario_id, mechanism_type, token, None)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"市场出清计算失败: {str(e)}")
     
@@ -118,7 +124,7 @@ async def calculate_class_scores(
     )
     
     # 保存到文件
-    save_evaluation_result(scenario_id, mechanism_type, evaluation_result.dict())
+    await save_evaluation_result(scenario_id, mechanism_type, evaluation_result.dict())
     
     return {
         "message": "成绩计算完成",
@@ -141,7 +147,7 @@ async def get_student_scores(
         raise HTTPException(status_code=401, detail="无效令牌")
     
     # 获取评估结果
-    evaluation_result = get_evaluation_result(scenario_id, mechanism_type)
+    evaluation_result = await get_evaluation_result(scenario_id, mechanism_type)
     if not evaluation_result:
         raise HTTPException(status_code=404, detail="未找到评估结果")
     
@@ -173,17 +179,17 @@ async def generate_experiment_report(
         raise HTTPException(status_code=403, detail="只有教师可以生成报告")
     
     # 获取评估结果
-    evaluation_result = get_evaluation_result(scenario_id, mechanism_type)
+    evaluation_result = await get_evaluation_result(scenario_id, mechanism_type)
     if not evaluation_result:
         raise HTTPException(status_code=404, detail="未找到评估结果")
     
     # 获取场景信息
-    scenario = get_scenario(scenario_id)
+    scenario = await get_scenario(scenario_id)
     if not scenario:
         raise HTTPException(status_code=404, detail="场景不存在")
     
     # 获取竞价数据
-    bid_data = get_bids(scenario_id)
+    bid_data = await get_bids(scenario_id)
     
     # 计算统计数据
     total_participants = len(scenario["participants"])
@@ -231,7 +237,7 @@ async def export_grades(
         raise HTTPException(status_code=403, detail="只有教师可以导出成绩")
     
     # 获取评估结果
-    evaluation_result = get_evaluation_result(scenario_id, mechanism_type)
+    evaluation_result = await get_evaluation_result(scenario_id, mechanism_type)
     if not evaluation_result:
         raise HTTPException(status_code=404, detail="未找到评估结果")
     
@@ -253,23 +259,6 @@ async def export_grades(
 
 
 # 辅助函数
-def save_evaluation_result(scenario_id: str, mechanism_type: str, result: Dict):
-    """保存评估结果到文件"""
-    filename = f"mock_data/evaluation_{scenario_id}_{mechanism_type}.json"
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2, default=str)
-
-
-def get_evaluation_result(scenario_id: str, mechanism_type: str) -> Dict:
-    """从文件获取评估结果"""
-    filename = f"mock_data/evaluation_{scenario_id}_{mechanism_type}.json"
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-
-
 def generate_analysis_summary(evaluation_result: Dict, scenario: Dict, bid_data: Dict) -> str:
     """生成分析总结"""
     scores = evaluation_result["student_scores"]
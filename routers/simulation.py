@@ -2,19 +2,13 @@
 
 from fastapi import APIRouter, HTTPException, Query, Depends, Body
 from fastapi.security import OAuth2PasswordBearer
-from schemas.simulation import DispatchResult, BidSubmitRequest
-from mock_data.file_storage import get_scenario, get_bids, save_bid
-from services.market_clear.constrained_on import clear_market_constrained_on
-from services.market_clear.fixed_cost_pay_as_bid import clear_market_fixed_pay_as_bid
-from services.market_clear.fixed_cost_uniform import clear_market_fixed_uniform
-from services.market_clear.risk_adjusted_uniform import clear_market_risk_adjusted_uniform
-from services.market_clear.two_stage_market import clear_market_two_stage
-from services.market_clear.uniform_price import clear_market_uniform
-from services.market_clear.pay_as_bid import clear_market_pay_as_bid
-from services.market_clear.zone_limit_uniform import clear_market_zone_uniform
+from schemas.simulation import DispatchResult, BidSubmitRequest, MechanismComparison, IndicativePrice, RiskSimulationResult, WhatIfRequest, WhatIfResult
+from mock_data.file_storage import get_scenario, get_bids, save_bid, bids_version
+from services.market_clear.registry import get_mechanism, list_mechanisms, clearing_mode
+from services.market_clear.result_cache import get_cached_result, cache_result
 from security import decode_access_token
-from routers.classes import get_class_info, get_experiment_assignments
-from typing import List, Dict, Any
+from mock_data.visibility_index import get_visibility_index
+from typing import List, Dict, Any, Optional
 
 router = APIRouter(prefix="/api/simulation", tags=["Simulation"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -35,47 +29,231 @@ def submit_bid(req: BidSubmitRequest, token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=404, detail="Scenario not found")
     
     # Check if user can participate in this scenario
-    if not can_user_participate(student_id, scenario):
+    if not can_user_participate(student_id, req.scenario_id):
         raise HTTPException(status_code=403, detail="You are not eligible to participate in this scenario")
     
     save_bid(req.scenario_id, req.student_id, req.bid.dict())
     return {"message": "Bid submitted successfully"}
 
 
-@router.get("/result/{scenario_id}", response_model=DispatchResult)
-def get_result(scenario_id: str, type: str = Query("uniform_price"), token: str = Depends(oauth2_scheme)):
+@router.get("/result/{scenario_id}", response_model=DispatchResult, response_model_exclude_none=True)
+def get_result(
+    scenario_id: str,
+    type: str = Query("uniform_price"),
+    token: str = Depends(oauth2_scheme),
+    mode: Optional[str] = Query(None, description="count 或 quantity，默认使用场景的 clearing_mode")
+):
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    # 先读版本号再读场景和报价：并发写入时结果最多被记在旧版本下，下次轮询会重新计算
+    version = bids_version(scenario_id)
     scenario = get_scenario(scenario_id)
     if not scenario:
         raise HTTPException(status_code=404, detail="Scenario not found")
 
-    bid_data = get_bids(scenario_id)
-
     if type not in scenario.get("enabled_mechanisms", []):
         raise HTTPException(status_code=400, detail=f"Mechanism '{type}' not enabled for this scenario")
 
-    if type == "uniform_price":
-        return clear_market_uniform(scenario, bid_data)
-    elif type == "pay_as_bid":
-        return clear_market_pay_as_bid(scenario, bid_data)
-    elif type == "fixed_cost_uniform":
-        return clear_market_fixed_uniform(scenario, bid_data)
-    elif type == "fixed_cost_pay_as_bid":
-        return clear_market_fixed_pay_as_bid(scenario, bid_data)
-    elif type == "zone_limit_uniform":
-        return clear_market_zone_uniform(scenario, bid_data)
-    elif type == "constrained_on":
-        return clear_market_constrained_on(scenario, bid_data)
-    elif type == "risk_adjusted_uniform":
-        return clear_market_risk_adjusted_uniform(scenario, bid_data)
-    elif type == "two_stage":
-        return clear_market_two_stage(scenario, bid_data)
-    else:
+    mechanism = get_mechanism(type)
+    if mechanism is None:
         raise HTTPException(status_code=400, detail="Unknown market mechanism")
 
+    try:
+        mode = clearing_mode(scenario, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode == "quantity" and not mechanism.quantity_aware:
+        raise HTTPException(status_code=400, detail=f"Mechanism '{type}' does not support quantity clearing")
+
+    # 报价没有变化时直接返回上次的出清结果；出清失败不缓存
+    result = get_cached_result(scenario_id, type, mode, version)
+    if result is None:
+        result = mechanism.clear(scenario, get_bids(scenario_id), mode)
+        cache_result(scenario_id, type, mode, version, result)
+    return result
+
+
+@router.get("/compare/{scenario_id}", response_model=MechanismComparison, response_model_exclude_none=True)
+def compare_mechanisms(
+    scenario_id: str,
+    token: str = Depends(oauth2_scheme),
+    mode: Optional[str] = Query(None, description="count 或 quantity，默认使用场景的 clearing_mode")
+):
+    """Clear every enabled mechanism on one shared bid book and compare profits per student"""
+    from services.market_clear.bid_book import BidBook, round_like_python
+    import numpy as np
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    scenario = get_scenario(scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    try:
+        mode = clearing_mode(scenario, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 报价只加载、转换一次，各机制共享同一个报价簿（排序结果也会复用）
+    book = BidBook(get_bids(scenario_id))
+
+    outcomes = {}
+    profit_arrays = {}
+    for name in scenario.get("enabled_mechanisms", []):
+        mechanism = get_mechanism(name)
+        if mechanism is None:
+            outcomes[name] = {"error": "Unknown market mechanism"}
+            continue
+        if mode == "quantity" and not mechanism.quantity_aware:
+            outcomes[name] = {"error": f"Mechanism '{name}' does not support quantity clearing"}
+            continue
+        try:
+            result = mechanism.clear(scenario, book, mode)
+        except HTTPException as e:
+            outcomes[name] = {"error": str(e.detail)}
+            continue
+        except (ValueError, KeyError, IndexError) as e:
+            outcomes[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        outcomes[name] = result.dict(exclude={"scenario_id"})
+        profit_arrays[name] = np.fromiter(result.profits.values(), dtype=float, count=book.size)
+
+    # 以第一个出清成功的机制为基准计算每个学生的利润差
+    baseline = next(iter(profit_arrays), None)
+    deltas = {}
+    if baseline is not None:
+        base = profit_arrays[baseline]
+        columns = {
+            name: round_like_python(profits - base)
+            for name, profits in profit_arrays.items() if name != baseline
+        }
+        deltas = {
+            student_id: {name: values[i] for name, values in columns.items()}
+            for i, student_id in enumerate(book.ids)
+        }
+
+    return MechanismComparison(
+        scenario_id=scenario_id,
+        mode=mode,
+        baseline=baseline,
+        mechanisms=outcomes,
+        profit_deltas=deltas
+    )
+
+
+@router.get("/indicative-price/{scenario_id}", response_model=IndicativePrice, response_model_exclude_none=True)
+def get_indicative_price(
+    scenario_id: str,
+    token: str = Depends(oauth2_scheme),
+    mode: Optional[str] = Query(None, description="count 或 quantity，默认使用场景的 clearing_mode")
+):
+    """Live uniform clearing price of the current bids, read from the incrementally maintained order book"""
+    from services.market_clear.order_book import indicative_clearing
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    scenario = get_scenario(scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    try:
+        mode = clearing_mode(scenario, mode)
+        demand = scenario["demand"]
+        version, bids, marginal = indicative_clearing(scenario_id, demand, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = IndicativePrice(scenario_id=scenario_id, mode=mode, demand=demand, bids=bids, version=version)
+    if marginal is not None:
+        result.marginal_student_id, result.indicative_price, before = marginal
+        if mode == "quantity":
+            result.marginal_dispatch = round(demand - before, 3)
+    return result
+
+
+@router.get("/risk-simulation/{scenario_id}", response_model=RiskSimulationResult)
+def simulate_risk(
+    scenario_id: str,
+    token: str = Depends(oauth2_scheme),
+    trials: int = Query(10000, ge=1, le=1000000, description="蒙特卡洛试验次数，学生最多 10000 次"),
+    seed: int = Query(0, description="随机数种子，相同种子结果相同")
+):
+    """Monte Carlo availability simulation for risk_adjusted_uniform: expected profits, shortfall probability and price distribution"""
+    from services.market_clear.risk_simulation import STUDENT_MAX_TRIALS, simulate_availability
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("role") != "teacher" and trials > STUDENT_MAX_TRIALS:
+        raise HTTPException(status_code=403, detail=f"Only teachers can run more than {STUDENT_MAX_TRIALS} trials")
+
+    scenario = get_scenario(scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    if "risk_adjusted_uniform" not in scenario.get("enabled_mechanisms", []):
+        raise HTTPException(status_code=400, detail="Mechanism 'risk_adjusted_uniform' not enabled for this scenario")
+
+    try:
+        result = simulate_availability(scenario, get_bids(scenario_id), trials, seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+
+@router.post("/what-if/{scenario_id}", response_model=WhatIfResult, response_model_exclude_none=True)
+def what_if(
+    scenario_id: str,
+    req: WhatIfRequest,
+    type: str = Query("uniform_price"),
+    token: str = Depends(oauth2_scheme),
+    mode: Optional[str] = Query(None, description="count 或 quantity，默认使用场景的 clearing_mode")
+):
+    """Evaluate alternative offers for the caller against the current bids of everyone else; nothing is saved"""
+    from services.market_clear.what_if import MAX_ALTERNATIVES, evaluate_alternatives
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    student_id = payload.get("sub")
+
+    scenario = get_scenario(scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    if not can_user_participate(student_id, scenario_id):
+        raise HTTPException(status_code=403, detail="You are not eligible to participate in this scenario")
+    if not 0 < len(req.alternatives) <= MAX_ALTERNATIVES:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_ALTERNATIVES} alternatives are allowed")
+
+    if type not in scenario.get("enabled_mechanisms", []):
+        raise HTTPException(status_code=400, detail=f"Mechanism '{type}' not enabled for this scenario")
+    mechanism = get_mechanism(type)
+    if mechanism is None:
+        raise HTTPException(status_code=400, detail="Unknown market mechanism")
+    try:
+        mode = clearing_mode(scenario, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode == "quantity" and not mechanism.quantity_aware:
+        raise HTTPException(status_code=400, detail=f"Mechanism '{type}' does not support quantity clearing")
+
+    outcomes = evaluate_alternatives(
+        scenario, mechanism, get_bids(scenario_id), student_id,
+        [alternative.dict() for alternative in req.alternatives], mode
+    )
+    return WhatIfResult(scenario_id=scenario_id, student_id=student_id, mechanism=type, mode=mode, outcomes=outcomes)
+
+
+@router.get("/mechanisms")
+def get_mechanisms():
+    """List registered market mechanisms with their required bid fields and capabilities"""
+    return [mechanism.describe() for mechanism in list_mechanisms()]
+
 
 @router.get("/available-scenarios")
 def get_available_scenarios(token: str = Depends(oauth2_scheme)):
@@ -87,34 +265,14 @@ def get_available_scenarios(token: str = Depends(oauth2_scheme)):
     user_id = payload.get("sub")
     user_role = payload.get("role")
     
-    # Get all scenarios
-    from mock_data.file_storage import list_scenarios
-    all_scenarios = list_scenarios()
-    
-    available_scenarios = []
-    
-    for scenario_id, scenario in all_scenarios.items():
-        if can_user_participate(user_id, scenario):
-            available_scenarios.append(scenario)
-    
-    return available_scenarios
+    # 通过可见性索引直接得到用户可见的场景
+    return get_visibility_index().visible_scenarios(user_id)
 
 
-def can_user_participate(user_id: str, scenario: dict) -> bool:
-    """Check if user can participate in the scenario"""
-    # If scenario is open to all users
-    if scenario.get("is_open", False):
-        return True
-    
-    # If scenario is restricted to specific participants
-    if user_id in scenario.get("participants", []):
-        return True
-    
-    # If scenario is associated with a class
-    class_id = scenario.get("class_id")
-    if class_id:
-        class_info = get_class_info(class_id)
-        if class_info and user_id in class_info.get("students", []):
-            return True
-    
-    return False
\ No newline at end of file
+def can_user_participate(user_id: str, scenario_id: str) -> bool:
+    """Check if user can participate in the scenario
+
+    A scenario is visible when it is open to all users, lists the user as a
+    participant, or is associated with one of the user's classes.
+    """
+    return get_visibility_index().can_participate(user_id, scenario_id)
@@ -6,7 +6,7 @@ from schemas.auths import UserOut
 from security import decode_access_token
 from mock_data.mock_users import mock_users
 from typing import Optional, Dict, Any
-from mock_data.file_storage import get_bids, list_scenarios
+from mock_data.async_storage import get_scenario, get_participant_bids
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -81,14 +81,12 @@ async def get_user_statistics(token: str = Depends(oauth2_scheme)):
     total_revenue = 0
     participated_scenarios = set()
     
-    # Get all scenarios and bids
-    scenarios = list_scenarios()
-    for scenario_id, scenario in scenarios.items():
-        bids_dict = get_bids(scenario_id)
-        user_bids = []
-        for bid_id, bid in bids_dict.items():
-            if bid.get("participant_id") == username:
-                user_bids.append(bid)
+    # Get the user's bids from the participant index
+    participant_bids = await get_participant_bids(username)
+    for scenario_id, bids_dict in participant_bids.items():
+        if await get_scenario(scenario_id) is None:
+            continue
+        user_bids = list(bids_dict.values())
         
         if user_bids:
             participated_scenarios.add(scenario_id)
@@ -1,13 +1,30 @@
 # schemas/simulation.py
 
+import math
+
 from pydantic import BaseModel, validator
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class Bid(BaseModel):
     offer: float  # 报价
     cost: float  # 成本
     fixed_cost: Optional[float] = 0.0  # 新增字段，默认 0
+    quantity: Optional[float] = 1.0  # 容量（MW），按容量出清时使用
+    offers: Optional[List[float]] = None  # 多时段出清的逐时段报价，没有时各时段使用 offer
+    costs: Optional[List[float]] = None  # 多时段出清的逐时段成本，没有时各时段使用 cost
+
+    @validator('offer', 'cost', 'fixed_cost', 'quantity')
+    def validate_finite(cls, v):
+        if v is not None and not math.isfinite(v):
+            raise ValueError('Bid values must be finite numbers')
+        return v
+
+    @validator('offers', 'costs')
+    def validate_finite_series(cls, v):
+        if v is not None and not all(math.isfinite(item) for item in v):
+            raise ValueError('Bid values must be finite numbers')
+        return v
 
 
 class ScenarioCreateRequest(BaseModel):
@@ -17,6 +34,13 @@ class ScenarioCreateRequest(BaseModel):
     enabled_mechanisms: List[str] = ["uniform_price"]  # 默认统一价
     is_open: bool = False  # 是否开放给所有用户
     class_id: Optional[str] = None  # 关联的班级ID
+    clearing_mode: str = "count"  # count：demand 为中标报价数；quantity：demand 为需求容量（MW）
+    zone_limits: Optional[Dict[str, Optional[int]]] = None  # 分区中标上限，未列出或为 null 的分区不设上限
+    unzoned_bids: str = "exclude"  # 没有分区的报价：exclude 不参与；uncapped 不设上限参与
+    zone_prices: bool = False  # 分区机制按各分区边际价格结算
+    network: Optional[Dict[str, Any]] = None  # 直流潮流网络（buses、slack、lines、loads），见 services/market_clear/network.py
+    demand_RT_distribution: Optional[Dict[str, Any]] = None  # 两阶段市场的实时需求分布，见 two_stage_market.sample_demand
+    demand_profile: Optional[List[float]] = None  # 多时段出清的逐时段需求（如 24 或 96 个时段）
 
     @validator('demand')
     def validate_demand(cls, v):
@@ -24,6 +48,18 @@ class ScenarioCreateRequest(BaseModel):
             raise ValueError('Demand must be at least 1')
         return v
 
+    @validator('clearing_mode')
+    def validate_clearing_mode(cls, v):
+        if v not in ("count", "quantity"):
+            raise ValueError('Clearing mode must be "count" or "quantity"')
+        return v
+
+    @validator('unzoned_bids')
+    def validate_unzoned_bids(cls, v):
+        if v not in ("exclude", "uncapped"):
+            raise ValueError('Unzoned bids must be "exclude" or "uncapped"')
+        return v
+
 
 class BidSubmitRequest(BaseModel):
     scenario_id: str
@@ -36,3 +72,90 @@ class DispatchResult(BaseModel):
     clearing_price: float
     dispatched: Dict[str, bool]
     profits: Dict[str, float]
+    dispatched_quantity: Optional[Dict[str, float]] = None  # 按容量出清时各报价的调度容量（MW）
+    zone_prices: Optional[Dict[str, float]] = None  # 分区定价时各分区的边际价格
+    lmps: Optional[Dict[str, float]] = None  # 直流潮流出清时各母线的节点边际价格
+    line_flows: Optional[Dict[str, float]] = None  # 直流潮流出清时各线路潮流（MW，正方向为 from -> to）
+    dispatch_probability: Optional[Dict[str, float]] = None  # 随机出清时各报价的调度概率
+    price_percentiles: Optional[Dict[str, float]] = None  # 随机出清时价格分布的分位数（p5、p50 等）
+    period_prices: Optional[List[float]] = None  # 多时段出清时各时段的出清价格
+    dispatched_periods: Optional[Dict[str, int]] = None  # 多时段出清时各报价中标的时段数
+
+
+class MechanismOutcome(BaseModel):
+    clearing_price: Optional[float] = None
+    dispatched: Dict[str, bool] = {}
+    profits: Dict[str, float] = {}
+    dispatched_quantity: Optional[Dict[str, float]] = None
+    zone_prices: Optional[Dict[str, float]] = None
+    lmps: Optional[Dict[str, float]] = None
+    line_flows: Optional[Dict[str, float]] = None
+    dispatch_probability: Optional[Dict[str, float]] = None
+    price_percentiles: Optional[Dict[str, float]] = None
+    period_prices: Optional[List[float]] = None
+    dispatched_periods: Optional[Dict[str, int]] = None
+    error: Optional[str] = None  # 该机制出清失败时的原因
+
+
+class MechanismComparison(BaseModel):
+    scenario_id: str
+    mode: str
+    baseline: Optional[str] = None  # 计算利润差的基准机制（第一个出清成功的机制）
+    mechanisms: Dict[str, MechanismOutcome]
+    profit_deltas: Dict[str, Dict[str, float]]  # student_id -> {机制: 相对基准的利润差}
+
+
+class IndicativePrice(BaseModel):
+    scenario_id: str
+    mode: str
+    demand: float
+    bids: int  # 当前有效报价数
+    version: int  # 计算时的报价版本号
+    indicative_price: Optional[float] = None  # 报价数或容量不足时为空
+    marginal_student_id: Optional[str] = None
+    marginal_dispatch: Optional[float] = None  # 按容量出清时边际报价的调度容量（MW）
+
+
+class RiskSimulationResult(BaseModel):
+    scenario_id: str
+    trials: int
+    demand: int
+    shortfall_probability: float  # 可用报价不足以满足需求的试验比例
+    expected_price: Optional[float] = None  # 有报价可用的试验中的平均出清价格
+    price_percentiles: Dict[str, float]
+    expected_profits: Dict[str, float]
+    dispatch_probability: Dict[str, float]
+
+
+class WhatIfBid(BaseModel):
+    offer: float
+    cost: Optional[float] = None  # 未给出的字段沿用调用者当前报价
+    fixed_cost: Optional[float] = None
+    quantity: Optional[float] = None
+
+    @validator('offer', 'cost', 'fixed_cost', 'quantity')
+    def validate_finite(cls, v):
+        if v is not None and not math.isfinite(v):
+            raise ValueError('Bid values must be finite numbers')
+        return v
+
+
+class WhatIfRequest(BaseModel):
+    alternatives: List[WhatIfBid]  # 最多 what_if.MAX_ALTERNATIVES 个
+
+
+class WhatIfOutcome(BaseModel):
+    offer: float
+    dispatched: bool = False
+    profit: float = 0.0
+    clearing_price: Optional[float] = None
+    dispatched_quantity: Optional[float] = None
+    error: Optional[str] = None  # 该备选报价出清失败时的原因
+
+
+class WhatIfResult(BaseModel):
+    scenario_id: str
+    student_id: str
+    mechanism: str
+    mode: str
+    outcomes: List[WhatIfOutcome]  # 与请求中的备选报价一一对应
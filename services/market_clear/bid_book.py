@@ -0,0 +1,262 @@
+# services/market_clear/bid_book.py
+
+import os
+
+import numpy as np
+
+from schemas.simulation import DispatchResult
+
+
+def _offer(bid):
+    return bid.get("offer", bid.get("price"))
+
+
+# 可排序的报价字段 -> 从单条报价中取值的方式（与各机制原先的 bid.get 回退链一致）
+SORT_KEYS = {
+    "offer": _offer,
+    "offer_DA": lambda bid: bid.get("offer_DA", _offer(bid)),
+    "offer_RT": lambda bid: bid.get("offer_RT", _offer(bid)),
+}
+
+
+def round_like_python(values, ndigits=2):
+    """向量化舍入，结果与逐个调用 Python round(x, ndigits) 完全相同，返回 list
+
+    np.round 先乘 10**ndigits 再取整，乘法的舍入误差可能让落在 .5 附近的值舍入方向与 Python 不同；
+    这些位置（以及无穷大、NaN、超大值）改用 Python round 重新计算。
+    """
+    scale = 10.0 ** ndigits
+    with np.errstate(invalid="ignore"):
+        scaled = values * scale
+        result = (np.rint(scaled) / scale).tolist()
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        suspect = ~(distance > 4 * np.abs(np.spacing(scaled))) | ~(np.abs(scaled) < 2.0 ** 52)
+    for i in np.flatnonzero(suspect).tolist():
+        result[i] = round(float(values[i]), ndigits)
+    return result
+
+
+# 需要的报价数不超过总数的这个比例时用部分选择代替全排序（见 benchmarks/bench_topk.py）
+TOPK_MAX_FRACTION = float(os.environ.get("MARKET_TOPK_MAX_FRACTION", 0.5))
+
+
+class BidBook:
+    """一个场景的报价簿：报价只转换一次为 NumPy 数组，供各出清机制共享
+
+    - ids：报价人ID，保持 bid_data 原有顺序（结果字典按此顺序输出）
+    - 各数值列在第一次使用时才转换，缺失字段按各机制原有的默认值填充
+    - 排序结果按排序键缓存；使用稳定排序，报价相同时保持原有顺序
+    - 只需要前 k 条报价时用 smallest() 部分选择，不做全排序
+    - 按容量出清时沿累计供给曲线二分查找边际报价，曲线同样按排序键缓存
+    """
+
+    def __init__(self, bid_data):
+        self.ids = list(bid_data)
+        self.bids = list(bid_data.values())
+        self.size = len(self.ids)
+        self._columns = {}
+        self._orders = {}
+        self._top = {}
+        self._curves = {}
+        self._index = None
+
+    # ---------- 数值列 ----------
+
+    def column(self, name, default=0.0):
+        """按字段名取数值列，缺失时使用 default（default 为 NaN 表示必填字段）"""
+        key = (name, default)
+        values = self._columns.get(key)
+        if values is None:
+            getter = SORT_KEYS.get(name)
+            if getter is None:
+                values = np.array([bid.get(name, default) for bid in self.bids], dtype=float)
+            else:
+                values = np.array([getter(bid) for bid in self.bids], dtype=float)
+            self._columns[key] = values
+        return values
+
+    @property
+    def offer(self):
+        return self.column("offer")
+
+    @property
+    def cost(self):
+        return self.column("cost")
+
+    @property
+    def fixed_cost(self):
+        return self.column("fixed_cost")
+
+    @property
+    def risk_cost(self):
+        return self.column("risk_cost")
+
+    @property
+    def probability(self):
+        return self.column("probability", 1.0)
+
+    @property
+    def quantity(self):
+        return self.column("quantity", 1.0)
+
+    @property
+    def expected_offer(self):
+        """风险调整后的期望报价 offer / probability，probability <= 0 时为无穷大"""
+        values = self._columns.get("expected_offer")
+        if values is None:
+            probability = self.probability
+            positive = probability > 0
+            values = np.full(self.size, np.inf)
+            np.divide(self.offer, probability, out=values, where=positive)
+            self._columns["expected_offer"] = values
+        return values
+
+    def period_column(self, name, fallback, periods, default=0.0):
+        """分时段数值列（时段数 × 报价数）
+
+        报价的 name 字段为逐时段取值的列表，长度必须等于 periods；没有该字段的报价在各时段都取 fallback 列的值，
+        两者都没有时取 default（与 column 相同，NaN 表示必填字段）。
+        """
+        key = ("periods", name, fallback, periods, default)
+        values = self._columns.get(key)
+        if values is None:
+            values = np.empty((periods, self.size))
+            values[:] = self.column(fallback, default)
+            for i, bid in enumerate(self.bids):
+                series = bid.get(name)
+                if series is None:
+                    continue
+                if len(series) != periods:
+                    raise ValueError(f"Bid '{self.ids[i]}' has {len(series)} {name}, expected {periods}")
+                values[:, i] = series
+            self._columns[key] = values
+        return values
+
+    def required(self, name, mask):
+        """必填字段：mask 选中的报价中有缺失时与原先 bid[name] 一样抛出 KeyError"""
+        values = self.column(name, np.nan)
+        if np.isnan(values[mask]).any():
+            raise KeyError(name)
+        return values
+
+    def category_codes(self, name):
+        """分类字段编码：返回 (每条报价的类别编号, 类别列表)；缺失该字段的报价编号为 -1"""
+        key = ("codes", name)
+        cached = self._columns.get(key)
+        if cached is None:
+            codes = {}
+            values = np.empty(self.size, dtype=np.int64)
+            for i, bid in enumerate(self.bids):
+                value = bid.get(name)
+                values[i] = -1 if value is None else codes.setdefault(value, len(codes))
+            cached = (values, list(codes))
+            self._columns[key] = cached
+        return cached
+
+    def zone_codes(self):
+        """返回 (每条报价的分区编号, 分区列表)；没有分区的报价编号为 -1"""
+        return self.category_codes("zone")
+
+    # ---------- 排序 ----------
+
+    def sorted_indices(self, key="offer"):
+        """按排序键升序的报价下标（稳定排序）"""
+        order = self._orders.get(key)
+        if order is None:
+            values = self.expected_offer if key == "expected_offer" else self.column(key)
+            order = np.argsort(values, kind="stable")
+            self._orders[key] = order
+        return order
+
+    def smallest(self, key, k):
+        """排序键最小的 k 条报价的下标，结果与 sorted_indices(key)[:k] 完全相同
+
+        k 远小于报价数时用 argpartition 选出前 k 个再排序，O(n + k log k)；
+        与第 k 小相同的报价按原有顺序取，保证与稳定排序一致。
+        """
+        order = self._orders.get(key)
+        if order is not None or not 0 < k < min(self.size, self.size * TOPK_MAX_FRACTION):
+            return self.sorted_indices(key)[:k]
+
+        cached = self._top.get((key, k))
+        if cached is not None:
+            return cached
+        values = self.expected_offer if key == "expected_offer" else self.column(key)
+        kth = values[np.argpartition(values, k - 1)[k - 1]]
+        if np.isnan(kth):
+            return self.sorted_indices(key)[:k]
+        below = np.flatnonzero(values < kth)
+        ties = np.flatnonzero(values == kth)[:k - len(below)]
+        selected = np.sort(np.concatenate((below, ties)))
+        top = selected[np.argsort(values[selected], kind="stable")]
+        self._top[(key, k)] = top
+        return top
+
+    # ---------- 按容量出清 ----------
+
+    def supply_curve(self, key="offer"):
+        """累计供给曲线：返回 (按排序键升序的下标, 累计容量)；负容量按 0 计"""
+        curve = self._curves.get(key)
+        if curve is None:
+            order = self.sorted_indices(key)
+            curve = (order, np.cumsum(np.maximum(self.quantity, 0.0)[order]))
+            self._curves[key] = curve
+        return curve
+
+    def dispatch_quantity(self, key, demand):
+        """沿供给曲线满足 demand MW，边际报价只调度剩余部分
+
+        返回 (每条报价的调度容量, 边际报价下标)；总容量不足时边际下标为 None。
+        """
+        if demand <= 0:
+            raise ValueError("Demand must be positive in quantity mode")
+        order, cumulative = self.supply_curve(key)
+        dispatched = np.zeros(self.size)
+        marginal = int(np.searchsorted(cumulative, demand, side="left"))
+        if marginal >= self.size:
+            return dispatched, None
+
+        full = order[:marginal]
+        dispatched[full] = np.maximum(self.quantity[full], 0.0)
+        dispatched[order[marginal]] = demand - (cumulative[marginal - 1] if marginal else 0.0)
+        return dispatched, order[marginal]
+
+    def total_quantity(self):
+        _, cumulative = self.supply_curve()
+        return float(cumulative[-1]) if self.size else 0.0
+
+    # ---------- 结果 ----------
+
+    def index_of(self, ids):
+        """把报价人ID转换为下标，不在报价簿中的ID忽略"""
+        if self._index is None:
+            self._index = {student_id: i for i, student_id in enumerate(self.ids)}
+        return np.array([self._index[i] for i in ids if i in self._index], dtype=np.int64)
+
+    def mask(self, indices):
+        selected = np.zeros(self.size, dtype=bool)
+        selected[indices] = True
+        return selected
+
+    def dispatch_result(self, scenario, clearing_price, dispatched, profits, quantities=None, **extra):
+        """按原有顺序生成 DispatchResult；利润保留两位小数（与 Python round 一致），未调度的为 0
+
+        按容量出清时传入 quantities，结果中附带各报价的调度容量；
+        extra 为各机制特有的附加字段（如 zone_prices、lmps），原样写入结果。
+        各字段的类型已经确定，跳过逐项校验（十万条报价时校验比出清本身还慢）。
+        """
+        return DispatchResult.model_construct(
+            scenario_id=scenario["scenario_id"],
+            clearing_price=float(clearing_price),
+            dispatched=dict(zip(self.ids, dispatched.tolist())),
+            profits=dict(zip(self.ids, round_like_python(np.where(dispatched, profits, 0.0)))),
+            dispatched_quantity=None if quantities is None else dict(zip(self.ids, round_like_python(quantities, 3))),
+            **extra
+        )
+
+
+def as_bid_book(bid_data):
+    """接受 {student_id: bid} 或已经构建好的 BidBook"""
+    if isinstance(bid_data, BidBook):
+        return bid_data
+    return BidBook(bid_data)
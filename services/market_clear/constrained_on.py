@@ -2,42 +2,26 @@
 
 from schemas.simulation import DispatchResult
 from typing import Dict
-from collections import defaultdict
+import numpy as np
+from services.market_clear.bid_book import as_bid_book
 
 
 def clear_market_constrained_on(scenario: Dict, bid_data: Dict[str, dict]) -> DispatchResult:
     demand = scenario["demand"]
     must_run = scenario.get("must_run", [])  # 强制运行者 ID 列表
+    book = as_bid_book(bid_data)
 
     # Step 1: 正常按报价排序调度
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = sorted_bids[:demand]
-    clearing_price = winners[-1][1].get('offer', winners[-1][1].get('price'))
-
-    dispatched = {}
-    profits = {}
-
-    winners_dict = dict(winners)
-
-    for student_id, bid in bid_data.items():
-        cost = bid.get("cost", 0)
-        fixed_cost = bid.get("fixed_cost", 0)
-
-        if student_id in winners_dict:
-            dispatched[student_id] = True
-            profit = clearing_price - cost - fixed_cost
-            profits[student_id] = round(profit, 2)
-        elif student_id in must_run:
-            dispatched[student_id] = True
-            compensation = -cost - fixed_cost
-            profits[student_id] = round(compensation, 2)  # 补偿为负成本（系统支付）
-        else:
-            dispatched[student_id] = False
-            profits[student_id] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
+    winners = book.smallest("offer", demand)
+    clearing_price = book.offer[winners[-1]]
+
+    # Step 2: 未中标的强制运行者也调度，补偿为负成本（系统支付）
+    in_merit = book.mask(winners)
+    dispatched = in_merit | book.mask(book.index_of(must_run))
+    profits = np.where(
+        in_merit,
+        clearing_price - book.cost - book.fixed_cost,
+        -book.cost - book.fixed_cost
     )
+
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
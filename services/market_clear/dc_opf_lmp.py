@@ -0,0 +1,118 @@
+# services/market_clear/dc_opf_lmp.py
+
+from schemas.simulation import DispatchResult
+from fastapi import HTTPException
+from typing import Dict
+import numpy as np
+
+from services.market_clear.bid_book import as_bid_book, round_like_python
+from services.market_clear.network import get_network, sparse
+from services.market_clear.registry import clearing_mode
+
+# 调度量小于该值视为未调度（线性规划解的数值误差）
+DISPATCH_TOLERANCE = 1e-9
+
+# 线路潮流超过上限的相对容差，超过后才加入潮流约束
+LIMIT_TOLERANCE = 1e-7
+
+
+def clear_market_dc_opf(scenario: Dict, bid_data: Dict[str, dict], mode=None) -> DispatchResult:
+    """直流最优潮流出清，按节点边际价格（LMP）结算
+
+    最小化 Σ offer·p，约束为功率平衡、线路潮流上限和 0 <= p <= 容量（按报价数出清时每条报价 1 MW）。
+    功率平衡约束的对偶变量为参考母线价格（clearing_price），各母线 LMP 再加上线路阻塞价格。
+    报价的 bus 字段指定所在母线。边际报价恰好满额调度时对偶解不唯一，价格可能取该报价或下一条报价。
+    """
+    if sparse is None:
+        raise HTTPException(status_code=501, detail="dc_opf_lmp requires scipy")
+    from scipy.optimize import linprog
+
+    spec = scenario.get("network")
+    if not spec:
+        raise HTTPException(status_code=400, detail="Scenario has no network")
+    try:
+        network = get_network(spec)
+        loads = network.loads(spec, scenario["demand"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    book = as_bid_book(bid_data)
+    codes, buses = book.category_codes("bus")
+    unknown = [bus for bus in buses if bus not in network.bus_index]
+    if unknown or (codes < 0).any():
+        raise HTTPException(status_code=400, detail=f"Bids must be located at a network bus (unknown: {unknown})")
+    bid_bus = np.array([network.bus_index[bus] for bus in buses], dtype=np.int64)[codes]
+
+    offers = book.offer
+    if np.isnan(offers).any():
+        raise KeyError("offer")
+    capacity = book.quantity if clearing_mode(scenario, mode) == "quantity" else np.ones(book.size)
+    capacity = np.maximum(capacity, 0.0)
+
+    total_load = loads.sum()
+    if not book.size:
+        raise HTTPException(status_code=400, detail=f"Not enough capacity to satisfy demand. Demand={total_load} MW, capacity=0 MW")
+
+    # 变量为各报价调度量 p 和各母线发电注入 g（g = 本母线报价调度量之和），潮流约束只作用在 g 上，
+    # 矩阵大小与报价数无关。前 bus_count 个等式为 g_b − Σ p_i = 0，最后一个为功率平衡 Σ g = 总负荷
+    bus_count = len(network.buses)
+    aggregation = sparse.csr_matrix(
+        (-np.ones(book.size), (bid_bus, np.arange(book.size))), shape=(bus_count, book.size)
+    )
+    a_eq = sparse.vstack([
+        sparse.hstack([aggregation, sparse.identity(bus_count)]),
+        sparse.hstack([sparse.csr_matrix((1, book.size)), np.ones((1, bus_count))])
+    ]).tocsr()
+    b_eq = np.r_[np.zeros(bus_count), total_load]
+    costs = np.r_[offers, np.zeros(bus_count)]
+    bounds = np.vstack([np.column_stack([np.zeros(book.size), capacity]), np.full((bus_count, 2), None)])
+
+    # 线路潮流 = PTDF · (g − 负荷)。大多数线路不会阻塞：先不加潮流约束求解，
+    # 再把越限的线路加入约束重新求解，直到没有越限（约束生成），对偶变量与一次加入全部约束相同
+    limited = np.flatnonzero(np.isfinite(network.limits))
+    shift = network.ptdf @ loads
+    active = np.empty(0, dtype=np.int64)
+    while True:
+        a_ub = b_ub = None
+        if len(active):
+            active_ptdf = network.ptdf[active]
+            a_ub = sparse.hstack([
+                sparse.csr_matrix((2 * len(active), book.size)),
+                sparse.vstack([active_ptdf, -active_ptdf])
+            ]).tocsr()
+            b_ub = np.r_[network.limits[active] + shift[active], network.limits[active] - shift[active]]
+        # HiGHS 的预处理在含大量非零元的行（每条母线的汇总约束）上耗时随报价数平方增长，十万条报价时长达数分钟，
+        # 因此关闭预处理；内点法（带 crossover，仍得到基解和对偶变量）在报价很多时比单纯形法快
+        solution = linprog(
+            costs, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=bounds,
+            method="highs-ipm", options={"presolve": False}
+        )
+        if solution.status != 0:
+            raise HTTPException(status_code=400, detail=f"Unable to satisfy demand under network constraints: {solution.message}")
+
+        flows = network.ptdf[limited] @ solution.x[book.size:] - shift[limited]
+        violated = limited[np.abs(flows) > network.limits[limited] * (1 + LIMIT_TOLERANCE) + LIMIT_TOLERANCE]
+        violated = np.setdiff1d(violated, active)
+        if not len(violated):
+            break
+        active = np.union1d(active, violated)
+
+    # 对偶变量（HiGHS marginals）是目标函数对约束右端项的灵敏度，母线 b 的负荷同时出现在平衡约束和潮流约束中
+    energy_price = solution.eqlin.marginals[-1]
+    lmps = np.full(bus_count, energy_price)
+    if len(active):
+        congestion = solution.ineqlin.marginals[:len(active)] - solution.ineqlin.marginals[len(active):]
+        lmps += active_ptdf.T @ congestion
+
+    quantities = np.where(solution.x[:book.size] > DISPATCH_TOLERANCE, solution.x[:book.size], 0.0)
+    dispatched = quantities > 0
+    injections = np.bincount(bid_bus, weights=quantities, minlength=bus_count) - loads
+    flows = network.ptdf @ injections
+    # 价格保留四位小数，去掉求解器的数值误差；利润按保留后的价格计算
+    lmps = np.array(round_like_python(lmps, 4))
+    profits = (lmps[bid_bus] - book.cost) * quantities
+    return book.dispatch_result(
+        scenario, round(energy_price, 4), dispatched, profits, quantities,
+        lmps=dict(zip(map(str, network.buses), lmps.tolist())),
+        line_flows=dict(zip(network.line_ids, round_like_python(flows, 3)))
+    )
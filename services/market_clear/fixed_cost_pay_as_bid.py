@@ -2,39 +2,32 @@
 
 from schemas.simulation import DispatchResult
 from typing import Dict
+from services.market_clear.bid_book import as_bid_book
+from services.market_clear.registry import clearing_mode
 
 
-def clear_market_fixed_pay_as_bid(scenario: Dict, bid_data: Dict[str, dict]) -> DispatchResult:
+def clear_market_fixed_pay_as_bid(scenario: Dict, bid_data: Dict[str, dict], mode: str = None) -> DispatchResult:
     demand = scenario["demand"]
+    book = as_bid_book(bid_data)
+    clearing_price = 0  # 统一价为0（或空），表示是 pay-as-bid 模式
+
+    if clearing_mode(scenario, mode) == "quantity":
+        # 按容量出清：按自己报价和调度容量收入，固定成本只要被调度就全额承担
+        quantities, marginal = book.dispatch_quantity("offer", demand)
+        if marginal is None:
+            raise ValueError("Not enough capacity to satisfy demand")
+        dispatched = quantities > 0
+        profits = (book.offer - book.cost) * quantities - book.fixed_cost
+        return book.dispatch_result(scenario, clearing_price, dispatched, profits, quantities)
 
     # Step 1: 按报价从低到高排序
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = sorted_bids[:demand]
+    winners = book.smallest("offer", demand)
 
     if len(winners) < demand:
         raise ValueError("Not enough bids to satisfy demand")
 
     # Step 2: 不统一定价，每人按自己报价收入
-    dispatched = {}
-    profits = {}
-    clearing_price = 0  # 统一价为0（或空），表示是 pay-as-bid 模式
+    dispatched = book.mask(winners)
+    profits = book.offer - book.cost - book.fixed_cost
 
-    for student, bid in bid_data.items():
-        offer = bid.get('offer', bid.get('price'))
-        cost = bid.get("cost", 0)
-        fixed_cost = bid.get("fixed_cost", 0)
-
-        if student in dict(winners):
-            dispatched[student] = True
-            profit = offer - cost - fixed_cost
-            profits[student] = round(profit, 2)
-        else:
-            dispatched[student] = False
-            profits[student] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
-    )
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
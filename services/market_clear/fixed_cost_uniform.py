@@ -1,33 +1,31 @@
 # services/market_clear/fixed_cost_uniform.py
 
 from schemas.simulation import DispatchResult
+from services.market_clear.bid_book import as_bid_book
+from services.market_clear.registry import clearing_mode
 
 
-def clear_market_fixed_uniform(scenario, bid_data):
+def clear_market_fixed_uniform(scenario, bid_data, mode=None) -> DispatchResult:
     demand = scenario["demand"]
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = sorted_bids[:demand]
+    book = as_bid_book(bid_data)
+
+    if clearing_mode(scenario, mode) == "quantity":
+        # 按容量出清：变动成本按调度容量计，固定成本只要被调度就全额承担
+        quantities, marginal = book.dispatch_quantity("offer", demand)
+        if marginal is None:
+            raise ValueError("Not enough capacity to satisfy demand")
+        clearing_price = book.offer[marginal]
+        dispatched = quantities > 0
+        profits = (clearing_price - book.required("cost", dispatched)) * quantities - book.fixed_cost
+        return book.dispatch_result(scenario, clearing_price, dispatched, profits, quantities)
+
+    winners = book.smallest("offer", demand)
 
     if len(winners) < demand:
         raise ValueError("Not enough bids to satisfy demand")
 
-    clearing_price = winners[-1][1].get('offer', winners[-1][1].get('price'))
-    dispatched = {}
-    profits = {}
-
-    for student, bid in bid_data.items():
-        fixed_cost = bid.get("fixed_cost", 0.0)
-        if student in dict(winners):
-            dispatched[student] = True
-            profit = clearing_price - bid["cost"] - fixed_cost
-            profits[student] = round(profit, 2)
-        else:
-            dispatched[student] = False
-            profits[student] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
-    )
+    clearing_price = book.offer[winners[-1]]
+    dispatched = book.mask(winners)
+    profits = clearing_price - book.required("cost", dispatched) - book.fixed_cost
+
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
@@ -0,0 +1,90 @@
+# services/market_clear/multi_period.py
+
+from schemas.simulation import DispatchResult
+from fastapi import HTTPException
+from typing import Dict
+import numpy as np
+
+from services.market_clear.bid_book import as_bid_book, round_like_python
+from services.market_clear.registry import clearing_mode
+
+# 一天最多的时段数（15 分钟粒度为 96）
+MAX_PERIODS = 1440
+
+
+def demand_profile(scenario, mode):
+    """场景的逐时段需求；没有 demand_profile 时退化为单时段 demand"""
+    profile = np.asarray(scenario.get("demand_profile") or [scenario["demand"]], dtype=float)
+    if profile.ndim != 1 or not 0 < len(profile) <= MAX_PERIODS:
+        raise ValueError(f"Demand profile must have between 1 and {MAX_PERIODS} periods")
+    if not (profile > 0).all():
+        raise ValueError("Demand must be positive in every period")
+    if mode == "count" and (profile != np.floor(profile)).any():
+        raise ValueError("Demand profile must be whole bid counts in count mode")
+    return profile
+
+
+def clear_market_multi_period(scenario: Dict, bid_data: Dict[str, dict], mode=None) -> DispatchResult:
+    """多时段统一价格出清：所有时段作为 时段数 × 报价数 的矩阵一次出清
+
+    场景的 demand_profile 为逐时段需求（按报价数出清时为中标报价数，按容量出清时为 MW）；
+    报价的 offers / costs 为逐时段报价和成本，没有时各时段都使用 offer / cost；
+    与单时段出清一致，被调度的报价两者都没有时抛出 KeyError("cost")，未被调度的报价不需要成本。
+    各时段独立按统一边际价格出清：每行一次稳定排序（与单时段出清的报价顺序一致），
+    名次小于需求的报价中标，第 demand 条报价为该时段价格；按容量出清时沿每行的累计供给曲线找边际报价。
+
+    profits 为各时段利润之和，clearing_price 为各时段价格的平均值；
+    结果附带逐时段价格 period_prices 和各报价的中标时段数 dispatched_periods。
+    """
+    mode = clearing_mode(scenario, mode)
+    book = as_bid_book(bid_data)
+    try:
+        demand = demand_profile(scenario, mode)
+        periods = len(demand)
+        offers = book.period_column("offers", "offer", periods)
+        costs = book.period_column("costs", "cost", periods, np.nan)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if np.isnan(offers).any():
+        raise KeyError("offer")
+
+    rows = np.arange(periods)
+    order = np.argsort(offers, axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(book.size), axis=1)
+
+    if mode == "quantity":
+        capacity = np.maximum(book.quantity, 0.0)
+        cumulative = np.cumsum(capacity[order], axis=1)
+        # 每个时段第一条累计容量达到需求的报价为边际报价
+        marginal = (cumulative < demand[:, None]).sum(axis=1)
+        short = marginal >= book.size
+        if short.any():
+            total = float(cumulative[0, -1]) if book.size else 0.0
+            raise HTTPException(status_code=400, detail=f"Not enough capacity to satisfy demand in period {int(np.argmax(short))}. Demand={demand[short][0]} MW, capacity={total} MW")
+        before = np.where(marginal > 0, cumulative[rows, np.maximum(marginal - 1, 0)], 0.0)
+        quantities = np.where(rank < marginal[:, None], capacity, 0.0)
+        quantities[rows, order[rows, marginal]] = demand - before
+    else:
+        marginal = demand.astype(np.int64) - 1
+        if marginal.max() >= book.size:
+            raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={int(demand.max())}, bids={book.size}")
+        quantities = (rank <= marginal[:, None]).astype(float)
+
+    prices = offers[rows, order[rows, marginal]]
+    scheduled = quantities > 0
+    if np.isnan(costs[scheduled]).any():
+        raise KeyError("cost")
+    profits = np.where(scheduled, (prices[:, None] - costs) * quantities, 0.0).sum(axis=0)
+    dispatched_periods = scheduled.sum(axis=0)
+    dispatched = dispatched_periods > 0
+
+    return book.dispatch_result(
+        scenario,
+        round(float(prices.mean()), 4),
+        dispatched,
+        profits,
+        quantities.sum(axis=0) if mode == "quantity" else None,
+        period_prices=prices.tolist(),
+        dispatched_periods=dict(zip(book.ids, dispatched_periods.tolist()))
+    )
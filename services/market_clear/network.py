@@ -0,0 +1,140 @@
+# services/market_clear/network.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from scipy import sparse
+    from scipy.sparse.linalg import splu
+except ImportError:  # 直流潮流机制需要 scipy，其余机制不受影响
+    sparse = None
+
+# 缓存的网络（PTDF 矩阵）数；网络拓扑不变时重复出清只重新求解线性规划
+NETWORK_CACHE_SIZE = int(os.environ.get("NETWORK_CACHE_SIZE", 32))
+
+# PTDF 中绝对值小于该值的元素置零，辐射状或弱耦合的网络得到稀疏矩阵
+PTDF_TOLERANCE = 1e-10
+# 求解 PTDF 时每批处理的线路数：每批只生成 母线数 × 批大小 的稠密块，置零后立即转为稀疏
+PTDF_BLOCK_LINES = int(os.environ.get("PTDF_BLOCK_LINES", 256))
+
+
+class Network:
+    """直流潮流网络：母线、线路和 PTDF（功率传输分布因子）矩阵
+
+    场景中的 network 字段格式：
+        {
+            "buses": ["B1", "B2", "B3"],
+            "slack": "B1",                      # 参考母线，默认第一条母线
+            "lines": [{"id": "L1", "from": "B1", "to": "B2", "reactance": 0.1, "limit": 100}, ...],
+            "loads": {"B2": 60, "B3": 40}       # 各母线负荷（MW），默认全部需求在参考母线
+        }
+    线路没有 limit 时不设传输上限。ptdf[l, b] 为在母线 b 注入、参考母线吸收 1 MW 时线路 l 的潮流。
+    """
+
+    def __init__(self, spec):
+        if sparse is None:
+            raise RuntimeError("DC power flow requires scipy")
+        self.buses = list(spec.get("buses") or [])
+        if not self.buses:
+            raise ValueError("Network must have at least one bus")
+        self.bus_index = {bus: i for i, bus in enumerate(self.buses)}
+        if len(self.bus_index) != len(self.buses):
+            raise ValueError("Duplicate bus in network")
+        slack = spec.get("slack", self.buses[0])
+        if slack not in self.bus_index:
+            raise ValueError(f"Unknown slack bus: {slack}")
+        self.slack = self.bus_index[slack]
+
+        lines = spec.get("lines") or []
+        self.line_ids = [str(line.get("id", i)) for i, line in enumerate(lines)]
+        try:
+            start = np.array([self.bus_index[line["from"]] for line in lines], dtype=np.int64)
+            end = np.array([self.bus_index[line["to"]] for line in lines], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"Line connects unknown bus: {e.args[0]}")
+        reactance = np.array([line.get("reactance", 0) for line in lines], dtype=float)
+        if (reactance <= 0).any():
+            raise ValueError("Line reactance must be positive")
+        limits = [line.get("limit") for line in lines]
+        self.limits = np.array([np.inf if limit is None else limit for limit in limits], dtype=float)
+        self.ptdf = self._ptdf(start, end, 1.0 / reactance)
+
+    def _ptdf(self, start, end, susceptance):
+        """PTDF = diag(b) A_r B_r^-1，B_r = A_r^T diag(b) A_r 为去掉参考母线的节点电纳矩阵（稀疏 LU 分解）
+
+        按 PTDF_BLOCK_LINES 条线路一批求解，每批的稠密结果置零后只保留非零元素，不生成完整的 线路数 × 母线数 稠密矩阵。
+        """
+        line_count, bus_count = len(start), len(self.buses)
+        rows = np.r_[np.arange(line_count), np.arange(line_count)]
+        incidence = sparse.csr_matrix(
+            (np.r_[np.ones(line_count), -np.ones(line_count)], (rows, np.r_[start, end])),
+            shape=(line_count, bus_count)
+        )
+        keep = np.flatnonzero(np.arange(bus_count) != self.slack)
+        if not line_count or not len(keep):
+            return sparse.csr_matrix((line_count, bus_count))
+
+        weighted = sparse.diags(susceptance) @ incidence[:, keep]
+        reduced = (incidence[:, keep].T @ weighted).tocsc()
+        try:
+            # B_r 对称，B_r^-1 (diag(b) A_r)^T 即 PTDF 的转置
+            factor = splu(reduced)
+        except RuntimeError:
+            raise ValueError("Network is not connected")
+        rhs = weighted.T.tocsc()
+        line_rows, bus_columns, values = [], [], []
+        for begin in range(0, line_count, PTDF_BLOCK_LINES):
+            block = factor.solve(rhs[:, begin:begin + PTDF_BLOCK_LINES].toarray())
+            bus_row, line_column = np.nonzero(np.abs(block) >= PTDF_TOLERANCE)
+            line_rows.append(line_column + begin)
+            bus_columns.append(keep[bus_row])
+            values.append(block[bus_row, line_column])
+
+        return sparse.csr_matrix(
+            (np.concatenate(values), (np.concatenate(line_rows), np.concatenate(bus_columns))),
+            shape=(line_count, bus_count)
+        )
+
+    def loads(self, spec, demand):
+        """各母线负荷向量；未给出 loads 时全部需求在参考母线"""
+        loads = np.zeros(len(self.buses))
+        bus_loads = spec.get("loads")
+        if bus_loads is None:
+            loads[self.slack] = demand
+            return loads
+        for bus, load in bus_loads.items():
+            if bus not in self.bus_index:
+                raise ValueError(f"Load at unknown bus: {bus}")
+            loads[self.bus_index[bus]] += load
+        return loads
+
+
+def network_key(spec):
+    """网络拓扑的哈希；负荷不影响 PTDF，不计入"""
+    topology = {key: spec.get(key) for key in ("buses", "slack", "lines")}
+    return hashlib.sha1(json.dumps(topology, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+_networks = OrderedDict()
+_networks_lock = threading.Lock()
+
+
+def get_network(spec):
+    """按拓扑哈希缓存的 Network（LRU）"""
+    key = network_key(spec)
+    with _networks_lock:
+        network = _networks.get(key)
+        if network is not None:
+            _networks.move_to_end(key)
+            return network
+    network = Network(spec)
+    with _networks_lock:
+        _networks[key] = network
+        while len(_networks) > NETWORK_CACHE_SIZE:
+            _networks.popitem(last=False)
+    return network
@@ -0,0 +1,171 @@
+# services/market_clear/order_book.py
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+
+from mock_data.file_storage import get_bids, bids_version, add_bid_listener
+
+# 内存中保留增量报价簿的场景数（LRU）
+ORDER_BOOK_CACHE_SIZE = int(os.environ.get("ORDER_BOOK_CACHE_SIZE", 64))
+
+
+def _sort_value(bid):
+    """排序值，与 BidBook 的 offer 列一致；缺失或非数值的报价排在最后（与 NumPy 排序中 NaN 的位置相同）"""
+    try:
+        value = float(bid.get("offer", bid.get("price")))
+    except (TypeError, ValueError):
+        value = math.nan
+    return value
+
+
+def _sort_key(bid, seq, student_id):
+    value = _sort_value(bid)
+    missing = math.isnan(value)
+    return (missing, 0.0 if missing else value, seq, student_id)
+
+
+def _quantity(bid):
+    try:
+        return max(float(bid.get("quantity", 1.0)), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrderBook:
+    """一个场景按报价升序维护的报价簿，报价写入/替换/撤回时用二分查找增量更新
+
+    - 排序键为 (是否缺失报价, 报价, 首次提交序号)：报价相同时先提交的在前，与出清时的稳定排序一致；
+      替换报价保留原序号（与存储中字典/行的位置不变一致），撤回后重新提交排在最后
+    - 初始构建对全部排序键一次排序，O(n log n)；之后的写入/替换/撤回用二分查找定位，插入、删除是列表的内存移动
+    - 按报价数出清时第 k 条报价直接按下标取，O(1)；按容量出清时在累计容量上二分查找，O(log n)。
+      插入、删除会移动之后所有报价的位置，累计容量无法按位置增量维护：报价变化后的第一次查询
+      用 accumulate 重建一次（C 层面的 O(n)，百万条报价约几毫秒），没有变化的查询不重建
+    - version 是构建/更新到的 bids_version，与存储不一致时由 get_order_book 重新构建
+    """
+
+    def __init__(self, scenario_id, bid_data, version):
+        self.scenario_id = scenario_id
+        self.version = version
+        self._entries = {}    # student_id -> (排序键, 容量)
+        for seq, (student_id, bid) in enumerate(bid_data.items()):
+            self._entries[student_id] = (_sort_key(bid, seq, student_id), _quantity(bid))
+        self._next_seq = len(self._entries)
+        self._keys = sorted(entry[0] for entry in self._entries.values())  # 升序排列的 (是否缺失, 报价, 序号, student_id)
+        self._quantities = [self._entries[key[3]][1] for key in self._keys]  # 与 _keys 按位置对齐的容量
+        self._prefix = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def apply(self, student_id, bid):
+        """写入或替换一条报价；bid 为 None 表示撤回"""
+        entry = self._entries.pop(student_id, None)
+        if entry is None and bid is None:
+            return
+        if entry is not None:
+            key = entry[0]
+            position = bisect_left(self._keys, key)
+            del self._keys[position]
+            del self._quantities[position]
+            seq = key[2]
+        else:
+            seq = self._next_seq
+            self._next_seq += 1
+        self._prefix = None
+        if bid is None:
+            return
+
+        key = _sort_key(bid, seq, student_id)
+        quantity = _quantity(bid)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._quantities.insert(position, quantity)
+        self._entries[student_id] = (key, quantity)
+
+    def _price(self, position):
+        missing, value = self._keys[position][:2]
+        return None if missing else value
+
+    def marginal(self, demand, mode="count"):
+        """边际报价 (student_id, 报价, 边际报价之前的调度量)；报价数或容量不足时返回 None"""
+        if mode == "quantity":
+            if demand <= 0:
+                raise ValueError("Demand must be positive in quantity mode")
+            if self._prefix is None:
+                self._prefix = list(accumulate(self._quantities))
+            position = bisect_left(self._prefix, demand)
+            if position >= len(self._keys):
+                return None
+            before = self._prefix[position - 1] if position else 0.0
+        else:
+            if demand <= 0 or demand > len(self._keys):
+                return None
+            position = demand - 1
+            before = position
+        return self._keys[position][3], self._price(position), before
+
+    def indicative_price(self, demand, mode="count"):
+        """按当前报价进行统一价格出清时的出清价格；无法出清时返回 None"""
+        marginal = self.marginal(demand, mode)
+        return None if marginal is None else marginal[1]
+
+
+_books = OrderedDict()
+_books_lock = threading.Lock()
+
+
+def get_order_book(scenario_id):
+    """返回与存储中最新报价一致的增量报价簿，版本不一致时重新构建"""
+    # 先读版本号再读报价：构建期间有新报价写入时，新簿登记前回调找不到它、不会补上这条报价，
+    # 但新簿的版本号落后于存储，下一次查询发现版本不一致后重新构建
+    version = bids_version(scenario_id)
+    with _books_lock:
+        book = _books.get(scenario_id)
+        if book is not None and book.version == version:
+            _books.move_to_end(scenario_id)
+            return book
+
+    book = OrderBook(scenario_id, get_bids(scenario_id), version)
+    with _books_lock:
+        current = _books.get(scenario_id)
+        if current is None or current.version < version:
+            _books[scenario_id] = book
+            _books.move_to_end(scenario_id)
+            while len(_books) > ORDER_BOOK_CACHE_SIZE:
+                _books.popitem(last=False)
+        elif current.version > version:
+            book = current
+    return book
+
+
+
+def clear_order_books():
+    with _books_lock:
+        _books.clear()
+
+def indicative_clearing(scenario_id, demand, mode="count"):
+    """当前报价下的指示性统一出清：返回 (版本号, 报价数, 边际报价)，边际报价含义见 OrderBook.marginal"""
+    book = get_order_book(scenario_id)
+    # 查询期间报价簿可能被回调增量更新，与回调持有同一把锁
+    with _books_lock:
+        return book.version, len(book), book.marginal(demand, mode)
+
+
+def _on_bid_saved(scenario_id, student_id, bid_data, version):
+    """报价写入/撤回后增量更新；中间有未见过的版本（其他进程写入、场景修改）时丢弃，下次查询重建"""
+    with _books_lock:
+        book = _books.get(scenario_id)
+        if book is None:
+            return
+        if version is not None and book.version == version - 1:
+            book.apply(student_id, bid_data)
+            book.version = version
+        elif version is None or book.version < version:
+            del _books[scenario_id]
+
+
+add_bid_listener(_on_bid_saved)
@@ -1,31 +1,30 @@
 from schemas.simulation import DispatchResult
 from fastapi import HTTPException
 
+from services.market_clear.bid_book import as_bid_book
+from services.market_clear.registry import clearing_mode
 
-def clear_market_pay_as_bid(scenario, bid_data):
+
+def clear_market_pay_as_bid(scenario, bid_data, mode=None) -> DispatchResult:
     demand = scenario["demand"]
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = sorted_bids[:demand]
+    book = as_bid_book(bid_data)
+    clearing_price = 0  # 不统一，返回 0
 
-    if len(sorted_bids) < demand:
-        raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={demand}, bids={len(sorted_bids)}")
+    if clearing_mode(scenario, mode) == "quantity":
+        # 按容量出清：边际报价部分调度，每条报价按自己的报价和调度容量结算
+        quantities, marginal = book.dispatch_quantity("offer", demand)
+        if marginal is None:
+            raise HTTPException(status_code=400, detail=f"Not enough capacity to satisfy demand. Demand={demand} MW, capacity={book.total_quantity()} MW")
+        dispatched = quantities > 0
+        profits = (book.offer - book.required("cost", dispatched)) * quantities
+        return book.dispatch_result(scenario, clearing_price, dispatched, profits, quantities)
 
-    dispatched = {}
-    profits = {}
-    clearing_price = 0  # 不统一，返回 0
+    winners = book.smallest("offer", demand)
+
+    if book.size < demand:
+        raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={demand}, bids={book.size}")
+
+    dispatched = book.mask(winners)
+    profits = book.offer - book.required("cost", dispatched)  # 按自己报价成交
 
-    for student, bid in bid_data.items():
-        if student in dict(winners):
-            dispatched[student] = True
-            price = bid.get('offer', bid.get('price'))  # 按自己报价成交
-            profits[student] = round(price - bid["cost"], 2)
-        else:
-            dispatched[student] = False
-            profits[student] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
-    )
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
@@ -0,0 +1,147 @@
+# services/market_clear/registry.py
+
+import importlib
+import threading
+
+# 出清模式：count 时 demand 为中标报价数（原有行为），quantity 时 demand 为需求容量（MW）
+CLEARING_MODES = ("count", "quantity")
+
+
+def clearing_mode(scenario, mode=None):
+    """请求指定的模式优先，否则使用场景的 clearing_mode（默认 count）"""
+    mode = mode or scenario.get("clearing_mode", "count")
+    if mode not in CLEARING_MODES:
+        raise ValueError(f"Unknown clearing mode: {mode}")
+    return mode
+
+
+class Mechanism:
+    """一个出清机制的登记信息；实现模块在第一次出清时才导入
+
+    - required_fields：报价中必须提供的字段（"offer|price" 表示二选一）
+    - quantity_aware：支持按容量（MW）出清，实现函数接受 mode 参数
+    - zonal：使用报价的 zone 字段和场景的分区参数
+    - stochastic：考虑报价的可用概率等不确定性
+    - network：使用场景的输电网络（报价的 bus 字段）
+    """
+
+    def __init__(self, name, module, function, description="", required_fields=(),
+                 quantity_aware=False, zonal=False, stochastic=False, network=False):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.description = description
+        self.required_fields = tuple(required_fields)
+        self.quantity_aware = quantity_aware
+        self.zonal = zonal
+        self.stochastic = stochastic
+        self.network = network
+        self._impl = None
+        self._lock = threading.Lock()
+
+    def implementation(self):
+        if self._impl is None:
+            with self._lock:
+                if self._impl is None:
+                    self._impl = getattr(importlib.import_module(self.module), self.function)
+        return self._impl
+
+    def clear(self, scenario, bid_data, mode=None):
+        """执行出清；bid_data 可以是 {student_id: bid} 或 BidBook"""
+        if self.quantity_aware:
+            return self.implementation()(scenario, bid_data, mode)
+        return self.implementation()(scenario, bid_data)
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            "required_fields": list(self.required_fields),
+            "capabilities": {
+                "quantity_aware": self.quantity_aware,
+                "zonal": self.zonal,
+                "stochastic": self.stochastic,
+                "network": self.network
+            },
+            "loaded": self._impl is not None
+        }
+
+
+_mechanisms = {}
+
+
+def register_mechanism(name, module, function, **options):
+    """登记出清机制；同名机制会被替换"""
+    mechanism = Mechanism(name, module, function, **options)
+    _mechanisms[name] = mechanism
+    return mechanism
+
+
+def get_mechanism(name):
+    return _mechanisms.get(name)
+
+
+def list_mechanisms():
+    return list(_mechanisms.values())
+
+
+register_mechanism(
+    "uniform_price", "services.market_clear.uniform_price", "clear_market_uniform",
+    description="统一边际价格出清",
+    required_fields=("offer|price", "cost"),
+    quantity_aware=True
+)
+register_mechanism(
+    "pay_as_bid", "services.market_clear.pay_as_bid", "clear_market_pay_as_bid",
+    description="按报价结算（pay-as-bid）",
+    required_fields=("offer|price", "cost"),
+    quantity_aware=True
+)
+register_mechanism(
+    "fixed_cost_uniform", "services.market_clear.fixed_cost_uniform", "clear_market_fixed_uniform",
+    description="统一价格，利润扣除固定成本",
+    required_fields=("offer|price", "cost"),
+    quantity_aware=True
+)
+register_mechanism(
+    "fixed_cost_pay_as_bid", "services.market_clear.fixed_cost_pay_as_bid", "clear_market_fixed_pay_as_bid",
+    description="按报价结算，利润扣除固定成本",
+    required_fields=("offer|price",),
+    quantity_aware=True
+)
+register_mechanism(
+    "zone_limit_uniform", "services.market_clear.zone_limit_uniform", "clear_market_zone_uniform",
+    description="分区调度上限下的统一价格出清",
+    required_fields=("offer|price", "zone"),
+    zonal=True
+)
+register_mechanism(
+    "constrained_on", "services.market_clear.constrained_on", "clear_market_constrained_on",
+    description="统一价格出清，强制运行机组按成本补偿",
+    required_fields=("offer|price",)
+)
+register_mechanism(
+    "risk_adjusted_uniform", "services.market_clear.risk_adjusted_uniform", "clear_market_risk_adjusted_uniform",
+    description="按 报价/可用概率 排序的风险调整统一价格",
+    required_fields=("offer|price",),
+    stochastic=True
+)
+register_mechanism(
+    "two_stage", "services.market_clear.two_stage_market", "clear_market_two_stage",
+    description="日前 + 实时两阶段市场；场景给出实时需求分布时按抽样计算期望利润",
+    required_fields=("offer|price",),
+    stochastic=True
+)
+register_mechanism(
+    "dc_opf_lmp", "services.market_clear.dc_opf_lmp", "clear_market_dc_opf",
+    description="直流最优潮流出清，按节点边际价格（LMP）结算",
+    required_fields=("offer|price", "bus"),
+    quantity_aware=True,
+    network=True
+)
+register_mechanism(
+    "multi_period_uniform", "services.market_clear.multi_period", "clear_market_multi_period",
+    description="多时段统一价格出清：场景给出逐时段需求，报价可给出逐时段报价",
+    required_fields=("offer|price", "cost|costs"),
+    quantity_aware=True
+)
@@ -0,0 +1,78 @@
+# services/market_clear/result_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+
+# 缓存的出清结果数（按 场景 + 机制 + 模式 计，每个组合只保留最新版本）
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 256))
+
+
+class ResultCache:
+    """出清结果的 LRU 缓存，键为 (scenario_id, mechanism, mode, bids_version)
+
+    报价或场景每次写入都会递增 bids_version，旧版本的结果不会再被命中；
+    同一 (scenario_id, mechanism, mode) 写入新版本时直接替换旧版本，不必等 LRU 淘汰。
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (scenario_id, mechanism, mode) -> (version, result)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, scenario_id, mechanism, mode, version):
+        """命中时返回结果，否则返回 None"""
+        prefix = (scenario_id, mechanism, mode)
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(prefix)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, scenario_id, mechanism, mode, version, result):
+        if self.max_size <= 0:
+            return
+        prefix = (scenario_id, mechanism, mode)
+        with self._lock:
+            self._entries[prefix] = (version, result)
+            self._entries.move_to_end(prefix)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["max_size"] = self.max_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_result_cache = ResultCache()
+
+
+def get_cached_result(scenario_id, mechanism, mode, version):
+    return _result_cache.get(scenario_id, mechanism, mode, version)
+
+
+def cache_result(scenario_id, mechanism, mode, version, result):
+    _result_cache.put(scenario_id, mechanism, mode, version, result)
+
+
+def result_cache_stats():
+    """出清结果缓存的命中统计"""
+    return _result_cache.stats()
+
+
+def clear_result_cache():
+    _result_cache.clear()
@@ -2,42 +2,21 @@
 
 from schemas.simulation import DispatchResult
 from typing import Dict
+from services.market_clear.bid_book import as_bid_book
 
 
 def clear_market_risk_adjusted_uniform(scenario: Dict, bid_data: Dict[str, dict]) -> DispatchResult:
     demand = scenario["demand"]
+    book = as_bid_book(bid_data)
 
-    # 使用期望报价 = offer / probability
-    def expected_offer(bid):
-        prob = bid.get("probability", 1)
-        return bid.get('offer', bid.get('price')) / prob if prob > 0 else float("inf")
-
-    sorted_bids = sorted(bid_data.items(), key=lambda x: expected_offer(x[1]))
-    winners = sorted_bids[:demand]
+    # 使用期望报价 = offer / probability 排序
+    winners = book.smallest("expected_offer", demand)
 
     if len(winners) < demand:
         raise ValueError("Not enough bids to satisfy demand")
 
-    clearing_price = winners[-1][1].get('offer', winners[-1][1].get('price'))
-    dispatched = {}
-    profits = {}
-
-    for student_id, bid in bid_data.items():
-        cost = bid.get("cost", 0)
-        risk_cost = bid.get("risk_cost", 0)
-        prob = bid.get("probability", 1.0)
-
-        if student_id in dict(winners):
-            dispatched[student_id] = True
-            profit = clearing_price - cost - risk_cost * (1 - prob)
-            profits[student_id] = round(profit, 2)
-        else:
-            dispatched[student_id] = False
-            profits[student_id] = 0.0
+    clearing_price = book.offer[winners[-1]]
+    dispatched = book.mask(winners)
+    profits = clearing_price - book.cost - book.risk_cost * (1 - book.probability)
 
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
-    )
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
@@ -0,0 +1,151 @@
+# services/market_clear/risk_simulation.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from services.market_clear.bid_book import as_bid_book, round_like_python
+from services.market_clear.registry import clearing_mode
+
+# 每批抽样矩阵（试验数 × 报价数）的最大元素数，控制内存占用
+BATCH_ELEMENTS = int(os.environ.get("RISK_SIMULATION_BATCH_ELEMENTS", 4000000))
+
+# 试验按固定大小分块，每块使用独立的随机数流：无论是否使用进程池，同一个 seed 的结果都相同
+CHUNK_TRIALS = 2000
+
+MAX_TRIALS = 1000000
+
+# 学生一次最多可请求的试验次数，更大的模拟只对教师开放
+STUDENT_MAX_TRIALS = 10000
+
+# 模拟进程池的进程数；默认 1 表示在调用线程内计算，不创建子进程
+RISK_SIMULATION_WORKERS = int(os.environ.get("RISK_SIMULATION_WORKERS", 1))
+
+PRICE_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """获取模拟进程池（首次调用时创建，所有请求共用）
+
+    子进程用 spawn 启动：服务进程是多线程的，fork 可能复制其他线程持有的锁。
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RISK_SIMULATION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool(wait=True):
+    """关闭模拟进程池，下次调用时重新创建"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def _simulate_chunk(offers, probability, scheduled, demand, trials, seed):
+    """模拟一块试验，返回汇总量 (各报价中标次数, 各报价中标收入之和, 各报价计划内不可用次数, 缺额次数, 各试验价格)
+
+    所有数组都已按风险调整排序（offer / probability）排列。
+    """
+    rng = np.random.default_rng(seed)
+    size = len(offers)
+    wins = np.zeros(size, dtype=np.int64)
+    revenue = np.zeros(size)
+    failures = np.zeros(size, dtype=np.int64)
+    shortfalls = 0
+    prices = np.empty(trials)
+    batch = max(1, BATCH_ELEMENTS // size)
+
+    for start in range(0, trials, batch):
+        count = min(batch, trials - start)
+        available = rng.random((count, size)) < probability
+        # 可用报价按排序依次中标，第 demand 个可用报价为边际报价
+        taken = np.cumsum(available, axis=1, dtype=np.int32)
+        won = available & (taken <= demand)
+        short = taken[:, -1] < demand
+        # 缺额时全部可用报价中标，最后一个可用报价为边际报价；没有可用报价时价格为 NaN
+        marginal = np.where(short, size - 1 - np.argmax(available[:, ::-1], axis=1), np.argmax(taken >= demand, axis=1))
+        price = np.where(taken[:, -1] > 0, offers[marginal], np.nan)
+
+        wins += won.sum(axis=0)
+        revenue += np.nan_to_num(price) @ won
+        failures += (~available & scheduled).sum(axis=0)
+        shortfalls += int(short.sum())
+        prices[start:start + count] = price
+    return wins, revenue, failures, shortfalls, prices
+
+
+def simulate_availability(scenario, bid_data, trials=10000, seed=0):
+    """风险调整统一价格的可用性蒙特卡洛模拟
+
+    每次试验按各报价的 probability 独立抽取是否可用（伯努利），在可用报价中按风险调整排序重新出清：
+    可用报价依次中标直到满足需求，边际报价为出清价格；可用报价不足时记为缺额，全部可用报价中标。
+    确定性出清中中标（计划内）但在试验中不可用的报价承担 risk_cost。
+
+    试验以矩阵批量计算；RISK_SIMULATION_WORKERS > 1 时各块试验分发到共用的进程池。返回汇总结果字典。
+    """
+    if clearing_mode(scenario) != "count":
+        raise ValueError("Availability simulation supports count clearing only")
+    if not 0 < trials <= MAX_TRIALS:
+        raise ValueError(f"Trials must be between 1 and {MAX_TRIALS}")
+    demand = scenario["demand"]
+    if demand < 1:
+        raise ValueError("Demand must be at least 1")
+    book = as_bid_book(bid_data)
+    if not book.size:
+        raise ValueError("No bids to simulate")
+
+    order = book.sorted_indices("expected_offer")
+    offers = book.offer[order]
+    probability = np.clip(book.probability, 0.0, 1.0)[order]
+    scheduled = np.zeros(book.size, dtype=bool)
+    scheduled[:demand] = True
+
+    sizes = [min(CHUNK_TRIALS, trials - start) for start in range(0, trials, CHUNK_TRIALS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(offers, probability, scheduled, demand, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if RISK_SIMULATION_WORKERS > 1 and len(args) > 1:
+        chunks = list(get_pool().map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*chunk_args) for chunk_args in args]
+
+    wins = sum(chunk[0] for chunk in chunks)
+    revenue = sum(chunk[1] for chunk in chunks)
+    failures = sum(chunk[2] for chunk in chunks)
+    shortfalls = sum(chunk[3] for chunk in chunks)
+    prices = np.concatenate([chunk[4] for chunk in chunks])
+
+    # 按原有顺序还原
+    expected = np.empty(book.size)
+    dispatch_probability = np.empty(book.size)
+    cost = book.cost[order]
+    risk_cost = book.risk_cost[order]
+    expected[order] = (revenue - wins * cost - failures * risk_cost) / trials
+    dispatch_probability[order] = wins / trials
+
+    priced = prices[~np.isnan(prices)]
+    return {
+        "scenario_id": scenario["scenario_id"],
+        "trials": trials,
+        "demand": demand,
+        "shortfall_probability": round(shortfalls / trials, 6),
+        "expected_price": round(float(priced.mean()), 4) if len(priced) else None,
+        "price_percentiles": (
+            dict(zip((f"p{q}" for q in PRICE_PERCENTILES), round_like_python(np.percentile(priced, PRICE_PERCENTILES))))
+            if len(priced) else {}
+        ),
+        "expected_profits": dict(zip(book.ids, round_like_python(expected))),
+        "dispatch_probability": dict(zip(book.ids, round_like_python(dispatch_probability, 4)))
+    }
@@ -1,49 +1,129 @@
 # services/market_clear/two_stage_market.py
 
 from schemas.simulation import DispatchResult
+from fastapi import HTTPException
 from typing import Dict
+import numpy as np
+from services.market_clear.bid_book import as_bid_book, round_like_python
+
+# 随机模式的默认样本数和上限
+RT_SAMPLES = 10000
+RT_MAX_SAMPLES = 1000000
+
+# 随机模式报告的实时价格分位数
+PRICE_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def sample_demand(distribution, rng):
+    """按场景的 demand_RT_distribution 抽取实时需求样本（取整为中标报价数）
+
+    支持的分布：
+        {"type": "normal", "mean": 10, "std": 2}
+        {"type": "uniform", "low": 8, "high": 12}
+        {"type": "poisson", "lam": 10}
+        {"type": "discrete", "values": [8, 10, 12], "probabilities": [0.25, 0.5, 0.25]}
+    可选 samples（样本数，默认 RT_SAMPLES）和 seed（默认 0，结果可复现）。
+    """
+    samples = int(distribution.get("samples", RT_SAMPLES))
+    if not 0 < samples <= RT_MAX_SAMPLES:
+        raise ValueError(f"RT samples must be between 1 and {RT_MAX_SAMPLES}")
+    kind = distribution.get("type")
+    if kind == "normal":
+        values = rng.normal(distribution["mean"], distribution.get("std", 0.0), samples)
+    elif kind == "uniform":
+        values = rng.uniform(distribution["low"], distribution["high"], samples)
+    elif kind == "poisson":
+        values = rng.poisson(distribution["lam"], samples)
+    elif kind == "discrete":
+        values = rng.choice(distribution["values"], samples, p=distribution.get("probabilities"))
+    else:
+        raise ValueError(f"Unknown demand distribution: {kind}")
+    return np.rint(values).astype(np.int64)
 
 
 def clear_market_two_stage(scenario: Dict, bid_data: Dict[str, dict]) -> DispatchResult:
     demand_da = scenario.get("demand_DA", scenario["demand"])  # 日前需求
     demand_rt = scenario.get("demand_RT", scenario["demand"])  # 实时需求
+    book = as_bid_book(bid_data)
 
     # Step 1: 日前市场出清（DA）
-    sorted_da = sorted(bid_data.items(), key=lambda x: x[1].get("offer_DA", x[1].get("offer", x[1].get("price"))))
-    winners_da = sorted_da[:demand_da]
-    price_da = winners_da[-1][1].get("offer_DA", winners_da[-1][1].get("offer", winners_da[-1][1].get("price")))
+    winners_da = book.smallest("offer_DA", demand_da)
+    price_da = book.column("offer_DA")[winners_da[-1]]
+
+    if scenario.get("demand_RT_distribution"):
+        return clear_stochastic_rt(scenario, book, winners_da, price_da)
 
     # Step 2: 实时市场补差值（RT）
-    sorted_rt = sorted(bid_data.items(), key=lambda x: x[1].get("offer_RT", x[1].get("offer", x[1].get("price"))))
-    winners_rt = sorted_rt[:demand_rt]
-    price_rt = winners_rt[-1][1].get("offer_RT", winners_rt[-1][1].get("offer", winners_rt[-1][1].get("price")))
+    winners_rt = book.smallest("offer_RT", demand_rt)
+    price_rt = book.column("offer_RT")[winners_rt[-1]]
+
+    in_da = book.mask(winners_da)
+    in_rt = book.mask(winners_rt)
+    dispatched = in_da | in_rt
+
+    # 日前中标按日前价结算；只在实时中标的补实时差额
+    price = np.where(in_da, price_da, price_rt)
+    profits = price - book.cost - book.fixed_cost
+
+    return book.dispatch_result(
+        scenario,
+        price_rt,  # 以 RT 市场价格为最终展示价
+        dispatched,
+        profits
+    )
+
 
-    dispatched = {}
-    profits = {}
+def clear_stochastic_rt(scenario, book, winners_da, price_da):
+    """随机实时需求：日前出清一次，实时市场对所有需求样本一次性向量化计算
 
-    for student_id, bid in bid_data.items():
-        cost = bid.get("cost", 0)
-        fixed_cost = bid.get("fixed_cost", 0)
+    实时报价只排序一次。样本 s 的需求为 d_s 时，实时排序中名次 r < d_s 的报价中标，价格为第 d_s 条报价。
+    把样本按需求排序并计算价格的后缀和，每条报价的中标样本数和价格之和都只需一次二分查找，
+    总耗时 O(n log n + N log N)。需求超过报价数时按全部报价中标（与确定性出清的切片一致），
+    需求不为正的样本实时市场不出清。
 
-        offer_da = bid.get("offer_DA", bid.get("offer", bid.get("price")))
-        offer_rt = bid.get("offer_RT", bid.get("offer", bid.get("price")))
+    profits 为期望利润，clearing_price 为期望实时价格；结果附带每条报价的调度概率和实时价格分位数。
+    """
+    distribution = scenario["demand_RT_distribution"]
+    try:
+        demand = sample_demand(distribution, np.random.default_rng(distribution.get("seed", 0)))
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid RT demand distribution: {e}")
+    samples = len(demand)
+    demand = np.clip(demand, 0, book.size)
 
-        in_da = student_id in dict(winners_da)
-        in_rt = student_id in dict(winners_rt)
+    order = book.sorted_indices("offer_RT")
+    offers = book.column("offer_RT")[order]
+    rank = np.empty(book.size, dtype=np.int64)
+    rank[order] = np.arange(book.size)
 
-        dispatched[student_id] = in_da or in_rt
+    # 各样本的实时价格（需求为 0 的样本没有价格）
+    demand.sort()
+    cleared = demand > 0
+    prices = np.full(samples, np.nan)
+    prices[cleared] = offers[demand[cleared] - 1]
+    suffix = np.r_[np.cumsum(np.where(cleared, prices, 0.0)[::-1])[::-1], 0.0]
 
-        profit = 0.0
-        if in_da:
-            profit += price_da - cost - fixed_cost
-        if in_rt and not in_da:
-            profit += price_rt - cost - fixed_cost  # 只补实时差额
+    # 名次为 r 的报价在 d_s > r 的样本中中标
+    first = np.searchsorted(demand, rank, side="right")
+    wins = samples - first
+    revenue = suffix[first]
 
-        profits[student_id] = round(profit, 2)
+    in_da = book.mask(winners_da)
+    unit_cost = book.cost + book.fixed_cost
+    probability = np.where(in_da, 1.0, wins / samples)
+    profits = np.where(in_da, price_da - unit_cost, (revenue - wins * unit_cost) / samples)
 
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=price_rt,  # 以 RT 市场价格为最终展示价
-        dispatched=dispatched,
-        profits=profits
-    )
\ No newline at end of file
+    valid = prices[cleared]
+    expected_price = float(valid.mean()) if len(valid) else float(price_da)
+    percentiles = (
+        dict(zip((f"p{q}" for q in PRICE_PERCENTILES), round_like_python(np.percentile(valid, PRICE_PERCENTILES))))
+        if len(valid) else {}
+    )
+    return book.dispatch_result(
+        scenario,
+        round(expected_price, 4),
+        probability > 0,
+        profits,
+        dispatch_probability=dict(zip(book.ids, round_like_python(probability, 4))),
+        price_percentiles=percentiles
+    )
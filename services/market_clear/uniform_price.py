@@ -1,30 +1,31 @@
 from schemas.simulation import DispatchResult
 from fastapi import HTTPException
 
+from services.market_clear.bid_book import as_bid_book
+from services.market_clear.registry import clearing_mode
 
-def clear_market_uniform(scenario, bid_data):
+
+def clear_market_uniform(scenario, bid_data, mode=None) -> DispatchResult:
     demand = scenario["demand"]
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = sorted_bids[:demand]
-
-    if len(sorted_bids) < demand:
-        raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={demand}, bids={len(sorted_bids)}")
-
-    clearing_price = winners[-1][1].get('offer', winners[-1][1].get('price'))
-    dispatched = {}
-    profits = {}
-
-    for student, bid in bid_data.items():
-        if student in dict(winners):
-            dispatched[student] = True
-            profits[student] = round(clearing_price - bid["cost"], 2)
-        else:
-            dispatched[student] = False
-            profits[student] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
-    )
+    book = as_bid_book(bid_data)
+
+    if clearing_mode(scenario, mode) == "quantity":
+        # 按容量出清：边际报价部分调度，利润按调度容量计
+        quantities, marginal = book.dispatch_quantity("offer", demand)
+        if marginal is None:
+            raise HTTPException(status_code=400, detail=f"Not enough capacity to satisfy demand. Demand={demand} MW, capacity={book.total_quantity()} MW")
+        clearing_price = book.offer[marginal]
+        dispatched = quantities > 0
+        profits = (clearing_price - book.required("cost", dispatched)) * quantities
+        return book.dispatch_result(scenario, clearing_price, dispatched, profits, quantities)
+
+    winners = book.smallest("offer", demand)
+
+    if book.size < demand:
+        raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={demand}, bids={book.size}")
+
+    clearing_price = book.offer[winners[-1]]
+    dispatched = book.mask(winners)
+    profits = clearing_price - book.required("cost", dispatched)
+
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits)
@@ -0,0 +1,126 @@
+# services/market_clear/what_if.py
+
+import numpy as np
+from fastapi import HTTPException
+
+from services.market_clear.bid_book import BidBook, round_like_python
+
+# 一次最多评估的备选报价数
+MAX_ALTERNATIVES = 50
+
+# 可以对其余报价只排序一次、向量化评估全部备选报价的机制：(按统一价格结算, 扣除固定成本)
+VECTORIZED_MECHANISMS = {
+    "uniform_price": (True, False),
+    "fixed_cost_uniform": (True, True),
+    "pay_as_bid": (False, False),
+    "fixed_cost_pay_as_bid": (False, True),
+}
+
+
+def alternative_bids(current, alternatives):
+    """备选报价：在调用者当前报价（没有时为空）的基础上覆盖备选中给出的字段"""
+    base = dict(current or {})
+    return [{**base, **{key: value for key, value in alternative.items() if value is not None}} for alternative in alternatives]
+
+
+def evaluate_alternatives(scenario, mechanism, bid_data, student_id, alternatives, mode):
+    """在其余报价不变的情况下评估调用者的多个备选报价，不修改 bid_data
+
+    统一价格 / 按报价结算类机制（VECTORIZED_MECHANISMS）把其余报价只排序一次，
+    各备选报价在排序中的位置用 searchsorted 一次求出，出清价格和中标容量都由位置直接算出；
+    报价相同时按原有顺序排在前面的报价优先（与稳定排序一致：已有报价保持原位置，新报价排在最后）。
+    其他机制逐个备选报价重新出清。返回每个备选报价的结果字典列表，单个备选出清失败时记录 error。
+    """
+    bids = alternative_bids(bid_data.get(student_id), alternatives)
+    if mechanism.name not in VECTORIZED_MECHANISMS:
+        return [_clear_alternative(scenario, mechanism, bid_data, student_id, bid, mode) for bid in bids]
+
+    uniform, fixed = VECTORIZED_MECHANISMS[mechanism.name]
+    if "cost" in mechanism.required_fields and any("cost" not in bid for bid in bids):
+        raise HTTPException(status_code=400, detail="Alternative bids must include cost")
+    ids = list(bid_data)
+    position = ids.index(student_id) if student_id in bid_data else len(ids)
+    others = BidBook({key: bid for key, bid in bid_data.items() if key != student_id})
+    order = others.sorted_indices("offer")
+    sorted_offers = others.offer[order]
+
+    alternative = BidBook({str(i): bid for i, bid in enumerate(bids)})
+    offer = alternative.offer
+    if np.isnan(offer).any():
+        raise HTTPException(status_code=400, detail="Alternative bids must include offer")
+    cost = alternative.cost
+    fixed_cost = alternative.fixed_cost if fixed else np.zeros(len(bids))
+
+    # 备选报价在其余报价排序中的位置：报价更低的，加上报价相同且原有顺序在前的
+    preceding = np.sort(others.offer[:position])
+    rank = (
+        np.searchsorted(sorted_offers, offer, side="left")
+        + np.searchsorted(preceding, offer, side="right")
+        - np.searchsorted(preceding, offer, side="left")
+    )
+    demand = scenario["demand"]
+    error = np.zeros(len(bids), dtype=bool)
+
+    if mode == "quantity":
+        if demand <= 0:
+            raise HTTPException(status_code=400, detail="Demand must be positive in quantity mode")
+        quantity = np.maximum(alternative.quantity, 0.0)
+        cumulative = np.cumsum(np.maximum(others.quantity, 0.0)[order])
+        before = np.where(rank > 0, cumulative[np.maximum(rank - 1, 0)] if others.size else 0.0, 0.0)
+        # 排在前面的报价已满足需求：边际报价在前面；调用者能满足剩余需求：调用者为边际报价；
+        # 否则调用者全部调度，其余需求由排在后面的报价满足
+        covered = before >= demand
+        marginal_self = ~covered & (before + quantity >= demand)
+        remaining = np.where(covered, demand, demand - quantity)
+        marginal = np.searchsorted(cumulative, remaining, side="left")
+        error = ~marginal_self & (marginal >= others.size)
+        price = np.where(marginal_self, offer, sorted_offers[np.minimum(marginal, max(others.size - 1, 0))] if others.size else np.nan)
+        dispatched_quantity = np.where(covered, 0.0, np.minimum(quantity, demand - before))
+        paid = price if uniform else offer
+        profits = (paid - cost) * dispatched_quantity - fixed_cost
+    else:
+        if others.size + 1 < demand:
+            raise HTTPException(status_code=400, detail=f"Not enough bids to satisfy demand. Demand={demand}, bids={others.size + 1}")
+        dispatched_quantity = (rank < demand).astype(float)
+        # 合并后第 demand 条报价：调用者排在它之前时为其余报价的第 demand - 1 条，恰好是它时为调用者，之后为第 demand 条
+        above = sorted_offers[min(demand - 1, others.size - 1)] if others.size >= demand else np.nan
+        below = sorted_offers[demand - 2] if demand >= 2 else np.nan
+        price = np.where(rank < demand - 1, below, np.where(rank == demand - 1, offer, above))
+        paid = price if uniform else offer
+        profits = paid - cost - fixed_cost
+
+    dispatched = (dispatched_quantity > 0) & ~error
+    profits = round_like_python(np.where(dispatched, profits, 0.0))
+    prices = price.tolist() if uniform else [0.0] * len(bids)
+    quantities = round_like_python(dispatched_quantity, 3)
+    outcomes = []
+    for i, bid in enumerate(bids):
+        if error[i]:
+            outcomes.append({"offer": bid["offer"], "error": "Not enough capacity to satisfy demand"})
+            continue
+        outcome = {"offer": bid["offer"], "dispatched": bool(dispatched[i]), "profit": profits[i], "clearing_price": prices[i]}
+        if mode == "quantity":
+            outcome["dispatched_quantity"] = quantities[i]
+        outcomes.append(outcome)
+    return outcomes
+
+
+def _clear_alternative(scenario, mechanism, bid_data, student_id, bid, mode):
+    """非向量化机制：用备选报价替换调用者的报价后重新出清"""
+    book = dict(bid_data)
+    book[student_id] = bid
+    try:
+        result = mechanism.clear(scenario, book, mode)
+    except HTTPException as e:
+        return {"offer": bid.get("offer"), "error": str(e.detail)}
+    except (ValueError, KeyError, IndexError) as e:
+        return {"offer": bid.get("offer"), "error": f"{type(e).__name__}: {e}"}
+    outcome = {
+        "offer": bid.get("offer"),
+        "dispatched": result.dispatched[student_id],
+        "profit": result.profits[student_id],
+        "clearing_price": result.clearing_price
+    }
+    if result.dispatched_quantity is not None:
+        outcome["dispatched_quantity"] = result.dispatched_quantity[student_id]
+    return outcome
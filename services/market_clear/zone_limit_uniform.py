@@ -2,52 +2,102 @@
 
 from schemas.simulation import DispatchResult
 from typing import Dict
-from collections import defaultdict
+import numpy as np
+from services.market_clear.bid_book import as_bid_book
+
+# 没有分区的报价：exclude 不参与出清（原有行为）；uncapped 作为一个不设上限的独立队列参与
+UNZONED_POLICIES = ("exclude", "uncapped")
+
+
+def zone_queues(sorted_codes, limits):
+    """按分区拆分的报价队列，截断到分区上限后拼接返回
+
+    队列元素是报价在全局排序中的位置；一次按分区稳定排序得到所有队列，各队列内保持报价顺序。
+    分区达到上限后队列即耗尽，不再参与合并；没有分区（编号为负）的报价不入队。
+    """
+    if not len(sorted_codes):
+        return np.empty(0, dtype=np.int64)
+    by_zone = np.argsort(sorted_codes, kind="stable")
+    grouped = sorted_codes[by_zone]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    lengths = np.diff(np.r_[starts, len(grouped)])
+    # 上限可能是小数：原逻辑在 已中标数 < 上限 时继续中标，即最多 ceil(上限) 条
+    caps = np.maximum(np.ceil(limits[np.maximum(grouped[starts], 0)]), 0)
+    takes = np.where(grouped[starts] >= 0, np.minimum(lengths, caps), 0).astype(np.int64)
+    rank = np.arange(len(grouped)) - np.repeat(starts, lengths)
+    kept = rank < np.repeat(takes, lengths)
+    return by_zone[kept]
+
+
+def merge_queues(entries, count):
+    """k 路归并各分区队列，取全局位置最小的 count 个
+
+    队列元素是互不相同的整数位置，归并等价于在所有队列元素中选出最小的 count 个：
+    count 较小时 argpartition 部分选择，O(m + count log count)。
+    """
+    if count < len(entries):
+        entries = entries[np.argpartition(entries, count - 1)[:count]]
+    return np.sort(entries)
 
 
 def clear_market_zone_uniform(scenario: Dict, bid_data: Dict[str, dict]) -> DispatchResult:
+    """分区调度上限下的统一价格出清
+
+    场景参数：
+    - zone_limits：{分区: 最多中标报价数}，未列出或为 null 的分区不设上限
+    - unzoned_bids：没有分区的报价如何处理，见 UNZONED_POLICIES，默认 exclude
+    - zone_prices：为 true 时各分区中标者按本分区的边际报价结算，结果附带 zone_prices
+    """
     demand = scenario["demand"]
-    zone_limits = scenario.get("zone_limits", {})  # e.g., {"West": 2, "East": 2}
+    zone_limits = scenario.get("zone_limits") or {}  # e.g., {"West": 2, "East": 2}
+    unzoned = scenario.get("unzoned_bids") or "exclude"
+    if unzoned not in UNZONED_POLICIES:
+        raise ValueError(f"Unknown unzoned bid policy: {unzoned}")
+    book = as_bid_book(bid_data)
 
     # 按报价升序排列
-    sorted_bids = sorted(bid_data.items(), key=lambda x: x[1].get('offer', x[1].get('price')))
-    winners = []
-    zone_count = defaultdict(int)
-    total_dispatched = 0
-
-    # 分区限制调度
-    for student_id, bid in sorted_bids:
-        zone = bid.get("zone")
-        if zone is None:
-            continue
-
-        if zone_count[zone] < zone_limits.get(zone, demand):
-            winners.append((student_id, bid))
-            zone_count[zone] += 1
-            total_dispatched += 1
-
-        if total_dispatched >= demand:
-            break
-
-    if total_dispatched < demand:
-        raise ValueError("Unable to fulfill demand under zone constraints")
+    order = book.sorted_indices("offer")
+    codes, zones = book.zone_codes()
+    sorted_codes = codes[order]
+    if unzoned == "uncapped":
+        # 没有分区的报价编为最后一个分区
+        sorted_codes = np.where(sorted_codes < 0, len(zones), sorted_codes)
 
-    clearing_price = winners[-1][1].get('offer', winners[-1][1].get('price'))
-    dispatched = {}
-    profits = {}
-
-    for student_id, bid in bid_data.items():
-        cost = bid.get("cost", 0)
-        if student_id in dict(winners):
-            dispatched[student_id] = True
-            profits[student_id] = round(clearing_price - cost, 2)
-        else:
-            dispatched[student_id] = False
-            profits[student_id] = 0.0
-
-    return DispatchResult(
-        scenario_id=scenario["scenario_id"],
-        clearing_price=clearing_price,
-        dispatched=dispatched,
-        profits=profits
+    # 不设上限的分区以 demand 为上限：demand 为正时与无上限等价，demand 不为正时与原逻辑一致（不中标）
+    uncapped = max(demand, 0)
+    limits = np.array(
+        [uncapped if zone_limits.get(zone) is None else zone_limits[zone] for zone in zones] + [uncapped],
+        dtype=float
     )
+
+    if demand > 0:
+        # 各分区队列已按报价排好序，归并后按全局报价顺序取满 demand 条
+        positions = merge_queues(zone_queues(sorted_codes, limits), demand)
+        winners = order[positions]
+    else:
+        # 需求不为正时原逻辑在第一条有分区的报价后就停止
+        first = np.flatnonzero(sorted_codes >= 0)[:1]
+        positions = first[limits[sorted_codes[first]] > 0]
+        winners = order[positions]
+
+    if len(winners) < demand:
+        raise ValueError("Unable to fulfill demand under zone constraints")
+
+    clearing_price = book.offer[winners[-1]]
+    dispatched = book.mask(winners)
+    profits = clearing_price - book.cost
+
+    prices = None
+    if scenario.get("zone_prices") and len(winners):
+        # 各分区的边际报价 = 本分区排序最靠后的中标者的报价
+        last = np.full(len(zones) + 1, -1, dtype=np.int64)
+        np.maximum.at(last, sorted_codes[positions], positions)
+        zone_price = np.where(last >= 0, book.offer[order[last]], np.nan)
+        prices = {str(zone): float(zone_price[code]) for code, zone in enumerate(zones) if last[code] >= 0}
+        # 没有分区的中标者不属于任何分区，按系统出清价格结算
+        paid = np.full(book.size, clearing_price)
+        zonal = winners[codes[winners] >= 0]
+        paid[zonal] = zone_price[codes[zonal]]
+        profits = paid - book.cost
+
+    return book.dispatch_result(scenario, clearing_price, dispatched, profits, zone_prices=prices)
@@ -0,0 +1,227 @@
+# services/simulation/agent_auction.py
+"""自动报价代理的重复拍卖模拟，用于校准课堂场景
+
+直接在内存中的报价簿上反复调用已登记的出清机制（不经过 HTTP 和存储层），每轮记录出清价格和各代理的报价、利润。
+多个随机数种子相互独立，可分发到共用的进程池并行运行。
+
+运行：python -m services.simulation.agent_auction config.json [--seeds N] [--workers W] [--output trace.npz]
+config.json 格式见 simulate() 的说明。
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from fastapi import HTTPException
+
+from services.market_clear.bid_book import BidBook
+from services.market_clear.registry import get_mechanism
+
+STRATEGIES = ("cost_plus", "best_response", "learning")
+
+# 代理配置中属于策略参数的字段，其余字段（cost、quantity、zone 等）原样写入报价
+STRATEGY_FIELDS = ("id", "strategy", "markup", "noise", "tick", "markups", "epsilon", "alpha")
+
+# 学习代理默认的加价比例候选
+DEFAULT_MARKUPS = tuple(np.round(np.linspace(0.0, 1.0, 11), 2))
+
+MAX_ROUNDS = 1000000
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """获取模拟进程池（首次调用时创建，之后的调用共用；请求的进程数变化时重建）
+
+    子进程用 spawn 启动（与风险模拟相同）：在服务进程中调用时，fork 可能复制其他线程持有的锁。
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            # 已提交的任务会先完成
+            _pool.shutdown(wait=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool(wait=True):
+    """关闭模拟进程池，下次调用时重新创建"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+class Agents:
+    """一组代理的策略参数，按策略分组向量化生成每轮报价
+
+    - cost_plus：报价 = 成本 × (1 + markup)，可加正态噪声 noise（相对成本的标准差）
+    - best_response：按上一轮其他代理的报价，报在第 demand 低的对手报价之下 tick 处（不低于成本），
+      这是按报价数出清的统一价格和按报价结算下中标且价格最高的报价；第一轮按 markup 加价
+    - learning：在 markups 候选加价比例上做 ε-贪心选择，按每轮实际利润以步长 alpha 更新各动作的估计值
+    """
+
+    def __init__(self, specs, demand):
+        if not specs:
+            raise ValueError("At least one agent is required")
+        self.ids = [str(spec.get("id", f"agent_{i}")) for i, spec in enumerate(specs)]
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError("Duplicate agent id")
+        strategies = [spec.get("strategy", "cost_plus") for spec in specs]
+        unknown = sorted(set(strategies) - set(STRATEGIES))
+        if unknown:
+            raise ValueError(f"Unknown agent strategy: {unknown}")
+        self.strategy = np.array(strategies)
+        self.bids = [{key: value for key, value in spec.items() if key not in STRATEGY_FIELDS} for spec in specs]
+        self.cost = np.array([bid.get("cost", 0.0) for bid in self.bids], dtype=float)
+        self.markup = np.array([spec.get("markup", 0.1) for spec in specs], dtype=float)
+        self.noise = np.array([spec.get("noise", 0.0) for spec in specs], dtype=float)
+        self.tick = np.array([spec.get("tick", 0.01) for spec in specs], dtype=float)
+        self.demand = int(demand)
+
+        self.learners = np.flatnonzero(self.strategy == "learning")
+        self.responders = np.flatnonzero(self.strategy == "best_response")
+        self.markups = np.array([specs[i].get("markups", DEFAULT_MARKUPS) for i in self.learners], dtype=float).reshape(len(self.learners), -1)
+        self.epsilon = np.array([specs[i].get("epsilon", 0.1) for i in self.learners], dtype=float)
+        self.alpha = np.array([specs[i].get("alpha", 0.1) for i in self.learners], dtype=float)
+        self.values = np.zeros_like(self.markups)
+        self.actions = np.zeros(len(self.learners), dtype=np.int64)
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def offers(self, rng, previous):
+        """生成本轮报价；previous 为上一轮报价（第一轮为 None）"""
+        offers = self.cost * (1 + self.markup + self.noise * rng.standard_normal(self.size))
+
+        if len(self.responders) and previous is not None:
+            # 排除自己后第 demand 低的报价：自己排在前 demand 名时为全体的第 demand + 1 低
+            ranked = np.sort(previous)
+            rank = np.argsort(np.argsort(previous, kind="stable"), kind="stable")[self.responders]
+            position = np.where(rank < self.demand, self.demand, self.demand - 1)
+            rival = np.where(position < self.size, ranked[np.minimum(position, self.size - 1)], np.inf)
+            target = np.where(np.isfinite(rival), rival - self.tick[self.responders], offers[self.responders])
+            offers[self.responders] = np.maximum(target, self.cost[self.responders])
+
+        if len(self.learners):
+            explore = rng.random(len(self.learners)) < self.epsilon
+            greedy = np.argmax(self.values, axis=1)
+            random_actions = rng.integers(0, self.markups.shape[1], len(self.learners))
+            self.actions = np.where(explore, random_actions, greedy)
+            chosen = self.markups[np.arange(len(self.learners)), self.actions]
+            offers[self.learners] = self.cost[self.learners] * (1 + chosen)
+        return offers
+
+    def learn(self, profits):
+        if len(self.learners):
+            rows = np.arange(len(self.learners))
+            current = self.values[rows, self.actions]
+            self.values[rows, self.actions] = current + self.alpha * (profits[self.learners] - current)
+
+
+def simulate(config, seed=0):
+    """运行一个种子的重复拍卖，返回列式轨迹 {列名: 数组}
+
+    config 格式：
+        {
+            "mechanism": "uniform_price",       # 已登记的出清机制
+            "scenario": {"demand": 3, ...},     # 传给出清机制的场景参数
+            "rounds": 1000,
+            "agents": [{"id": "a1", "strategy": "cost_plus", "cost": 10, "markup": 0.2}, ...]
+        }
+    轨迹列：price（轮数）；offers、profits（轮数 × 代理数，float32）；dispatched（轮数 × 代理数，bool）。
+    某一轮出清失败（如报价不足）时价格为 NaN，所有代理未中标、利润为 0。
+    """
+    mechanism = get_mechanism(config.get("mechanism", "uniform_price"))
+    if mechanism is None:
+        raise ValueError(f"Unknown market mechanism: {config.get('mechanism')}")
+    rounds = int(config.get("rounds", 1000))
+    if not 0 < rounds <= MAX_ROUNDS:
+        raise ValueError(f"Rounds must be between 1 and {MAX_ROUNDS}")
+    scenario = dict(config.get("scenario") or {})
+    scenario.setdefault("scenario_id", "agent_simulation")
+    scenario.setdefault("demand", 1)
+    agents = Agents(config.get("agents") or [], scenario["demand"])
+
+    rng = np.random.default_rng(seed)
+    price = np.full(rounds, np.nan)
+    offers = np.empty((rounds, agents.size), dtype=np.float32)
+    profits = np.zeros((rounds, agents.size), dtype=np.float32)
+    dispatched = np.zeros((rounds, agents.size), dtype=bool)
+
+    previous = None
+    for round_index in range(rounds):
+        current = agents.offers(rng, previous)
+        for bid, offer in zip(agents.bids, current.tolist()):
+            bid["offer"] = offer
+        try:
+            result = mechanism.clear(scenario, BidBook(dict(zip(agents.ids, agents.bids))))
+        except (HTTPException, ValueError, KeyError, IndexError):
+            result = None
+
+        round_profits = np.zeros(agents.size)
+        if result is not None:
+            price[round_index] = result.clearing_price
+            round_profits = np.fromiter(result.profits.values(), dtype=float, count=agents.size)
+            dispatched[round_index] = np.fromiter(result.dispatched.values(), dtype=bool, count=agents.size)
+        offers[round_index] = current
+        profits[round_index] = round_profits
+        agents.learn(round_profits)
+        previous = current
+
+    return {"price": price, "offers": offers, "profits": profits, "dispatched": dispatched}
+
+
+def simulate_seeds(config, seeds, workers=1):
+    """对多个种子运行模拟，各列在最前面增加种子维度；workers > 1 时各种子分发到进程池"""
+    seeds = list(seeds)
+    if not seeds:
+        raise ValueError("At least one seed is required")
+    if workers > 1 and len(seeds) > 1:
+        traces = list(get_pool(workers).map(simulate, [config] * len(seeds), seeds))
+    else:
+        traces = [simulate(config, seed) for seed in seeds]
+
+    trace = {name: np.stack([t[name] for t in traces]) for name in traces[0]}
+    trace["seeds"] = np.array(seeds, dtype=np.int64)
+    trace["agent_ids"] = np.array([str(spec.get("id", f"agent_{i}")) for i, spec in enumerate(config["agents"])])
+    return trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config", help="模拟配置 JSON 文件")
+    parser.add_argument("--seeds", type=int, default=1, help="种子数（0 .. N-1）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument("--output", help="轨迹输出路径（.npz），不给出时只打印汇总")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    try:
+        trace = simulate_seeds(config, range(args.seeds), args.workers)
+    finally:
+        shutdown_pool()
+    if args.output:
+        np.savez_compressed(args.output, **trace)
+
+    mean_profits = trace["profits"].mean(axis=(0, 1))
+    print(f"{args.seeds} seeds x {trace['price'].shape[1]} rounds, mean price {np.nanmean(trace['price']):.4f}")
+    for agent_id, profit in zip(trace["agent_ids"], mean_profits):
+        print(f"{agent_id:>20}{profit:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
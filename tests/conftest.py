@@ -0,0 +1,34 @@
+# tests/conftest.py
+
+import pytest
+
+from mock_data import file_storage
+from mock_data.file_storage import JsonStorageBackend
+from mock_data.visibility_index import invalidate_visibility_index
+from services.market_clear.order_book import clear_order_books
+from services.market_clear.result_cache import clear_result_cache
+
+
+def storage_dirs(root):
+    """JsonStorageBackend 各分片目录都放在 root 下"""
+    names = ("bids", "evaluations", "participants", "classes", "assignments", "assignments_by_scenario")
+    return {f"{name}_dir": str(root / name) for name in names}
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """临时目录中的 JSON 存储后端，替换当前进程的存储，测试不会读写 mock_data/ 下的数据"""
+    for name in ("SCENARIO_FILE", "BIDS_FILE", "EVALUATION_CRITERIA_FILE", "CLASSES_FILE", "ASSIGNMENTS_FILE"):
+        monkeypatch.setattr(file_storage, name, str(tmp_path / (name.lower()[:-len("_file")] + ".json")))
+    backend = JsonStorageBackend(**storage_dirs(tmp_path))
+    monkeypatch.setattr(file_storage, "_storage", backend)
+    # 派生索引和出清结果缓存按版本号判断是否失效，各测试的临时存储版本号都从头计数，需要显式清空
+    file_storage.clear_json_cache()
+    invalidate_visibility_index()
+    clear_order_books()
+    clear_result_cache()
+    yield backend
+    file_storage.clear_json_cache()
+    invalidate_visibility_index()
+    clear_order_books()
+    clear_result_cache()
@@ -0,0 +1,43 @@
+# tests/test_agent_auction.py
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from services.simulation import agent_auction
+from services.simulation.agent_auction import simulate_seeds
+
+CONFIG = {
+    "mechanism": "uniform_price",
+    "scenario": {"demand": 2},
+    "rounds": 20,
+    "agents": [
+        {"id": "a1", "strategy": "cost_plus", "cost": 10, "markup": 0.2, "noise": 0.05},
+        {"id": "a2", "strategy": "best_response", "cost": 12},
+        {"id": "a3", "strategy": "learning", "cost": 9},
+    ],
+}
+
+
+def test_pool_results_match_serial_run_and_pool_is_reused():
+    """进程池中各种子的轨迹与串行运行相同；多次调用共用同一个进程池，关闭后重新创建"""
+    try:
+        serial = simulate_seeds(CONFIG, range(3), workers=1)
+        parallel = simulate_seeds(CONFIG, range(3), workers=2)
+        pool = agent_auction._pool
+        assert pool is not None
+        simulate_seeds(CONFIG, range(2), workers=2)
+        assert agent_auction._pool is pool
+        for name in ("price", "offers", "profits", "dispatched"):
+            np.testing.assert_array_equal(parallel[name], serial[name])
+    finally:
+        agent_auction.shutdown_pool()
+    assert agent_auction._pool is None
+
+
+def test_app_shutdown_closes_pool():
+    from main import app
+
+    agent_auction.get_pool(2)
+    with TestClient(app):
+        pass
+    assert agent_auction._pool is None
@@ -0,0 +1,189 @@
+# tests/test_bid_book_equivalence.py
+"""基于 BidBook 的出清与逐条排序的参考实现（各机制改用 BidBook 之前的写法）逐项比较
+
+报价大量并列，需求覆盖从 1 到超过报价数，报价数较多、需求较小时走 smallest() 的部分选择路径。
+"""
+
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from services.market_clear.bid_book import BidBook, TOPK_MAX_FRACTION
+from services.market_clear.registry import get_mechanism
+
+SEEDS = range(200)
+
+
+def offer_of(bid):
+    return bid.get("offer", bid.get("price"))
+
+
+def expected_offer(bid):
+    probability = bid.get("probability", 1)
+    return offer_of(bid) / probability if probability > 0 else float("inf")
+
+
+def reference_clear(name, scenario, bid_data):
+    """count 模式的参考实现：Python 稳定排序取前 demand 条，返回 (出清价格, 是否中标, 利润)"""
+    demand = scenario["demand"]
+    key = expected_offer if name == "risk_adjusted_uniform" else offer_of
+    sorted_bids = sorted(bid_data.items(), key=lambda item: key(item[1]))
+
+    if name == "zone_limit_uniform":
+        zone_limits = scenario["zone_limits"]
+        winners, zone_count = [], defaultdict(int)
+        for student_id, bid in sorted_bids:
+            zone = bid.get("zone")
+            if zone is None:
+                continue
+            if zone_count[zone] < zone_limits.get(zone, demand):
+                winners.append((student_id, bid))
+                zone_count[zone] += 1
+            if len(winners) >= demand:
+                break
+    else:
+        winners = sorted_bids[:demand]
+    if len(winners) < demand:
+        raise ValueError("Not enough bids to satisfy demand")
+
+    winners = dict(winners)
+    clearing_price = offer_of(list(winners.values())[-1])
+    if name in ("pay_as_bid", "fixed_cost_pay_as_bid"):
+        clearing_price = 0
+
+    dispatched, profits = {}, {}
+    for student_id, bid in bid_data.items():
+        cost, fixed_cost = bid["cost"], bid.get("fixed_cost", 0.0)
+        profit = None
+        if student_id in winners:
+            profit = {
+                "uniform_price": lambda: clearing_price - cost,
+                "pay_as_bid": lambda: offer_of(bid) - cost,
+                "fixed_cost_uniform": lambda: clearing_price - cost - fixed_cost,
+                "fixed_cost_pay_as_bid": lambda: offer_of(bid) - cost - fixed_cost,
+                "zone_limit_uniform": lambda: clearing_price - cost,
+                "constrained_on": lambda: clearing_price - cost - fixed_cost,
+                "risk_adjusted_uniform": lambda: clearing_price - cost - bid.get("risk_cost", 0) * (1 - bid.get("probability", 1.0)),
+            }[name]()
+        elif name == "constrained_on" and student_id in scenario["must_run"]:
+            profit = -cost - fixed_cost
+        dispatched[student_id] = profit is not None
+        profits[student_id] = round(profit, 2) if profit is not None else 0.0
+    return clearing_price, dispatched, profits
+
+
+def reference_clear_quantity(name, scenario, bid_data):
+    """quantity 模式的参考实现：沿排序后的累计容量逐条调度，边际报价只调度剩余部分"""
+    demand = scenario["demand"]
+    sorted_bids = sorted(bid_data.items(), key=lambda item: offer_of(item[1]))
+    quantities, supplied, clearing_price = {}, 0.0, None
+    for student_id, bid in sorted_bids:
+        quantity = max(bid.get("quantity", 1.0), 0.0)
+        if supplied + quantity >= demand:
+            quantities[student_id] = demand - supplied
+            clearing_price = offer_of(bid)
+            break
+        quantities[student_id] = quantity
+        supplied += quantity
+    if clearing_price is None:
+        raise ValueError("Not enough capacity to satisfy demand")
+
+    profits = {}
+    for student_id, bid in bid_data.items():
+        quantity = quantities.get(student_id, 0.0)
+        if quantity <= 0:
+            profits[student_id] = 0.0
+            continue
+        price = offer_of(bid) if name == "pay_as_bid" else clearing_price
+        profit = (price - bid["cost"]) * quantity
+        if name == "fixed_cost_uniform":
+            profit -= bid.get("fixed_cost", 0.0)
+        profits[student_id] = round(profit, 2)
+    if name == "pay_as_bid":
+        clearing_price = 0
+    dispatched = {student_id: quantities.get(student_id, 0.0) > 0 for student_id in bid_data}
+    rounded = {student_id: round(quantities.get(student_id, 0.0), 3) for student_id in bid_data}
+    return clearing_price, dispatched, profits, rounded
+
+
+def make_case(seed):
+    """随机场景：报价取少数几个值（大量并列），部分报价只有 price 字段"""
+    rng = np.random.default_rng(seed)
+    size = int(rng.choice([1, 3, 10, 60, 400]))
+    zones = ["A", "B", "C", None]
+    bid_data = {}
+    for i in range(size):
+        bid = {
+            "cost": float(rng.integers(0, 10)),
+            "fixed_cost": float(rng.integers(0, 4)) * 0.5,
+            "quantity": float(rng.choice([0.0, 0.5, 1.0, 2.5, 10.0])),
+            "probability": float(rng.choice([0.0, 0.5, 0.8, 1.0])),
+            "risk_cost": float(rng.integers(0, 5)),
+            "zone": zones[int(rng.integers(0, len(zones)))],
+        }
+        bid["price" if rng.random() < 0.2 else "offer"] = float(rng.integers(1, 8)) * 2.5
+        bid_data[f"s{i}"] = bid
+    # 多数情况下需求远小于报价数（部分选择路径），也覆盖需求等于和超过报价数
+    demand = int(rng.choice([1, 2, max(1, size // 10), max(1, size // 3), size, size + 1]))
+    scenario = {
+        "scenario_id": f"case_{seed}",
+        "demand": demand,
+        "zone_limits": {"A": int(rng.integers(0, 4)), "B": int(rng.integers(1, size + 2))},
+        "must_run": [f"s{i}" for i in range(0, size, 7)],
+    }
+    return scenario, bid_data
+
+
+COUNT_MECHANISMS = (
+    "uniform_price", "pay_as_bid", "fixed_cost_uniform", "fixed_cost_pay_as_bid",
+    "zone_limit_uniform", "constrained_on", "risk_adjusted_uniform",
+)
+
+
+@pytest.mark.parametrize("name", COUNT_MECHANISMS)
+def test_count_clearing_matches_reference(name):
+    mechanism = get_mechanism(name)
+    for seed in SEEDS:
+        scenario, bid_data = make_case(seed)
+        if name == "constrained_on" and scenario["demand"] > len(bid_data):
+            continue  # 原实现在报价不足时没有定义的行为
+        try:
+            expected = reference_clear(name, scenario, bid_data)
+        except ValueError:
+            with pytest.raises(Exception):
+                mechanism.clear(scenario, BidBook(bid_data), "count")
+            continue
+        result = mechanism.clear(scenario, BidBook(bid_data), "count")
+        assert (result.clearing_price, result.dispatched, result.profits) == expected, f"seed {seed}"
+
+
+@pytest.mark.parametrize("name", ("uniform_price", "pay_as_bid", "fixed_cost_uniform"))
+def test_quantity_clearing_matches_reference(name):
+    mechanism = get_mechanism(name)
+    for seed in SEEDS:
+        scenario, bid_data = make_case(seed)
+        scenario["demand"] = float(scenario["demand"]) * 1.5
+        try:
+            expected = reference_clear_quantity(name, scenario, bid_data)
+        except ValueError:
+            with pytest.raises(Exception):
+                mechanism.clear(scenario, BidBook(bid_data), "quantity")
+            continue
+        result = mechanism.clear(scenario, BidBook(bid_data), "quantity")
+        actual = (result.clearing_price, result.dispatched, result.profits, result.dispatched_quantity)
+        assert actual == expected, f"seed {seed}"
+
+
+def test_smallest_matches_stable_sort():
+    """部分选择与稳定排序的前 k 条完全相同（含与第 k 小并列的报价）"""
+    for seed in SEEDS:
+        rng = np.random.default_rng(seed)
+        size = int(rng.integers(1, 500))
+        book = BidBook({f"s{i}": {"offer": float(rng.integers(0, 6))} for i in range(size)})
+        expected = np.argsort(book.offer, kind="stable")
+        for k in {1, 2, size // 4, int(size * TOPK_MAX_FRACTION) - 1, size}:
+            if k > 0:
+                # 每次新建报价簿，避免命中已缓存的全排序
+                fresh = BidBook(dict(zip(book.ids, book.bids)))
+                assert fresh.smallest("offer", k).tolist() == expected[:k].tolist(), f"seed {seed}, k {k}"
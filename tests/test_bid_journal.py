@@ -0,0 +1,137 @@
+# tests/test_bid_journal.py
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from mock_data import bid_journal, file_storage
+from mock_data.bid_journal import JournalStorageBackend
+
+from conftest import storage_dirs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    file_storage.clear_json_cache()
+    return storage_dirs(tmp_path)
+
+
+def journal_size(backend, scenario_id):
+    return os.path.getsize(backend._journal_path(scenario_id))
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_replay_rebuilds_bids_from_journal(dirs):
+    """写入、改写和撤回都只追加日志，新建后端（进程重启）时回放得到相同的报价簿"""
+    backend = JournalStorageBackend(**dirs)
+    backend.save_bid("s1", "alice", {"offer": 1.0})
+    backend.save_bid("s1", "bob", {"offer": 2.0})
+    backend.save_bid("s1", "alice", {"offer": 3.0})
+    backend.delete_bid("s1", "bob")
+    backend.save_bid("s2", "carol", {"offer": 4.0})
+    assert not os.path.exists(backend._snapshot_path("s1"))
+
+    restarted = JournalStorageBackend(**dirs)
+    assert restarted.get_bids("s1") == {"alice": {"offer": 3.0}}
+    assert restarted.get_bids("s2") == {"carol": {"offer": 4.0}}
+    assert restarted.bids_version("s1") == 4
+
+
+def test_compact_writes_snapshot_and_replaces_journal(dirs):
+    backend = JournalStorageBackend(**dirs)
+    for i in range(5):
+        backend.save_bid("s1", f"student_{i}", {"offer": float(i)})
+    backend.delete_bid("s1", "student_0")
+    expected = backend.get_bids("s1")
+    version = backend.bids_version("s1")
+
+    backend.compact("s1")
+    assert journal_size(backend, "s1") == 0
+    assert file_storage.load_json(backend._snapshot_path("s1"), cached=False) == expected
+    # 合并不改变报价簿和版本号，之后的写入继续追加到新日志
+    assert backend.get_bids("s1") == expected
+    assert backend.bids_version("s1") == version
+    backend.save_bid("s1", "student_9", {"offer": 9.0})
+    assert journal_size(backend, "s1") > 0
+
+    restarted = JournalStorageBackend(**dirs)
+    assert restarted.get_bids("s1") == {**expected, "student_9": {"offer": 9.0}}
+
+
+def test_compactor_retries_after_failure(dirs, monkeypatch):
+    """合并失败后后台线程继续运行，超时后重试该场景"""
+    monkeypatch.setattr(bid_journal, "JOURNAL_COMPACT_RETRY_SECONDS", 0.05)
+    backend = JournalStorageBackend(compact_bytes=1, **dirs)
+    compact = backend.compact
+    calls = []
+
+    def flaky_compact(scenario_id):
+        calls.append(scenario_id)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        compact(scenario_id)
+
+    monkeypatch.setattr(backend, "compact", flaky_compact)
+    backend.save_bid("s1", "alice", {"offer": 1.0})
+
+    assert wait_until(lambda: len(calls) >= 2 and journal_size(backend, "s1") == 0)
+    assert backend._compactor.is_alive()
+    assert file_storage.load_json(backend._snapshot_path("s1"), cached=False) == {"alice": {"offer": 1.0}}
+
+    # 重试成功后线程回到等待新写入的状态，仍会处理后续的合并
+    backend.save_bid("s1", "bob", {"offer": 2.0})
+    assert wait_until(lambda: journal_size(backend, "s1") == 0)
+    assert backend.get_bids("s1") == {"alice": {"offer": 1.0}, "bob": {"offer": 2.0}}
+
+
+def save_in_other_process(dirs, scenario_id, student_id, offer, compact=False):
+    script = (
+        "import json, sys\n"
+        "from mock_data.bid_journal import JournalStorageBackend\n"
+        "dirs, scenario_id, student_id, offer, compact = json.loads(sys.argv[1])\n"
+        "backend = JournalStorageBackend(**dirs)\n"
+        "backend.save_bid(scenario_id, student_id, {'offer': offer})\n"
+        "if compact:\n"
+        "    backend.compact(scenario_id)\n"
+    )
+    args = json.dumps([dirs, scenario_id, student_id, offer, compact])
+    subprocess.run([sys.executable, "-c", script, args], cwd=ROOT, check=True)
+
+
+def test_reader_catches_up_with_other_process(dirs):
+    """其他进程追加的记录在下次读取时回放；其他进程合并（替换日志）后从新快照重新加载"""
+    backend = JournalStorageBackend(**dirs)
+    backend.save_bid("s1", "alice", {"offer": 1.0})
+    assert backend.get_bids("s1") == {"alice": {"offer": 1.0}}
+
+    save_in_other_process(dirs, "s1", "bob", 2.0)
+    assert backend.get_bids("s1") == {"alice": {"offer": 1.0}, "bob": {"offer": 2.0}}
+    assert backend.bids_version("s1") == 2
+
+    save_in_other_process(dirs, "s1", "carol", 3.0, compact=True)
+    assert journal_size(backend, "s1") == 0
+    assert backend.get_bids("s1") == {"alice": {"offer": 1.0}, "bob": {"offer": 2.0}, "carol": {"offer": 3.0}}
+
+    # 写到一半的记录（没有换行）留到写完后再回放
+    path = backend._journal_path("s1")
+    record = json.dumps({"scenario_id": "s1", "student_id": "dave", "bid": {"offer": 4.0}}) + "\n"
+    with open(path, "ab") as f:
+        f.write(record[:10].encode("utf-8"))
+    assert "dave" not in backend.get_bids("s1")
+    with open(path, "ab") as f:
+        f.write(record[10:].encode("utf-8"))
+    assert backend.get_bids("s1")["dave"] == {"offer": 4.0}
@@ -0,0 +1,13 @@
+# tests/test_event_loop_lag.py
+
+from benchmarks.bench_event_loop_lag import measure_lag
+
+# 与基准脚本的默认阈值相同；记录数较小，整个测试约两秒
+THRESHOLD_SECONDS = 0.05
+RECORDS = 100000
+
+
+def test_pooled_save_keeps_event_loop_responsive():
+    """在存储线程池中写入大评估结果时，事件循环的最大延迟不超过阈值"""
+    (elapsed, max_lag), = measure_lag(RECORDS, 0.005, modes=("pool",)).values()
+    assert max_lag < THRESHOLD_SECONDS, f"event loop lag {max_lag * 1000:.1f} ms while writing for {elapsed * 1000:.1f} ms"
@@ -0,0 +1,57 @@
+# tests/test_file_storage.py
+
+import math
+import os
+
+import pytest
+
+from mock_data import file_storage
+from mock_data.file_storage import load_json, update_json, save_bid, get_bids
+
+
+def test_nan_written_by_stdlib_json_is_readable(tmp_path):
+    """标准库写出的 NaN 即使安装了 orjson 也能读取"""
+    path = tmp_path / "shard.json"
+    path.write_text('{"alice": {"offer": NaN}}', encoding="utf-8")
+    assert math.isnan(load_json(str(path))["alice"]["offer"])
+
+
+def test_update_json_aborts_on_corrupt_file(tmp_path):
+    """内容损坏时读-改-写抛出异常，不用空数据覆盖原文件"""
+    path = tmp_path / "shard.json"
+    path.write_text("{broken", encoding="utf-8")
+    assert load_json(str(path)) == {}
+    with pytest.raises(ValueError):
+        update_json(str(path), lambda data: data.update(bob={"offer": 1.0}))
+    assert path.read_text(encoding="utf-8") == "{broken"
+
+
+def test_save_bid_keeps_other_bids_after_nan_shard(storage):
+    # 旧版本写入的 NaN 报价不会导致同场景的其他报价丢失
+    storage.save_bid("s1", "alice", {"offer": float("nan")})
+    file_storage.clear_json_cache()
+    save_bid("s1", "bob", {"offer": 1.0})
+    assert sorted(get_bids("s1")) == ["alice", "bob"]
+
+
+@pytest.mark.parametrize("bid", [{"offer": float("inf")}, {"offer": 1.0, "offers": [1.0, float("nan")]}])
+def test_save_bid_rejects_non_finite_values(storage, bid):
+    with pytest.raises(ValueError):
+        save_bid("s1", "alice", bid)
+    assert get_bids("s1") == {}
+
+
+def test_update_json_reads_from_disk_under_lock(tmp_path):
+    """其他进程写入后签名未变（同一时间戳精度内、大小相同、同一 inode）时，读-改-写仍基于磁盘上的最新内容"""
+    path = str(tmp_path / "shard.json")
+    file_storage.save_json(path, {"alice": 1})
+    stat = os.stat(path)
+    with open(path, "r+", encoding="utf-8") as f:
+        content = f.read().replace('"alice"', '"carol"')
+        f.seek(0)
+        f.write(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_json(path) == {"alice": 1}  # 签名相同，缓存无法发现变化
+
+    update_json(path, lambda data: data.update(bob=2))
+    assert load_json(path) == {"carol": 1, "bob": 2}
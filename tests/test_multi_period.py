@@ -0,0 +1,28 @@
+# tests/test_multi_period.py
+
+import pytest
+
+from services.market_clear.multi_period import clear_market_multi_period
+
+SCENARIO = {"scenario_id": "mp", "demand": 1, "demand_profile": [1, 2]}
+
+
+def test_dispatched_bid_without_cost_is_rejected():
+    """与单时段出清一致：被调度的报价既没有 cost 也没有 costs 时抛出 KeyError，而不是按成本 0 计算利润"""
+    bids = {"alice": {"offer": 1.0}, "bob": {"offer": 2.0, "cost": 1.0}}
+    with pytest.raises(KeyError):
+        clear_market_multi_period(SCENARIO, bids, "count")
+
+
+def test_undispatched_bid_does_not_need_cost():
+    bids = {"alice": {"offer": 1.0, "cost": 0.5}, "bob": {"offer": 2.0, "cost": 1.0}, "carol": {"offer": 3.0}}
+    result = clear_market_multi_period(SCENARIO, bids, "count")
+    assert result.period_prices == [1.0, 2.0]
+    assert result.profits == {"alice": 2.0, "bob": 1.0, "carol": 0.0}
+    assert result.dispatched["carol"] is False
+
+
+def test_period_costs_replace_cost():
+    bids = {"alice": {"offer": 1.0, "costs": [0.5, 0.0]}, "bob": {"offer": 2.0, "costs": [1.0, 1.5]}}
+    result = clear_market_multi_period(SCENARIO, bids, "count")
+    assert result.profits == {"alice": 2.5, "bob": 0.5}
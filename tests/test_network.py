@@ -0,0 +1,64 @@
+# tests/test_network.py
+
+import numpy as np
+import pytest
+
+from services.market_clear import network as network_module
+from services.market_clear.network import Network
+
+
+def random_network(seed, bus_count=30, extra_lines=20):
+    """随机连通网络：先连成一棵树，再加若干条环线"""
+    rng = np.random.default_rng(seed)
+    buses = [f"B{i}" for i in range(bus_count)]
+    lines = [
+        {"id": f"T{i}", "from": buses[int(rng.integers(0, i))], "to": buses[i], "reactance": float(rng.uniform(0.05, 0.5))}
+        for i in range(1, bus_count)
+    ]
+    for i in range(extra_lines):
+        start, end = rng.choice(bus_count, size=2, replace=False)
+        lines.append({"id": f"L{i}", "from": buses[start], "to": buses[end], "reactance": float(rng.uniform(0.05, 0.5))})
+    return {"buses": buses, "slack": buses[int(rng.integers(0, bus_count))], "lines": lines}
+
+
+def dense_ptdf(spec):
+    """稠密求逆的参考实现"""
+    bus_index = {bus: i for i, bus in enumerate(spec["buses"])}
+    slack = bus_index[spec["slack"]]
+    incidence = np.zeros((len(spec["lines"]), len(spec["buses"])))
+    for l, line in enumerate(spec["lines"]):
+        incidence[l, bus_index[line["from"]]] = 1
+        incidence[l, bus_index[line["to"]]] = -1
+    susceptance = np.diag([1 / line["reactance"] for line in spec["lines"]])
+    keep = [b for b in range(len(spec["buses"])) if b != slack]
+    reduced = incidence[:, keep].T @ susceptance @ incidence[:, keep]
+    ptdf = np.zeros_like(incidence)
+    ptdf[:, keep] = susceptance @ incidence[:, keep] @ np.linalg.inv(reduced)
+    return ptdf
+
+
+@pytest.mark.parametrize("block_lines", [1, 7, 256])
+def test_blocked_ptdf_matches_dense_solve(monkeypatch, block_lines):
+    monkeypatch.setattr(network_module, "PTDF_BLOCK_LINES", block_lines)
+    for seed in range(10):
+        spec = random_network(seed)
+        ptdf = Network(spec).ptdf
+        assert ptdf.shape == (len(spec["lines"]), len(spec["buses"]))
+        np.testing.assert_allclose(ptdf.toarray(), dense_ptdf(spec), atol=1e-9)
+
+
+def test_radial_network_ptdf_is_sparse(monkeypatch):
+    """辐射状网络中线路只承担其下游母线的注入，PTDF 只保留非零元素"""
+    monkeypatch.setattr(network_module, "PTDF_BLOCK_LINES", 16)
+    buses = [f"B{i}" for i in range(200)]
+    lines = [{"id": f"L{i}", "from": buses[i - 1], "to": buses[i], "reactance": 0.1} for i in range(1, 200)]
+    ptdf = Network({"buses": buses, "lines": lines}).ptdf
+    # 链状网络：线路 L_i 承担母线 i 及之后各母线的注入
+    assert ptdf.nnz == sum(range(1, 200))
+    np.testing.assert_allclose(ptdf.toarray(), dense_ptdf({"buses": buses, "slack": "B0", "lines": lines}), atol=1e-9)
+
+
+def test_disconnected_network_is_rejected():
+    spec = {"buses": ["B1", "B2", "B3"], "lines": [{"id": "L1", "from": "B1", "to": "B2", "reactance": 0.1}]}
+    with pytest.raises(ValueError):
+        Network(spec)
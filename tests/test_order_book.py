@@ -0,0 +1,116 @@
+# tests/test_order_book.py
+"""增量维护的报价簿（二分插入、序号决定并列顺序）与按全部报价重新出清的结果逐步比较
+
+报价取少数几个值（大量并列），操作序列混合新报价、替换（保留原位置）、撤回和撤回后重新提交（排到最后）。
+"""
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from mock_data.file_storage import save_bid, delete_bid, get_bids, save_scenario
+from security import create_access_token
+from services.market_clear.bid_book import BidBook
+from services.market_clear.order_book import OrderBook, get_order_book
+from services.market_clear.registry import get_mechanism
+
+SEEDS = range(50)
+
+
+def random_operations(rng, count, students=12):
+    """(student_id, bid) 操作序列，bid 为 None 表示撤回"""
+    for _ in range(count):
+        student_id = f"s{int(rng.integers(0, students))}"
+        if rng.random() < 0.25:
+            yield student_id, None
+        else:
+            yield student_id, {
+                "offer": float(rng.integers(1, 5)) * 2.5,
+                "cost": 1.0,
+                "quantity": float(rng.choice([0.0, 0.5, 1.0, 3.0])),
+            }
+
+
+def full_clear(bid_data, demand, mode):
+    """按全部报价重新统一出清，返回 (边际报价 student_id, 出清价格, 边际报价调度量)；无法出清时返回 None"""
+    scenario = {"scenario_id": "book", "demand": demand}
+    try:
+        result = get_mechanism("uniform_price").clear(scenario, BidBook(bid_data), mode)
+    except HTTPException:
+        return None
+    # 字典顺序就是稳定排序中并列报价的先后
+    ranked = sorted(bid_data, key=lambda student_id: bid_data[student_id]["offer"])
+    if mode == "quantity":
+        marginal = [student_id for student_id in ranked if result.dispatched_quantity[student_id] > 0][-1]
+        return marginal, result.clearing_price, result.dispatched_quantity[marginal]
+    return ranked[demand - 1], result.clearing_price, 1
+
+
+def book_clear(book, demand, mode):
+    marginal = book.marginal(demand, mode)
+    if marginal is None:
+        return None
+    student_id, price, before = marginal
+    return student_id, price, round(demand - before, 3) if mode == "quantity" else 1
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_incremental_book_matches_full_clear(seed):
+    rng = np.random.default_rng(seed)
+    initial = dict(
+        (student_id, bid) for student_id, bid in random_operations(rng, int(rng.integers(0, 10))) if bid is not None
+    )
+    bid_data = dict(initial)
+    book = OrderBook("book", initial, 0)
+    for student_id, bid in random_operations(rng, 40):
+        book.apply(student_id, bid)
+        # 存储中替换报价保留字典位置，撤回后重新提交排在最后
+        if bid is None:
+            bid_data.pop(student_id, None)
+        else:
+            bid_data[student_id] = bid
+        assert len(book) == len(bid_data)
+        for demand in (1, 2, 5, len(bid_data)):
+            if demand > 0:
+                assert book_clear(book, demand, "count") == full_clear(bid_data, demand, "count"), f"demand {demand}"
+        for demand in (0.5, 1.0, 2.75, 8.0, 40.0):
+            assert book_clear(book, demand, "quantity") == full_clear(bid_data, demand, "quantity"), f"demand {demand}"
+
+
+@pytest.fixture
+def client(storage):
+    from main import app
+
+    save_scenario("live", {"id": "live", "name": "live", "demand": 3, "enabled_mechanisms": ["uniform_price"]})
+    token = create_access_token({"sub": "teacher", "role": "teacher"})
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def test_indicative_price_follows_saves_and_deletes(client):
+    """指示性价格接口在每次写入/撤回后与全部报价重新出清一致，且报价簿是增量更新而不是重新构建"""
+    rng = np.random.default_rng(0)
+    book = None
+    for student_id, bid in random_operations(rng, 60):
+        if bid is None:
+            delete_bid("live", student_id)
+        else:
+            save_bid("live", student_id, bid)
+        for mode, demand in (("count", 3), ("quantity", 3.0)):
+            response = client.get(f"/api/simulation/indicative-price/live?mode={mode}")
+            assert response.status_code == 200, response.text
+            body = response.json()
+            bid_data = get_bids("live")
+            assert body["bids"] == len(bid_data)
+            expected = full_clear(bid_data, demand, mode)
+            if expected is None:
+                assert "indicative_price" not in body
+            else:
+                assert (body["marginal_student_id"], body["indicative_price"]) == expected[:2]
+                if mode == "quantity":
+                    assert body["marginal_dispatch"] == expected[2]
+        if book is not None:
+            assert get_order_book("live") is book
+        book = get_order_book("live")
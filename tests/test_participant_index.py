@@ -0,0 +1,80 @@
+# tests/test_participant_index.py
+
+import threading
+
+import pytest
+
+from mock_data import file_storage
+from mock_data.bid_journal import JournalStorageBackend
+from mock_data.file_storage import JsonStorageBackend
+
+from conftest import storage_dirs
+
+BACKENDS = {"json": JsonStorageBackend, "journal": JournalStorageBackend}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request, tmp_path):
+    file_storage.clear_json_cache()
+    return BACKENDS[request.param](**storage_dirs(tmp_path))
+
+
+def participant_bids_from_book(backend, scenario_id, participant_id):
+    return {
+        student_id: bid for student_id, bid in backend.get_bids(scenario_id).items()
+        if bid.get("participant_id") == participant_id
+    }
+
+
+def test_concurrent_saves_leave_index_consistent(backend):
+    """同一报价被并发地在两个参与者之间来回改写后，索引与报价一致"""
+    def worker(seed):
+        for i in range(20):
+            participant = ("p1", "p2")[(seed + i) % 2]
+            backend.save_bid("s1", "bid_1", {"offer": float(seed * 100 + i), "participant_id": participant})
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for participant in ("p1", "p2"):
+        expected = participant_bids_from_book(backend, "s1", participant)
+        assert backend.get_participant_bids(participant) == ({"s1": expected} if expected else {})
+
+
+def test_crash_before_bid_write_is_filtered(backend, monkeypatch):
+    """加入索引后、写入报价前崩溃：新参与者索引中多出的条目不会返回"""
+    backend.save_bid("s1", "bid_1", {"offer": 1.0, "participant_id": "p1"})
+    index_add = backend._index_add
+
+    def crash(*args):
+        index_add(*args)
+        raise OSError("crash")
+
+    monkeypatch.setattr(backend, "_index_add", crash)
+    with pytest.raises(OSError):
+        backend.save_bid("s1", "bid_1", {"offer": 2.0, "participant_id": "p2"})
+    with pytest.raises(OSError):
+        backend.save_bid("s1", "bid_2", {"offer": 3.0, "participant_id": "p1"})
+    monkeypatch.undo()
+
+    assert backend.get_participant_bids("p1") == {"s1": {"bid_1": {"offer": 1.0, "participant_id": "p1"}}}
+    assert backend.get_participant_bids("p2") == {}
+
+
+def test_crash_before_index_removal_is_filtered(backend, monkeypatch):
+    """报价已改到新参与者名下、旧参与者的索引未来得及更新：旧参与者看不到该报价，报价内容取最新值"""
+    backend.save_bid("s1", "bid_1", {"offer": 1.0, "participant_id": "p1"})
+
+    def crash(*args):
+        raise OSError("crash")
+
+    monkeypatch.setattr(backend, "_index_remove", crash)
+    with pytest.raises(OSError):
+        backend.save_bid("s1", "bid_1", {"offer": 2.0, "participant_id": "p2"})
+    monkeypatch.undo()
+
+    assert backend.get_participant_bids("p1") == {}
+    assert backend.get_participant_bids("p2") == {"s1": {"bid_1": {"offer": 2.0, "participant_id": "p2"}}}
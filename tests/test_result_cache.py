@@ -0,0 +1,82 @@
+# tests/test_result_cache.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mock_data.file_storage import save_bid, delete_bid, save_scenario, get_scenario
+from security import create_access_token
+from services.market_clear.result_cache import ResultCache, result_cache_stats
+
+
+def test_new_version_replaces_cached_result():
+    cache = ResultCache(max_size=4)
+    cache.put("s1", "uniform_price", "count", 1, "v1")
+    assert cache.get("s1", "uniform_price", "count", 1) == "v1"
+    cache.put("s1", "uniform_price", "count", 2, "v2")
+    assert cache.get("s1", "uniform_price", "count", 1) is None
+    assert cache.get("s1", "uniform_price", "count", 2) == "v2"
+    assert cache.stats()["size"] == 1
+
+
+@pytest.fixture
+def client(storage):
+    from main import app
+
+    save_scenario("s1", {
+        "id": "s1", "scenario_id": "s1", "name": "s1", "demand": 2,
+        "enabled_mechanisms": ["uniform_price", "pay_as_bid"],
+    })
+    save_bid("s1", "alice", {"offer": 1.0, "cost": 0.5, "quantity": 1.0})
+    save_bid("s1", "bob", {"offer": 2.0, "cost": 0.5, "quantity": 1.0})
+    save_bid("s1", "carol", {"offer": 3.0, "cost": 0.5, "quantity": 1.0})
+    token = create_access_token({"sub": "teacher", "role": "teacher"})
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def get_result(client, mechanism="uniform_price", mode="count"):
+    response = client.get(f"/api/simulation/result/s1?type={mechanism}&mode={mode}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bid_changes_invalidate_cached_result(client):
+    """报价写入、撤回和场景修改都递增版本号，之后的查询重新出清而不是返回旧结果"""
+    assert get_result(client)["clearing_price"] == 2.0
+    hits = result_cache_stats()["hits"]
+    assert get_result(client)["clearing_price"] == 2.0
+    assert result_cache_stats()["hits"] == hits + 1
+
+    save_bid("s1", "bob", {"offer": 2.5, "cost": 0.5, "quantity": 1.0})
+    assert get_result(client)["clearing_price"] == 2.5
+
+    delete_bid("s1", "alice")
+    result = get_result(client)
+    assert result["clearing_price"] == 3.0
+    assert "alice" not in result["dispatched"]
+
+    scenario = get_scenario("s1")
+    scenario["demand"] = 1
+    save_scenario("s1", scenario)
+    assert get_result(client)["clearing_price"] == 2.5
+
+
+def test_cache_entries_are_per_mechanism_and_mode(client):
+    """同一版本下不同机制、不同出清模式各自缓存，一次报价写入使它们全部失效"""
+    results = {
+        (mechanism, mode): get_result(client, mechanism, mode)
+        for mechanism in ("uniform_price", "pay_as_bid") for mode in ("count", "quantity")
+    }
+    assert results[("uniform_price", "count")]["profits"]["alice"] == 1.5
+    assert results[("pay_as_bid", "count")]["profits"]["alice"] == 0.5
+    assert "dispatched_quantity" in results[("uniform_price", "quantity")]
+    assert result_cache_stats()["size"] == 4
+
+    save_bid("s1", "alice", {"offer": 1.5, "cost": 0.5, "quantity": 1.0})
+    hits = result_cache_stats()["hits"]
+    assert get_result(client, "uniform_price", "count")["profits"]["alice"] == 1.5
+    assert get_result(client, "pay_as_bid", "count")["profits"]["alice"] == 1.0
+    assert get_result(client, "uniform_price", "quantity")["profits"]["alice"] == 1.5
+    assert get_result(client, "pay_as_bid", "quantity")["profits"]["alice"] == 1.0
+    assert result_cache_stats()["hits"] == hits
@@ -0,0 +1,125 @@
+# tests/test_what_if.py
+"""向量化的备选报价评估与逐个备选报价重新出清（_clear_alternative）逐项比较
+
+其余报价和备选报价都取少数几个值（大量并列），调用者既有已有报价（位于报价簿中任意位置）也有新加入的情况。
+"""
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from security import create_access_token
+from mock_data.file_storage import save_bid, save_scenario
+from services.market_clear.registry import get_mechanism
+from services.market_clear.what_if import (
+    MAX_ALTERNATIVES, VECTORIZED_MECHANISMS, _clear_alternative, evaluate_alternatives
+)
+
+SEEDS = range(200)
+
+
+def make_case(seed, mode):
+    """随机报价簿、调用者和备选报价；备选报价的 offer 多数与其余报价并列"""
+    rng = np.random.default_rng(seed)
+    size = int(rng.choice([0, 1, 2, 5, 30]))
+    levels = [2.5, 5.0, 7.5, 10.0]
+    bid_data = {}
+    for i in range(size):
+        bid_data[f"s{i}"] = {
+            "offer": float(rng.choice(levels)),
+            "cost": float(rng.integers(0, 6)),
+            "fixed_cost": float(rng.integers(0, 3)) * 0.5,
+            "quantity": float(rng.choice([0.0, 0.5, 1.0, 2.5])),
+        }
+    student_id = f"s{int(rng.integers(0, size))}" if size and rng.random() < 0.6 else "caller"
+    alternatives = [
+        {
+            "offer": float(rng.choice(levels + [1.0, 6.0, 12.5])),
+            "cost": float(rng.integers(0, 6)),
+            "fixed_cost": float(rng.integers(0, 3)) * 0.5,
+            "quantity": float(rng.choice([0.5, 1.0, 4.0])),
+        }
+        for _ in range(int(rng.integers(1, 8)))
+    ]
+    if mode == "quantity":
+        demand = float(rng.choice([0.5, 1.0, 2.5, 6.0, 40.0]))
+    else:
+        demand = int(rng.integers(1, size + 3))
+    scenario = {"scenario_id": f"case_{seed}", "demand": demand, "clearing_mode": mode}
+    return scenario, bid_data, student_id, alternatives
+
+
+def assert_matches_full_clear(scenario, mechanism, bid_data, student_id, alternatives, mode):
+    bids = [{**bid_data.get(student_id, {}), **alternative} for alternative in alternatives]
+    expected = [_clear_alternative(scenario, mechanism, bid_data, student_id, bid, mode) for bid in bids]
+    try:
+        outcomes = evaluate_alternatives(scenario, mechanism, bid_data, student_id, alternatives, mode)
+    except HTTPException as e:
+        # 报价数不足时整个请求失败，逐个重新出清时每个备选报价都失败
+        assert e.status_code == 400
+        assert all("error" in outcome for outcome in expected)
+        return
+    assert len(outcomes) == len(expected)
+    for outcome, reference in zip(outcomes, expected):
+        if "error" in reference:
+            assert "error" in outcome
+        else:
+            assert outcome == reference
+
+
+@pytest.mark.parametrize("mode", ("count", "quantity"))
+@pytest.mark.parametrize("name", sorted(VECTORIZED_MECHANISMS))
+def test_vectorized_outcomes_match_full_clear(name, mode):
+    mechanism = get_mechanism(name)
+    if mode == "quantity" and not mechanism.quantity_aware:
+        pytest.skip(f"{name} does not support quantity clearing")
+    for seed in SEEDS:
+        case = make_case(seed, mode)
+        try:
+            assert_matches_full_clear(case[0], mechanism, case[1], case[2], case[3], mode)
+        except AssertionError as e:
+            raise AssertionError(f"seed {seed}: {e}") from e
+
+
+def test_tied_alternative_keeps_existing_position():
+    """报价相同时已有报价保持原位置：调用者排在并列报价之前中标，新加入的报价排在最后不中标"""
+    mechanism = get_mechanism("uniform_price")
+    scenario = {"scenario_id": "tie", "demand": 2}
+    bid_data = {
+        "a": {"offer": 5.0, "cost": 1.0},
+        "b": {"offer": 5.0, "cost": 1.0},
+        "c": {"offer": 5.0, "cost": 1.0},
+        "d": {"offer": 3.0, "cost": 1.0},
+    }
+    alternatives = [{"offer": 5.0, "cost": 1.0}]
+    assert evaluate_alternatives(scenario, mechanism, bid_data, "a", alternatives, "count")[0]["dispatched"] is True
+    assert evaluate_alternatives(scenario, mechanism, bid_data, "c", alternatives, "count")[0]["dispatched"] is False
+    assert evaluate_alternatives(scenario, mechanism, bid_data, "new", alternatives, "count")[0]["dispatched"] is False
+    for student_id in ("a", "b", "c", "new"):
+        assert_matches_full_clear(scenario, mechanism, bid_data, student_id, alternatives, "count")
+
+
+@pytest.fixture
+def client(storage):
+    from main import app
+
+    save_scenario("open", {
+        "id": "open", "name": "open", "demand": 2, "is_open": True,
+        "enabled_mechanisms": ["uniform_price"],
+    })
+    for i in range(3):
+        save_bid("open", f"s{i}", {"offer": float(i + 1), "cost": 0.5})
+    token = create_access_token({"sub": "s0", "role": "student"})
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+@pytest.mark.parametrize("count, status", [(0, 400), (1, 200), (MAX_ALTERNATIVES, 200), (MAX_ALTERNATIVES + 1, 400)])
+def test_alternatives_limit(client, count, status):
+    alternatives = [{"offer": float(i % 5 + 1), "cost": 0.5} for i in range(count)]
+    response = client.post("/api/simulation/what-if/open", json={"alternatives": alternatives})
+    assert response.status_code == status, response.text
+    if status == 200:
+        assert len(response.json()["outcomes"]) == count